@@ -2,13 +2,17 @@
 
 import jwt
 from datetime import datetime, timedelta, timezone
-from fastapi import HTTPException, Security
+from typing import Optional
+
+from fastapi import HTTPException, Query, Request, Security
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
 from .config import get_settings
 
 security = HTTPBearer()
 
+STREAM_SCOPE = "stream"
+
 
 def create_token(pin: str) -> tuple[str, str]:
     """Verify PIN and create a JWT token. Returns (token, role)."""
@@ -30,15 +34,59 @@ def create_token(pin: str) -> tuple[str, str]:
     return token, role
 
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Security(security)) -> str:
-    """Verify JWT token from Authorization header. Returns 'user' on success."""
+def create_stream_token(role: str) -> tuple[str, int]:
+    """Create a short-lived token that can only open the event stream.
+
+    EventSource can't set headers, so this token travels in the query
+    string, where proxies and access logs may record it. Returns (token,
+    lifetime in seconds).
+    """
+    settings = get_settings()
+    now = datetime.now(timezone.utc)
+    payload = {
+        "sub": role,
+        "scope": STREAM_SCOPE,
+        "iat": now,
+        "exp": now + timedelta(seconds=settings.stream_token_seconds),
+    }
+    token = jwt.encode(payload, settings.jwt_secret, algorithm="HS256")
+    return token, settings.stream_token_seconds
+
+
+def decode_token(token: str, scope: Optional[str] = None) -> str:
+    """Verify a JWT and return its subject (the role).
+
+    ``scope`` is what the token must have been issued for; None for the
+    session tokens handed out at login.
+    """
     settings = get_settings()
-    token = credentials.credentials
 
     try:
         payload = jwt.decode(token, settings.jwt_secret, algorithms=["HS256"])
-        return payload["sub"]
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    if payload.get("scope") != scope:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return payload["sub"]
+
+
+def verify_token(credentials: HTTPAuthorizationCredentials = Security(security)) -> str:
+    """Verify JWT token from Authorization header. Returns 'user' on success."""
+    return decode_token(credentials.credentials)
+
+
+def verify_stream_token(request: Request, token: Optional[str] = Query(default=None)) -> str:
+    """Verify a JWT from the Authorization header or a ?token= query parameter.
+
+    Browsers' EventSource can't set headers, so stream endpoints accept a
+    stream token (see ``create_stream_token``) in the query string. Session
+    tokens are only accepted in the header, so they stay out of URLs.
+    """
+    scheme, _, header_token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and header_token:
+        return decode_token(header_token)
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return decode_token(token, STREAM_SCOPE)
@@ -0,0 +1,211 @@
+"""Circuit breakers around Google Sheets and Drive calls.
+
+Each breaker counts calls in a row that fail with a quota or server error,
+fail to connect, or take longer than ``BREAKER_SLOW_CALL_SECONDS``. At
+``BREAKER_FAILURE_THRESHOLD`` it opens, and so it does when that many calls
+are stuck in flight past the slow-call limit. While open, calls fail at once
+with ``CircuitOpenError`` instead of queueing for a quota token and holding
+a worker thread on a call that is likely to fail. Reads are served from the
+cache meanwhile and inventory changes wait in the journal.
+
+After ``BREAKER_OPEN_SECONDS`` the breaker half-opens and lets up to
+``BREAKER_HALF_OPEN_PROBES`` calls through as probes. A probe that succeeds
+closes it; one that fails opens it for another period.
+"""
+
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Optional
+
+from google.auth.exceptions import TransportError
+
+from .metrics import Counter, Gauge, error_status
+from .scheduler import RETRYABLE_STATUSES
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+breaker_state = Gauge("google_breaker_state", "Circuit breaker state: 0 closed, 1 half-open, 2 open.", ("target",))
+transitions = Counter("google_breaker_transitions_total", "Circuit breaker state changes.", ("target", "state"))
+rejected = Counter("google_breaker_rejected_total", "Google calls failed fast by an open breaker.", ("target",))
+
+
+class CircuitOpenError(Exception):
+    """A Google call refused because its breaker is open."""
+
+    def __init__(self, target: str, retry_after: float):
+        super().__init__(f"Google {target.capitalize()} is unavailable (circuit open, retry in {retry_after:.0f}s)")
+        self.target = target
+        self.retry_after = retry_after
+
+
+def is_outage(exc: BaseException) -> bool:
+    """Whether an error means Google is unreachable or failing, rather than
+    rejecting this particular request."""
+    if isinstance(exc, CircuitOpenError):
+        return True
+    status = error_status(exc)
+    if status != "error":
+        return status in RETRYABLE_STATUSES
+    # requests' connection errors and timeouts are OSErrors too
+    return isinstance(exc, (OSError, TransportError))
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker for one Google service."""
+
+    def __init__(
+        self,
+        target: str,
+        failure_threshold: int = 5,
+        slow_call_seconds: float = 10.0,
+        open_seconds: float = 30.0,
+        half_open_probes: int = 1,
+    ):
+        self.target = target
+        self._failure_threshold = max(1, failure_threshold)
+        self._slow_call_seconds = slow_call_seconds
+        self._open_seconds = open_seconds
+        self._half_open_probes = max(1, half_open_probes)
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0  # failed or slow calls in a row
+        self._opened_at = 0.0  # monotonic
+        self._opened_at_wall: Optional[float] = None
+        self._closed_at = 0.0  # monotonic
+        self._probes: set[int] = set()  # ids of the probe calls in flight while half-open
+        self._inflight: dict[int, float] = {}  # call id -> monotonic start
+        self._ids = itertools.count()
+        self._times_opened = 0
+        self._rejected = 0
+        self._last_failure = ""
+        breaker_state.set(target, value=STATE_VALUES[CLOSED])
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._expire()
+            return self._state
+
+    def check(self):
+        """Raise ``CircuitOpenError`` if a call made now would be refused.
+
+        Takes no probe slot: callers check before queueing for a quota token,
+        and ``guard`` admits the call itself once it has one.
+        """
+        with self._lock:
+            self._expire()
+            self._refuse_if_full()
+
+    @contextmanager
+    def guard(self):
+        """Admit one call, or raise ``CircuitOpenError``, and record its outcome."""
+        call_id = self._admit()
+        start = time.monotonic()
+        try:
+            yield
+        except BaseException as exc:
+            self._record(call_id, time.monotonic() - start, exc)
+            raise
+        self._record(call_id, time.monotonic() - start)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._expire()
+            now = time.monotonic()
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "in_flight": len(self._inflight),
+                "opened_at": _timestamp(self._opened_at_wall) if self._state != CLOSED else None,
+                "retry_in_seconds": round(max(0.0, self._opened_at + self._open_seconds - now), 1)
+                if self._state == OPEN else 0.0,
+                "times_opened": self._times_opened,
+                "rejected": self._rejected,
+                "last_failure": self._last_failure,
+            }
+
+    # Called with _lock held ---------------------------------------------
+
+    def _expire(self):
+        if self._state == OPEN and time.monotonic() >= self._opened_at + self._open_seconds:
+            self._transition(HALF_OPEN)
+
+    def _refuse_if_full(self):
+        if self._state == OPEN:
+            self._refuse(self._opened_at + self._open_seconds - time.monotonic())
+        if self._state == HALF_OPEN and len(self._probes) >= self._half_open_probes:
+            self._refuse(1.0)  # a probe is deciding; ask again shortly
+
+    def _refuse(self, retry_after: float):
+        self._rejected += 1
+        rejected.inc(self.target)
+        raise CircuitOpenError(self.target, max(retry_after, 1.0))
+
+    def _transition(self, state: str):
+        self._state = state
+        if state == CLOSED:
+            self._closed_at = time.monotonic()
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self._opened_at_wall = time.time()
+            self._times_opened += 1
+        self._probes = set()  # probes still out from an earlier period no longer decide
+        breaker_state.set(self.target, value=STATE_VALUES[state])
+        transitions.inc(self.target, state)
+
+    # --------------------------------------------------------------------
+
+    def _admit(self) -> int:
+        with self._lock:
+            self._expire()
+            now = time.monotonic()
+            if self._state == CLOSED:
+                # Calls hung past the slow-call limit count before they return;
+                # ones left over from before the last outage already have
+                stuck = sum(
+                    1 for start in self._inflight.values()
+                    if start >= self._closed_at and now - start > self._slow_call_seconds
+                )
+                if stuck >= self._failure_threshold:
+                    self._last_failure = f"{stuck} calls stuck for over {self._slow_call_seconds:g}s"
+                    self._transition(OPEN)
+            self._refuse_if_full()
+            call_id = next(self._ids)
+            self._inflight[call_id] = now
+            if self._state == HALF_OPEN:
+                self._probes.add(call_id)
+            return call_id
+
+    def _record(self, call_id: int, seconds: float, exc: Optional[BaseException] = None):
+        failed = exc is not None and is_outage(exc)
+        slow = seconds > self._slow_call_seconds
+        with self._lock:
+            self._inflight.pop(call_id, None)
+            probe = call_id in self._probes
+            self._probes.discard(call_id)
+            if failed or slow:
+                self._failures += 1
+                self._last_failure = (
+                    (str(exc) or type(exc).__name__) if failed else f"call took {seconds:.1f}s"
+                )[:200]
+                if probe:
+                    self._transition(OPEN)
+                elif self._state == CLOSED and self._failures >= self._failure_threshold:
+                    self._transition(OPEN)
+                return
+            self._failures = 0
+            if probe:
+                self._transition(CLOSED)
+
+
+def _timestamp(seconds: Optional[float]) -> Optional[str]:
+    if seconds is None:
+        return None
+    return datetime.fromtimestamp(seconds, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
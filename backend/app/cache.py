@@ -0,0 +1,207 @@
+"""Per-key stale-while-revalidate cache for Google Sheets reads."""
+
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Mutable per-request record of stale entries served (key -> age in seconds),
+# shared with the threads a request hands work to, like the API call tally.
+_served_stale: ContextVar[Optional[dict[str, float]]] = ContextVar("served_stale", default=None)
+
+
+@contextmanager
+def track_staleness():
+    """Collect the stale entries served while handling one request."""
+    served: dict[str, float] = {}
+    token = _served_stale.set(served)
+    try:
+        yield served
+    finally:
+        _served_stale.reset(token)
+
+
+def record_stale(key: str, age: float):
+    """Note that the current request, if any, was served data ``age`` seconds old."""
+    served = _served_stale.get()
+    if served is not None:
+        served[key] = max(served.get(key, 0.0), age)
+
+
+@dataclass
+class CachePolicy:
+    ttl: float  # seconds an entry is served as fresh
+    max_stale: float  # seconds past which a stale entry is only served if reloading it fails
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    loaded_at: float
+
+
+class SWRCache:
+    """Keyed cache with single-flight loads and background revalidation.
+
+    - Fresh entries (younger than the key's TTL) are returned directly.
+    - Stale entries (younger than max_stale) are returned immediately while
+      one background thread reloads the key.
+    - Missing or too-stale entries are loaded in the calling thread; other
+      callers asking for the same key meanwhile wait for that one load
+      instead of issuing their own.
+    - If that load fails with an error ``serve_stale_on`` accepts (Google
+      being down rather than the request being wrong), the last value
+      loaded is served instead, however old.
+
+    Stale values served while the key's loads are failing are recorded
+    against the current request (see ``track_staleness``).
+    """
+
+    def __init__(
+        self,
+        policies: dict[str, CachePolicy],
+        serve_stale_on: Callable[[BaseException], bool] = lambda exc: False,
+    ):
+        self._policies = policies
+        self._serve_stale_on = serve_stale_on
+        self._lock = threading.Lock()
+        self._entries: dict[str, CacheEntry] = {}
+        self._inflight: dict[str, Future] = {}
+        self._failing: set[str] = set()  # keys whose last load failed
+        self._stats: dict[str, dict[str, int]] = {
+            key: {
+                "hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0, "fallbacks": 0,
+                "refreshes": 0, "refresh_errors": 0,
+            }
+            for key in policies
+        }
+
+    def get(self, key: str, loader: Callable[[], Any]) -> Any:
+        policy = self._policies[key]
+        stats = self._stats[key]
+        with self._lock:
+            entry = self._entries.get(key)
+            was_failing = key in self._failing
+            age = time.time() - entry.loaded_at if entry else None
+            if entry and age < policy.ttl:
+                stats["hits"] += 1
+                return entry.value
+            if entry and age < policy.max_stale:
+                stats["stale_hits"] += 1
+                if key not in self._inflight:
+                    self._start_refresh(key, loader)
+                if was_failing:
+                    record_stale(key, age)
+                return entry.value
+
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                stats["misses"] += 1
+                future = Future()
+                self._inflight[key] = future
+            else:
+                stats["coalesced"] += 1
+
+        if owner:
+            self._load(key, loader, future)
+        try:
+            return future.result()
+        except Exception as exc:
+            if entry is None or not self._serve_stale_on(exc):
+                raise
+            with self._lock:
+                stats["fallbacks"] += 1
+            age = time.time() - entry.loaded_at
+            record_stale(key, age)
+            if owner and not was_failing:
+                logger.warning("Serving %r from %.0fs ago until it can be reloaded: %s", key, age, exc)
+            return entry.value
+
+    def peek(self, key: str) -> Optional[Any]:
+        """Return the cached value regardless of age, without loading."""
+        entry = self._entries.get(key)
+        return entry.value if entry else None
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._entries[key] = CacheEntry(value, time.time())
+            self._failing.discard(key)
+
+    def prime(self, key: str, value: Any):
+        """Seed an entry that is already stale: it is served immediately,
+        and the first read starts revalidating it."""
+        with self._lock:
+            self._entries[key] = CacheEntry(value, time.time() - self._policies[key].ttl)
+
+    def load(self, key: str, loader: Callable[[], Any]) -> Any:
+        """Reload the key in the calling thread whatever its age, or wait for
+        the load already in flight, and return the new value."""
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                self._stats[key]["refreshes"] += 1
+                future = Future()
+                self._inflight[key] = future
+        if owner:
+            self._load(key, loader, future, background=True)
+        return future.result()
+
+    def invalidate(self, key: Optional[str] = None):
+        with self._lock:
+            if key is None:
+                self._entries = {}
+            else:
+                self._entries.pop(key, None)
+
+    def age(self, key: str) -> Optional[float]:
+        entry = self._entries.get(key)
+        return time.time() - entry.loaded_at if entry else None
+
+    def stats(self) -> dict[str, dict]:
+        with self._lock:
+            return {
+                key: {
+                    **counts,
+                    "age_seconds": round(time.time() - self._entries[key].loaded_at, 1) if key in self._entries else None,
+                    "failing": key in self._failing,
+                    "ttl_seconds": self._policies[key].ttl,
+                    "max_stale_seconds": self._policies[key].max_stale,
+                }
+                for key, counts in self._stats.items()
+            }
+
+    def _start_refresh(self, key: str, loader: Callable[[], Any]):
+        # Called with _lock held
+        future: Future = Future()
+        self._inflight[key] = future
+        self._stats[key]["refreshes"] += 1
+        threading.Thread(
+            target=self._load, args=(key, loader, future, True), name=f"cache-refresh-{key}", daemon=True
+        ).start()
+
+    def _load(self, key: str, loader: Callable[[], Any], future: Future, background: bool = False):
+        try:
+            value = loader()
+        except BaseException as exc:
+            with self._lock:
+                self._inflight.pop(key, None)
+                self._failing.add(key)
+                if background:
+                    self._stats[key]["refresh_errors"] += 1
+            if background:
+                logger.warning("Background refresh of %r failed: %s", key, exc)
+            future.set_exception(exc)
+            return
+        with self._lock:
+            self._entries[key] = CacheEntry(value, time.time())
+            self._inflight.pop(key, None)
+            self._failing.discard(key)
+        future.set_result(value)
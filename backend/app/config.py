@@ -16,12 +16,17 @@ class Settings(BaseSettings):
     viewer_pin: str = "1234"  # Read-only inventory access
     jwt_secret: str = "change-me-in-production"  # Override via fly secret
     jwt_expiry_days: int = 7
+    stream_token_seconds: int = 60  # lifetime of the ?token= used to open the event stream
 
     # API
     api_host: str = "0.0.0.0"
     api_port: int = 8080
     debug: bool = False
 
+    # Prometheus metrics, served on their own port so they aren't public (0 = off)
+    metrics_host: str = "0.0.0.0"
+    metrics_port: int = 9091
+
     # CORS
     cors_origins: list[str] = [
         "http://localhost:5175",
@@ -30,9 +35,49 @@ class Settings(BaseSettings):
 
     # Google Drive (for filing invoices)
     google_drive_folder_id: str = ""
+    drive_upload_chunk_size: int = 1024 * 1024  # bytes per resumable chunk (rounded to 256 KiB)
+    drive_upload_retries: int = 3  # retries per chunk on transient errors
+
+    # Cache (per-tab TTLs; stale entries are served while refreshing, up to max stale)
+    cache_ttl_seconds: int = 30  # Inventory / products
+    cache_log_ttl_seconds: int = 30
+    cache_invoices_ttl_seconds: int = 60
+    cache_archive_ttl_seconds: int = 3600
+    cache_max_stale_seconds: int = 300
+
+    # Local state (invoice job queue); mount a Fly volume here in production
+    data_dir: str = "data"
+    invoice_job_max_attempts: int = 5  # per step (Drive upload, sheet logging)
+    invoice_job_retry_seconds: int = 5  # first retry delay, doubled each attempt
+
+    # Write-ahead journal: inventory changes are committed under DATA_DIR first and replayed to the sheet
+    write_journal: bool = True
+    journal_batch_size: int = 200  # changes per replay (one read, one write and one log append)
+    journal_retry_seconds: int = 2  # first retry delay while the sheet is unreachable, doubled each attempt
+
+    # Storage backend: "sheets" (Google Sheets) or "local" (SQLite, for offline runs or in place of a sheet)
+    storage_backend: str = "sheets"
+    local_storage_path: str = ""  # SQLite file or ":memory:"; default DATA_DIR/sheets.db
+    local_storage_latency_ms: float = 0  # simulated latency per call
+    local_storage_quota_per_minute: int = 0  # simulated read and write quota (0 = none)
+    local_storage_error_rate: float = 0.0  # fraction of calls failing with a 503
+
+    # Sheets quota pacing and retries (quota is 60 requests/min per user by default)
+    sheets_quota_per_minute: int = 60
+    sheets_quota_burst: int = 10
+    google_max_retries: int = 5  # on 429 and 5xx
+    google_backoff_base_seconds: float = 1.0
+    google_backoff_max_seconds: float = 32.0
+
+    # Circuit breaker per Google service (Sheets, Drive); reads are served from cache while it is open
+    breaker_failure_threshold: int = 5  # failed or slow calls in a row (retries included) that open it
+    breaker_slow_call_seconds: float = 10.0  # a call slower than this counts as failed
+    breaker_open_seconds: float = 30.0  # time open before letting probe calls through
+    breaker_half_open_probes: int = 1  # probe calls allowed at once while half-open
 
-    # Cache
-    cache_ttl_seconds: int = 30
+    # Worker threads for blocking Google Sheets/Drive calls
+    google_io_workers: int = 8
+    google_client_pool_size: int = 2  # pooled Drive services; Sheets keeps this many or more connections
 
     model_config = {"env_file": ".env", "env_file_encoding": "utf-8"}
 
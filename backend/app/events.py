@@ -0,0 +1,113 @@
+"""In-process publish/subscribe for inventory change events.
+
+SheetsService publishes from worker threads; each connected stream client
+owns an asyncio queue on the event loop. A short history lets reconnecting
+clients resume from their Last-Event-ID.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+HISTORY_SIZE = 500  # events kept for Last-Event-ID replay
+QUEUE_SIZE = 1000  # per-subscriber backlog before it is dropped
+
+
+@dataclass
+class Event:
+    id: str
+    event: str
+    data: str  # JSON
+
+    def encode(self) -> str:
+        return f"id: {self.id}\nevent: {self.event}\ndata: {self.data}\n\n"
+
+
+@dataclass(eq=False)
+class _Subscriber:
+    loop: asyncio.AbstractEventLoop
+    queue: asyncio.Queue
+    dropped: bool = False  # set when the client fell too far behind
+
+
+class EventBroker:
+    """Fans events out to stream subscribers. publish() is thread-safe."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._epoch = uuid.uuid4().hex[:8]  # ids from a previous process can't be replayed
+        self._seq = 0
+        self._history: deque[Event] = deque(maxlen=HISTORY_SIZE)
+        self._subscribers: list[_Subscriber] = []
+
+    def publish(self, event: str, data: dict):
+        with self._lock:
+            self._seq += 1
+            item = Event(f"{self._epoch}.{self._seq}", event, json.dumps(data, separators=(",", ":")))
+            self._history.append(item)
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            try:
+                sub.loop.call_soon_threadsafe(self._deliver, sub, item)
+            except RuntimeError:  # loop closed
+                self._remove(sub)
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> tuple[_Subscriber, list[Event]]:
+        """Register a subscriber; returns it with the events it missed.
+
+        If last_event_id can't be resumed from (another process, or older than
+        the history), the backlog is a single ``resync`` event telling the
+        client to refetch.
+        """
+        sub = _Subscriber(asyncio.get_running_loop(), asyncio.Queue(maxsize=QUEUE_SIZE))
+        with self._lock:
+            self._subscribers.append(sub)
+            backlog = self._backlog(last_event_id)
+        return sub, backlog
+
+    def unsubscribe(self, sub: _Subscriber):
+        self._remove(sub)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def _backlog(self, last_event_id: Optional[str]) -> list[Event]:
+        if not last_event_id:
+            return []
+        epoch, _, number = last_event_id.partition(".")
+        if epoch != self._epoch or not number.isdigit():
+            return [self._resync()]
+        last = int(number)
+        if last >= self._seq:
+            return []
+        if not self._history or int(self._history[0].id.rsplit(".", 1)[1]) > last + 1:
+            return [self._resync()]
+        return [e for e in self._history if int(e.id.rsplit(".", 1)[1]) > last]
+
+    def _resync(self) -> Event:
+        return Event(f"{self._epoch}.{self._seq}", "resync", "{}")
+
+    def _deliver(self, sub: _Subscriber, item: Event):
+        try:
+            sub.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # Slow client: drop it, it will reconnect and replay from history
+            logger.warning("Dropping stream subscriber with a full queue")
+            sub.dropped = True
+            self._remove(sub)
+
+    def _remove(self, sub: _Subscriber):
+        with self._lock:
+            if sub in self._subscribers:
+                self._subscribers.remove(sub)
+
+
+broker = EventBroker()
@@ -0,0 +1,44 @@
+"""Bounded thread pool for blocking Google API I/O.
+
+gspread and googleapiclient are synchronous. Routes hand their calls to this
+pool so the event loop keeps serving other requests (and /health) while a
+Sheets read or Drive upload is in flight. The pool has its own worker limit,
+separate from Starlette's default thread pool, so Google I/O can't starve it.
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+from .config import get_settings
+
+T = TypeVar("T")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=get_settings().google_io_workers,
+                    thread_name_prefix="google-io",
+                )
+    return _executor
+
+
+async def run_blocking(func: Callable[..., T], *args, **kwargs) -> T:
+    """Run a blocking call on the Google I/O pool and await its result.
+
+    The caller's context is carried over so per-request accounting still
+    attributes the call to the right endpoint.
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(get_executor(), functools.partial(ctx.run, func, *args, **kwargs))
@@ -0,0 +1,126 @@
+"""Shared, lazily built Google API clients.
+
+One service-account credential backs both Sheets and Drive, so its access
+token is minted once and reused until it nears expiry instead of once per
+client. The gspread session keeps a pool of persistent HTTPS connections
+sized for the Google I/O threads. Drive services (httplib2-based, not
+thread-safe) are kept in a small pool and checked out one caller at a
+time, so an upload doesn't rebuild the API client from the discovery doc.
+"""
+
+import json
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+import gspread
+from google.auth.transport.requests import AuthorizedSession
+from google.oauth2.service_account import Credentials as SACredentials
+from requests.adapters import HTTPAdapter
+
+from .config import get_settings
+
+SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive",
+]
+
+
+class GoogleClients:
+    """Credentials, a Sheets client and a Drive service pool, built on first use."""
+
+    def __init__(self):
+        self._settings = get_settings()
+        self._lock = threading.Lock()
+        self._credentials: Optional[SACredentials] = None
+        self._sheets: Optional[gspread.Client] = None
+        self._drive_available = threading.Condition(self._lock)
+        self._drive_idle: list = []
+        self._drive_built = 0
+
+    @property
+    def pool_size(self) -> int:
+        return max(1, self._settings.google_client_pool_size)
+
+    def credentials(self) -> SACredentials:
+        with self._lock:
+            return self._get_credentials()
+
+    def _get_credentials(self) -> SACredentials:
+        # Called with _lock held
+        if self._credentials is None:
+            creds_json = self._settings.google_credentials_json
+            if not creds_json:
+                raise RuntimeError("GOOGLE_CREDENTIALS_JSON not set")
+            self._credentials = SACredentials.from_service_account_info(json.loads(creds_json), scopes=SCOPES)
+        return self._credentials
+
+    def sheets(self) -> gspread.Client:
+        """The shared gspread client; its session keeps connections alive."""
+        with self._lock:
+            if self._sheets is None:
+                creds = self._get_credentials()
+                session = AuthorizedSession(creds)
+                # One pool per host, big enough that every I/O thread can hold
+                # a connection instead of opening and discarding extras
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(self.pool_size, self._settings.google_io_workers))
+                session.mount("https://", adapter)
+                self._sheets = gspread.Client(auth=creds, session=session)
+            return self._sheets
+
+    @contextmanager
+    def drive(self):
+        """Check out a Drive v3 service for the duration of the block.
+
+        Up to ``GOOGLE_CLIENT_POOL_SIZE`` services are built; further callers
+        wait for one to be returned.
+        """
+        service = self._checkout_drive()
+        try:
+            yield service
+        finally:
+            with self._drive_available:
+                self._drive_idle.append(service)
+                self._drive_available.notify()
+
+    def _checkout_drive(self):
+        with self._drive_available:
+            while not self._drive_idle and self._drive_built >= self.pool_size:
+                self._drive_available.wait()
+            if self._drive_idle:
+                return self._drive_idle.pop()
+            creds = self._get_credentials()
+            self._drive_built += 1
+        try:
+            # Deferred: googleapiclient adds ~55 ms to start-up and only uploads use it
+            from googleapiclient.discovery import build
+
+            # The discovery doc ships with the client library, so this is local work
+            return build("drive", "v3", credentials=creds, cache_discovery=False, static_discovery=True)
+        except BaseException:
+            with self._drive_available:
+                self._drive_built -= 1
+                self._drive_available.notify()
+            raise
+
+    def stats(self) -> dict:
+        with self._lock:
+            creds = self._credentials
+            return {
+                "pool_size": self.pool_size,
+                "drive_services": self._drive_built,
+                "drive_idle": len(self._drive_idle),
+                "token_valid": bool(creds and creds.valid),
+                "token_expiry": creds.expiry.isoformat() if creds and creds.expiry else None,
+            }
+
+
+# Singleton instance
+_google_clients: Optional[GoogleClients] = None
+
+
+def get_google_clients() -> GoogleClients:
+    global _google_clients
+    if _google_clients is None:
+        _google_clients = GoogleClients()
+    return _google_clients
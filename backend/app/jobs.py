@@ -0,0 +1,318 @@
+"""Durable background queue for filing invoices.
+
+``/api/invoices/file`` allocates the invoice number, stores the job and its
+PDF under ``DATA_DIR`` and returns straight away. A single worker thread then
+uploads the PDF to Drive and appends the Invoices row, retrying each step
+with backoff. Jobs live in SQLite on the machine's volume, so ones that are
+queued or mid-retry when Fly stops the machine are picked up on next start.
+"""
+
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+from .breaker import CircuitOpenError
+from .config import get_settings
+from .scheduler import Lane, priority
+from .sheets import get_sheets_service, parse_invoice_number
+
+logger = logging.getLogger(__name__)
+
+# Job states, in order. A job waiting to retry keeps the state of its step.
+QUEUED = "queued"
+UPLOADING = "uploading"
+LOGGING = "logging"
+DONE = "done"
+FAILED = "failed"
+
+PENDING = (QUEUED, UPLOADING, LOGGING)
+
+MAX_RETRY_DELAY = 300  # seconds
+IDLE_WAIT = 60  # seconds between queue checks when nothing is due
+DONE_RETENTION_DAYS = 30  # finished job rows kept for status lookups
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS invoice_jobs (
+    id TEXT PRIMARY KEY,
+    invoice_number TEXT NOT NULL,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    drive_url TEXT NOT NULL DEFAULT '',
+    drive_error TEXT NOT NULL DEFAULT '',
+    error TEXT NOT NULL DEFAULT '',
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS invoice_jobs_due ON invoice_jobs (status, next_attempt_at);
+"""
+
+JOB_FIELDS = (
+    "id", "invoice_number", "status", "attempts", "drive_url", "drive_error", "error", "created_at", "updated_at",
+)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def invoice_filename(customer_name: str, invoice_date: str) -> str:
+    name_part = customer_name.strip().replace(" ", "_")[:20]
+    date_part = invoice_date.replace("-", "")
+    return f"Invoice_{name_part}_{date_part}.pdf"
+
+
+class InvoiceJobQueue:
+    """SQLite-backed invoice filing jobs with one worker thread."""
+
+    def __init__(self, data_dir: str):
+        self._settings = get_settings()
+        self._dir = Path(data_dir)
+        self._pdf_dir = self._dir / "invoices"
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _db(self) -> sqlite3.Connection:
+        # Called with _lock held
+        if self._conn is None:
+            self._pdf_dir.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self._dir / "jobs.db", check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _pdf_path(self, job_id: str) -> Path:
+        return self._pdf_dir / f"{job_id}.pdf"
+
+    # ------------------------------------------------------------------
+    # Request side
+    # ------------------------------------------------------------------
+
+    def enqueue(self, invoice: dict, pdf_file: BinaryIO) -> dict:
+        """Number the invoice, persist it with its PDF and wake the worker.
+
+        ``invoice`` holds customer_name, invoice_date, items_summary, total and
+        paid. Blocks on disk (and, when the number cache is cold, on the
+        Invoices tab), so call it through ``run_blocking``.
+        """
+        job_id = uuid.uuid4().hex
+        path = self._pdf_path(job_id)
+        with self._lock:
+            self._db()
+        pdf_file.seek(0)
+        try:
+            with open(path, "wb") as out:
+                shutil.copyfileobj(pdf_file, out)
+                out.flush()
+                os.fsync(out.fileno())
+
+            invoice_number = get_sheets_service().next_invoice_number()
+            now = _now()
+            with self._lock:
+                self._db().execute(
+                    "INSERT INTO invoice_jobs (id, invoice_number, status, payload, created_at, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (job_id, invoice_number, QUEUED, json.dumps(invoice), now, now),
+                )
+        except BaseException:
+            path.unlink(missing_ok=True)
+            raise
+        logger.info("Queued %s as job %s", invoice_number, job_id)
+        self._wake.set()
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._db().execute(
+                f"SELECT {', '.join(JOB_FIELDS)} FROM invoice_jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    # ------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Resume pending jobs and start the worker thread."""
+        if self._thread is not None:
+            return
+        with self._lock:
+            db = self._db()
+            cutoff = time.time() - DONE_RETENTION_DAYS * 86400
+            stale = datetime.fromtimestamp(cutoff, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+            db.execute("DELETE FROM invoice_jobs WHERE status = ? AND updated_at < ?", (DONE, stale))
+            numbers = [r[0] for r in db.execute("SELECT invoice_number FROM invoice_jobs")]
+            pending = db.execute(
+                f"SELECT COUNT(*) FROM invoice_jobs WHERE status IN ({','.join('?' * len(PENDING))})", PENDING
+            ).fetchone()[0]
+        # Numbers handed out for jobs not yet in the sheet must not be reused
+        highest = max((parse_invoice_number(n) or 0 for n in numbers), default=0)
+        get_sheets_service().reserve_invoice_numbers(highest)
+        if pending:
+            logger.info("Resuming %d pending invoice jobs", pending)
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="invoice-jobs", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the worker. A job cut off mid-step is retried on next start."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        with priority(Lane.BACKGROUND):
+            self._work()
+
+    def _work(self):
+        while not self._stop.is_set():
+            job, wait = self._next_due()
+            if job is None:
+                self._wake.wait(wait)
+                self._wake.clear()
+                continue
+            try:
+                self._process(job)
+            except Exception:
+                logger.exception("Invoice job %s crashed", job["id"])
+                self._update(job["id"], status=FAILED, error="Internal error")
+
+    def _next_due(self) -> tuple[Optional[dict], float]:
+        """The oldest job due now, or None and how long until one is."""
+        now = time.time()
+        with self._lock:
+            row = self._db().execute(
+                f"SELECT * FROM invoice_jobs WHERE status IN ({','.join('?' * len(PENDING))})"
+                " ORDER BY next_attempt_at, created_at LIMIT 1",
+                PENDING,
+            ).fetchone()
+        if row is None:
+            return None, IDLE_WAIT
+        if row["next_attempt_at"] > now:
+            return None, min(row["next_attempt_at"] - now, IDLE_WAIT)
+        return dict(row), 0
+
+    def _update(self, job_id: str, **fields):
+        fields["updated_at"] = _now()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._db().execute(f"UPDATE invoice_jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def _retry_delay(self, attempts: int) -> float:
+        return min(self._settings.invoice_job_retry_seconds * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+
+    def _process(self, job: dict):
+        invoice = json.loads(job["payload"])
+        job_id = job["id"]
+        if job["status"] == QUEUED:
+            job["status"] = UPLOADING
+            self._update(job_id, status=UPLOADING)
+
+        if job["status"] == UPLOADING:
+            if not self._upload(job, invoice):
+                return
+            job["status"] = LOGGING
+            job["attempts"] = 0
+
+        if job["status"] == LOGGING:
+            self._log(job, invoice)
+
+    def _upload(self, job: dict, invoice: dict) -> bool:
+        """Upload the PDF; False while it still has retries to come."""
+        job_id = job["id"]
+        path = self._pdf_path(job_id)
+        if not self._settings.google_drive_folder_id:
+            logger.warning("GOOGLE_DRIVE_FOLDER_ID not set — skipping Drive upload")
+            self._update(job_id, status=LOGGING, attempts=0, drive_error="GOOGLE_DRIVE_FOLDER_ID is not configured")
+            return True
+        if not path.exists() or path.stat().st_size == 0:
+            self._update(job_id, status=LOGGING, attempts=0)
+            return True
+
+        attempts = job["attempts"] + 1
+        try:
+            with open(path, "rb") as pdf:
+                drive_url = get_sheets_service().upload_to_drive(
+                    pdf, invoice_filename(invoice["customer_name"], invoice["invoice_date"])
+                )
+        except CircuitOpenError as exc:
+            # Nothing was attempted, so no retry is used up
+            self._update(job_id, next_attempt_at=time.time() + exc.retry_after, drive_error=str(exc))
+            return False
+        except Exception as exc:
+            if attempts < self._settings.invoice_job_max_attempts:
+                delay = self._retry_delay(attempts)
+                logger.warning("Drive upload for %s failed (attempt %d), retrying in %.0fs: %s",
+                               job["invoice_number"], attempts, delay, exc)
+                self._update(job_id, attempts=attempts, next_attempt_at=time.time() + delay, drive_error=str(exc))
+                return False
+            # Out of retries: still log the invoice, as the synchronous route did
+            logger.error("Drive upload failed for %s: %s", job["invoice_number"], exc, exc_info=True)
+            self._update(job_id, status=LOGGING, attempts=0, next_attempt_at=0, drive_error=str(exc))
+            return True
+
+        job["drive_url"] = drive_url
+        self._update(job_id, status=LOGGING, attempts=0, next_attempt_at=0, drive_url=drive_url, drive_error="")
+        return True
+
+    def _log(self, job: dict, invoice: dict):
+        job_id = job["id"]
+        attempts = job["attempts"] + 1
+        try:
+            get_sheets_service().log_invoice(
+                invoice_number=job["invoice_number"],
+                customer_name=invoice["customer_name"],
+                invoice_date=invoice["invoice_date"],
+                items_summary=invoice["items_summary"],
+                total=invoice["total"],
+                paid=invoice["paid"],
+                drive_url=job["drive_url"],
+            )
+        except CircuitOpenError as exc:
+            self._update(job_id, next_attempt_at=time.time() + exc.retry_after, error=str(exc))
+            return
+        except Exception as exc:
+            if attempts < self._settings.invoice_job_max_attempts:
+                delay = self._retry_delay(attempts)
+                logger.warning("Logging %s failed (attempt %d), retrying in %.0fs: %s",
+                               job["invoice_number"], attempts, delay, exc)
+                self._update(job_id, attempts=attempts, next_attempt_at=time.time() + delay, error=str(exc))
+            else:
+                # The PDF is kept under DATA_DIR for manual recovery
+                logger.error("Giving up on %s after %d attempts: %s", job["invoice_number"], attempts, exc)
+                self._update(job_id, status=FAILED, attempts=attempts, error=str(exc))
+            return
+
+        self._update(job_id, status=DONE, attempts=attempts, error="")
+        self._pdf_path(job_id).unlink(missing_ok=True)
+        logger.info("Filed %s (job %s)", job["invoice_number"], job_id)
+
+
+# Singleton instance
+_invoice_jobs: Optional[InvoiceJobQueue] = None
+
+
+def get_invoice_jobs() -> InvoiceJobQueue:
+    global _invoice_jobs
+    if _invoice_jobs is None:
+        _invoice_jobs = InvoiceJobQueue(get_settings().data_dir)
+    return _invoice_jobs
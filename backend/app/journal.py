@@ -0,0 +1,336 @@
+"""Write-ahead journal for inventory changes.
+
+Adjustments, markup changes and reorder-point changes are committed to
+SQLite under ``DATA_DIR`` and acknowledged straight away. The change is
+applied to the in-memory index at once, so reads see it before the sheet
+does. A single worker thread then replays the journal to the sheet in
+order, as many changes per round trip as have built up. Entries stay in
+the journal until the sheet has them, so a sale made while Google is slow
+or down is written once it is back, even across a machine restart.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Optional
+
+from .config import get_settings
+from .metrics import Counter
+from .scheduler import Lane, priority
+
+logger = logging.getLogger(__name__)
+
+# Kinds of change
+ADJUST = "adjust"
+MARKUP = "markup"
+REORDER = "reorder"
+
+# Entry states. A "sent" entry's writes may have reached the sheet before
+# the replay was cut short, so its replay checks for them first.
+PENDING = "pending"
+SENT = "sent"
+DONE = "done"
+FAILED = "failed"
+
+MAX_RETRY_DELAY = 60  # seconds
+IDLE_WAIT = 60  # seconds between checks when nothing is pending
+DONE_RETENTION_DAYS = 7  # replicated entries (and request keys) kept for lookups
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS journal (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    material_no TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT NOT NULL DEFAULT '',
+    created_at REAL NOT NULL,
+    replicated_at REAL
+);
+CREATE INDEX IF NOT EXISTS journal_status ON journal (status, seq);
+CREATE TABLE IF NOT EXISTS request_keys (
+    key TEXT PRIMARY KEY,
+    created_at REAL NOT NULL
+);
+"""
+
+replicated = Counter(
+    "inventory_journal_replicated_total",
+    "Journaled inventory changes written to the sheet, or given up on.",
+    ("kind", "status"),
+)
+
+
+def _timestamp(seconds: Optional[float]) -> Optional[str]:
+    if seconds is None:
+        return None
+    return datetime.fromtimestamp(seconds, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class WriteJournal:
+    """SQLite-backed journal of inventory changes with one replay thread.
+
+    Entries are dicts with ``seq``, ``kind``, ``material_no``, ``status``,
+    ``created_at`` and the change itself in ``data``. ``replicate(entries)``
+    writes a batch to the sheet, oldest first, and must call ``complete``
+    once it has. If it raises, the whole batch is retried with backoff.
+    """
+
+    def __init__(self, path: Path, replicate: Callable[[list[dict]], None]):
+        self._settings = get_settings()
+        self._path = Path(path)
+        self._replicate = replicate
+        self._lock = threading.Lock()
+        self._drained = threading.Condition(self._lock)
+        self._conn: Optional[sqlite3.Connection] = None
+        # Entries not yet in the sheet, oldest first, and their seqs per product
+        self._pending: dict[int, dict] = {}
+        self._by_material: dict[str, list[int]] = defaultdict(list)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._attempts = 0  # failed replays of the oldest batch in a row
+        self._retry_at = 0.0
+        self._last_error = ""
+        self._last_replicated_at: Optional[float] = None
+        self._replicated = 0
+        self._batches = 0
+        self._last_batch_size = 0
+
+    def _db(self) -> sqlite3.Connection:
+        # Called with _lock held
+        if self._conn is None:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self._path, check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            conn.executescript(SCHEMA)
+            for row in conn.execute(
+                "SELECT * FROM journal WHERE status IN (?, ?) ORDER BY seq", (PENDING, SENT)
+            ):
+                self._add_pending({
+                    "seq": row["seq"],
+                    "kind": row["kind"],
+                    "material_no": row["material_no"],
+                    "status": row["status"],
+                    "created_at": row["created_at"],
+                    "data": json.loads(row["payload"]),
+                })
+            self._conn = conn
+        return self._conn
+
+    def _add_pending(self, entry: dict):
+        self._pending[entry["seq"]] = entry
+        self._by_material[entry["material_no"]].append(entry["seq"])
+
+    # ------------------------------------------------------------------
+    # Request side
+    # ------------------------------------------------------------------
+
+    def record(self, changes: list[tuple[str, str, dict]], key: Optional[str] = None) -> Optional[int]:
+        """Commit (kind, material_no, data) changes in one transaction and
+        wake the replay thread.
+
+        Returns the seq of the last change. With ``key``, a key already seen
+        (a retried request) records nothing and returns None.
+        """
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                if key is not None and db.execute(
+                    "INSERT OR IGNORE INTO request_keys (key, created_at) VALUES (?, ?)", (key, now)
+                ).rowcount == 0:
+                    db.execute("ROLLBACK")
+                    return None
+                entries = []
+                for kind, material_no, data in changes:
+                    cursor = db.execute(
+                        "INSERT INTO journal (kind, material_no, payload, status, created_at) VALUES (?, ?, ?, ?, ?)",
+                        (kind, material_no, json.dumps(data), PENDING, now),
+                    )
+                    entries.append({
+                        "seq": cursor.lastrowid, "kind": kind, "material_no": material_no,
+                        "status": PENDING, "created_at": now, "data": data,
+                    })
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            for entry in entries:
+                self._add_pending(entry)
+        self._wake.set()
+        return entries[-1]["seq"] if entries else None
+
+    def pending_by_material(self, after_seq: int = 0) -> dict[str, list[dict]]:
+        """Entries not yet in the sheet, per product, oldest first."""
+        with self._lock:
+            self._db()
+            return {
+                material_no: [self._pending[seq] for seq in seqs if seq > after_seq]
+                for material_no, seqs in self._by_material.items()
+            }
+
+    def pending(self) -> list[dict]:
+        """Every entry not yet in the sheet, oldest first."""
+        with self._lock:
+            self._db()
+            return list(self._pending.values())
+
+    # ------------------------------------------------------------------
+    # Replay side
+    # ------------------------------------------------------------------
+
+    def mark_sent(self, entries: list[dict]):
+        """Persist a batch's final values just before they are written."""
+        with self._lock:
+            self._db().executemany(
+                "UPDATE journal SET status = ?, payload = ? WHERE seq = ?",
+                [(SENT, json.dumps(entry["data"]), entry["seq"]) for entry in entries],
+            )
+            for entry in entries:
+                if entry["seq"] in self._pending:
+                    self._pending[entry["seq"]].update(status=SENT, data=entry["data"])
+
+    def complete(self, entries: list[dict], failed: Optional[dict[int, str]] = None):
+        """Drop a replicated batch from the pending set.
+
+        ``failed`` maps the seqs of entries that can never be applied (their
+        product is gone) to the reason; they are kept in the journal as
+        failed for manual recovery.
+        """
+        failed = failed or {}
+        now = time.time()
+        with self._lock:
+            self._db().executemany(
+                "UPDATE journal SET status = ?, error = ?, replicated_at = ? WHERE seq = ?",
+                [(FAILED if e["seq"] in failed else DONE, failed.get(e["seq"], ""), now, e["seq"]) for e in entries],
+            )
+            for entry in entries:
+                self._pending.pop(entry["seq"], None)
+                seqs = self._by_material.get(entry["material_no"])
+                if seqs is not None:
+                    seqs.remove(entry["seq"])
+                    if not seqs:
+                        del self._by_material[entry["material_no"]]
+                status = FAILED if entry["seq"] in failed else DONE
+                replicated.inc(entry["kind"], status)
+            self._replicated += len(entries) - len(failed)
+            self._batches += 1
+            self._last_batch_size = len(entries)
+            self._last_replicated_at = now
+            self._attempts = 0
+            self._retry_at = 0.0
+            self._last_error = ""
+            if not self._pending:
+                self._drained.notify_all()
+        for entry in entries:
+            if entry["seq"] in failed:
+                logger.error("Dropped journaled %s of %s: %s", entry["kind"], entry["material_no"], failed[entry["seq"]])
+
+    def start(self):
+        """Load the pending entries and start the replay thread."""
+        if self._thread is not None:
+            return
+        cutoff = time.time() - DONE_RETENTION_DAYS * 86400
+        with self._lock:
+            db = self._db()
+            db.execute("DELETE FROM journal WHERE status = ? AND replicated_at < ?", (DONE, cutoff))
+            db.execute("DELETE FROM request_keys WHERE created_at < ?", (cutoff,))
+            pending = len(self._pending)
+        if pending:
+            logger.info("Replaying %d journaled inventory changes", pending)
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="journal-replay", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the replay thread. Changes not yet replayed are kept for next start."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """Wait until every recorded change is in the sheet; False on timeout."""
+        self._wake.set()
+        with self._drained:
+            self._db()
+            return self._drained.wait_for(lambda: not self._pending, timeout)
+
+    def _run(self):
+        with priority(Lane.BACKGROUND):
+            self._work()
+
+    def _work(self):
+        while not self._stop.is_set():
+            batch, wait = self._next_batch()
+            if not batch:
+                self._wake.wait(wait)
+                self._wake.clear()
+                continue
+            try:
+                self._replicate(batch)
+            except Exception as exc:
+                self._retry_later(batch, exc)
+
+    def _next_batch(self) -> tuple[list[dict], float]:
+        """The oldest pending entries, or none and how long to wait."""
+        with self._lock:
+            self._db()
+            if not self._pending:
+                return [], IDLE_WAIT
+            wait = self._retry_at - time.time()
+            if wait > 0:
+                return [], wait
+            batch = []
+            for entry in self._pending.values():
+                batch.append({**entry, "data": dict(entry["data"])})
+                if len(batch) >= self._settings.journal_batch_size:
+                    break
+            return batch, 0
+
+    def _retry_later(self, batch: list[dict], exc: Exception):
+        with self._lock:
+            self._attempts += 1
+            delay = min(self._settings.journal_retry_seconds * 2 ** (self._attempts - 1), MAX_RETRY_DELAY)
+            self._retry_at = time.time() + delay
+            self._last_error = str(exc) or type(exc).__name__
+            self._db().executemany(
+                "UPDATE journal SET attempts = attempts + 1, error = ? WHERE seq = ?",
+                [(self._last_error, entry["seq"]) for entry in batch],
+            )
+            attempts = self._attempts
+        logger.warning("Replaying %d journaled changes failed (attempt %d), retrying in %.0fs: %s",
+                       len(batch), attempts, delay, exc)
+
+    def stats(self) -> dict:
+        """Replication lag (age of the oldest change not yet in the sheet) and progress."""
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            failed = db.execute("SELECT COUNT(*) FROM journal WHERE status = ?", (FAILED,)).fetchone()[0]
+            oldest = next(iter(self._pending.values()), None)
+            return {
+                "pending": len(self._pending),
+                "failed": failed,
+                "lag_seconds": round(now - oldest["created_at"], 1) if oldest else 0.0,
+                "oldest_pending_at": _timestamp(oldest["created_at"]) if oldest else None,
+                "replicated": self._replicated,
+                "batches": self._batches,
+                "last_batch_size": self._last_batch_size,
+                "last_replicated_at": _timestamp(self._last_replicated_at),
+                "last_error": self._last_error,
+                "retry_in_seconds": round(max(0.0, self._retry_at - now), 1),
+            }
@@ -1,22 +1,71 @@
 """Purina Inventory Tracker - FastAPI Backend."""
 
+import asyncio
+import logging
+import math
+import time
+from contextlib import asynccontextmanager
 from pathlib import Path
 
+import gspread
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
+from starlette.routing import NoMatchFound
 
+from .breaker import CircuitOpenError
+from .cache import track_staleness
 from .config import get_settings
-from .routes import auth_router, products_router, inventory_router, pricelist_router, invoices_router
+from .executor import run_blocking
+from .jobs import get_invoice_jobs
+from .metrics import api_calls, error_status, http_request_seconds, http_requests, start_metrics_server
+from .scheduler import RETRYABLE_STATUSES
+from .routes import auth_router, products_router, inventory_router, pricelist_router, invoices_router, stats_router
+from .sheets import get_sheets_service
+
+logger = logging.getLogger(__name__)
 
 settings = get_settings()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Serve the last snapshot while the caches reload, so the first request
+    # after an auto-stop doesn't wait on Google. The warm-up runs behind the
+    # server starting; requests that beat it wait on the same loads.
+    svc = get_sheets_service()
+    svc.load_local_snapshot()
+    warm_up = asyncio.create_task(run_blocking(svc.warm_up))
+    # Resume invoice filings left over from before the machine last stopped
+    jobs = get_invoice_jobs()
+    jobs.start()
+    # Replay inventory changes journaled but not yet written to the sheet
+    svc.start_journal()
+    # Prometheus metrics on a private port for Fly's scraper
+    metrics_server = None
+    if settings.metrics_port:
+        try:
+            metrics_server = start_metrics_server(settings.metrics_host, settings.metrics_port, svc.cache_stats)
+        except OSError as exc:
+            logger.warning("Metrics not served on port %d: %s", settings.metrics_port, exc)
+    yield
+    warm_up.cancel()
+    if metrics_server is not None:
+        metrics_server.shutdown()
+        metrics_server.server_close()
+    jobs.stop()
+    svc.stop_journal()
+    svc.save_local_snapshot()
+
+
 app = FastAPI(
     title="Purina Inventory Tracker API",
     version="1.0.0",
     docs_url="/docs",
     redoc_url=None,
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -25,7 +74,89 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Google-API-Calls", "X-Data-Stale"],
 )
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+
+@app.exception_handler(gspread.exceptions.APIError)
+async def google_api_error(request: Request, exc: gspread.exceptions.APIError):
+    """Sheets still over quota or failing after retries: tell the client to retry."""
+    if error_status(exc) in RETRYABLE_STATUSES:
+        return JSONResponse(
+            {"detail": "Google Sheets is busy, please try again shortly"},
+            status_code=503,
+            headers={"Retry-After": "30"},
+        )
+    return JSONResponse({"detail": f"Google Sheets error: {exc}"}, status_code=502)
+
+
+@app.exception_handler(CircuitOpenError)
+async def google_unavailable(request: Request, exc: CircuitOpenError):
+    """Google failing fast and nothing cached to serve instead: tell the client when to retry."""
+    return JSONResponse(
+        {"detail": f"Google {exc.target.capitalize()} is unavailable, please try again shortly"},
+        status_code=503,
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
+
+
+_route_labels: dict[int, str] = {}
+
+
+def route_label(request: Request) -> str:
+    """The matched route template, e.g. /api/products/{material_no}/markup.
+
+    Requests no route matched share one label, so scanners can't blow up the
+    series count.
+    """
+    route = request.scope.get("route")
+    if route is None:
+        return "unmatched"
+    label = _route_labels.get(id(route))
+    if label is None:
+        # The route's own path lacks the router's /api prefix; ask the app for
+        # the full path with each parameter standing in for its value
+        params = {name: f"{{{name}}}" for name in request.path_params}
+        try:
+            label = str(request.app.url_path_for(route.name, **params))
+        except NoMatchFound:
+            label = route.path
+        _route_labels[id(route)] = label
+    return label
+
+
+@app.middleware("http")
+async def count_google_api_calls(request: Request, call_next):
+    """Tally the Google API calls each request makes, and its latency, per route."""
+    start = time.perf_counter()
+    status = 500  # if the route raises
+    try:
+        with api_calls.track() as calls:
+            response = await call_next(request)
+        status = response.status_code
+    finally:
+        path = route_label(request)
+        http_requests.inc(request.method, path, str(status))
+        http_request_seconds.observe(request.method, path, value=time.perf_counter() - start)
+        if path.startswith("/api/"):
+            api_calls.add_request(f"{request.method} {path}", calls)
+    response.headers["X-Google-API-Calls"] = str(sum(calls.values()))
+    return response
+
+
+@app.middleware("http")
+async def mark_stale_responses(request: Request, call_next):
+    """Flag responses built from cached data that could not be refreshed.
+
+    X-Data-Stale is the age in seconds of the oldest such data served; it is
+    absent when everything came fresh or from a cache that is refreshing fine.
+    """
+    with track_staleness() as stale:
+        response = await call_next(request)
+    if stale:
+        response.headers["X-Data-Stale"] = str(math.floor(max(stale.values())))
+    return response
 
 # Register API routers
 app.include_router(auth_router, prefix="/api")
@@ -33,11 +164,19 @@ app.include_router(products_router, prefix="/api")
 app.include_router(inventory_router, prefix="/api")
 app.include_router(pricelist_router, prefix="/api")
 app.include_router(invoices_router, prefix="/api")
+app.include_router(stats_router, prefix="/api")
 
 
 @app.get("/health")
 async def health():
-    return {"status": "healthy"}
+    """Liveness, plus the Google circuit breakers.
+
+    Stays 200 while a breaker is open, with status "degraded": reads are
+    served from cache and inventory changes journaled until Google is back.
+    """
+    breakers = get_sheets_service().breaker_stats()
+    degraded = any(b["state"] != "closed" for b in breakers.values())
+    return {"status": "degraded" if degraded else "healthy", "breakers": breakers}
 
 
 # Static file serving (production)
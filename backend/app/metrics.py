@@ -0,0 +1,265 @@
+"""Per-endpoint accounting of Google API calls, and Prometheus metrics."""
+
+import bisect
+import socket
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+# Mutable per-request tally; the dict is shared with the tasks and threads a
+# request fans out to, so calls made anywhere on its behalf are counted.
+_request_calls: ContextVar[Optional[dict[str, int]]] = ContextVar("request_calls", default=None)
+
+
+class ApiCallCounter:
+    """Counts Google API round trips, broken down by endpoint and operation."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints: dict[str, dict] = {}
+
+    @contextmanager
+    def track(self):
+        """Collect the calls made while handling one request."""
+        calls: dict[str, int] = {}
+        token = _request_calls.set(calls)
+        try:
+            yield calls
+        finally:
+            _request_calls.reset(token)
+
+    def record(self, op: str):
+        """Record one API call against the current request, if any."""
+        calls = _request_calls.get()
+        if calls is not None:
+            calls[op] = calls.get(op, 0) + 1
+
+    def add_request(self, endpoint: str, calls: dict[str, int]):
+        """Fold one finished request's tally into the endpoint totals."""
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, {"requests": 0, "calls": 0, "by_op": {}})
+            stats["requests"] += 1
+            for op, n in calls.items():
+                stats["calls"] += n
+                stats["by_op"][op] = stats["by_op"].get(op, 0) + n
+
+    def snapshot(self) -> dict[str, dict]:
+        with self._lock:
+            return {
+                endpoint: {
+                    "requests": s["requests"],
+                    "calls": s["calls"],
+                    "calls_per_request": round(s["calls"] / s["requests"], 2) if s["requests"] else 0,
+                    "by_op": dict(s["by_op"]),
+                }
+                for endpoint, s in sorted(self._endpoints.items())
+            }
+
+    def reset(self):
+        with self._lock:
+            self._endpoints = {}
+
+
+api_calls = ApiCallCounter()
+
+
+# ----------------------------------------------------------------------
+# Prometheus metrics
+# ----------------------------------------------------------------------
+
+# Seconds; Sheets reads sit around 0.2-1s, uploads and full-tab reads longer
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry: list = []  # every Counter, Gauge and Histogram, in creation order, for /metrics
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    """A labelled monotonic counter. Updates take one lock and a dict lookup."""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...]):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        self._values: dict[tuple, float] = {}
+        _registry.append(self)
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in values]
+        return lines
+
+
+class Histogram:
+    """A labelled histogram with fixed buckets."""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...], buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._values: dict[tuple, list[float]] = {}
+        _registry.append(self)
+
+    def observe(self, *labels, value: float):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [0] * (len(self.buckets) + 2)
+            series[i] += 1
+            series[-1] += value
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = sorted((k, list(v)) for k, v in self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in values:
+            cumulative = 0
+            for bound, n in zip((*self.buckets, "+Inf"), series):
+                cumulative += n
+                le = 'le="%s"' % (bound if bound == "+Inf" else _number(bound))
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """A labelled value that can go up and down."""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...]):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        self._values: dict[tuple, float] = {}
+        _registry.append(self)
+
+    def set(self, *labels, value: float):
+        with self._lock:
+            self._values[labels] = value
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        lines += [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in values]
+        return lines
+
+
+google_calls = Counter("google_api_calls_total", "Google API calls made.", ("tab", "op"))
+google_call_seconds = Histogram("google_api_call_duration_seconds", "Google API call latency.", ("tab", "op"))
+google_errors = Counter("google_api_errors_total", "Google API calls that failed, by HTTP status.", ("tab", "op", "status"))
+google_quota_errors = Counter("google_api_quota_errors_total", "Google API calls rejected for quota (HTTP 429).", ("tab", "op"))
+http_requests = Counter("http_requests_total", "HTTP requests handled.", ("method", "route", "status"))
+http_request_seconds = Histogram("http_request_duration_seconds", "Time to response start per route.", ("method", "route"))
+
+CACHE_RESULTS = {
+    "hits": "hit", "stale_hits": "stale", "misses": "miss", "coalesced": "coalesced", "fallbacks": "fallback",
+}
+
+
+def error_status(exc: BaseException) -> str:
+    """HTTP status of a gspread or googleapiclient error, or 'error'."""
+    response = getattr(exc, "response", None)  # gspread APIError
+    status = getattr(response, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "resp", None), "status", None)  # googleapiclient HttpError
+    return str(status) if status is not None else "error"
+
+
+def observe_google_call(tab: str, op: str, seconds: float, exc: Optional[BaseException] = None):
+    google_calls.inc(tab, op)
+    google_call_seconds.observe(tab, op, value=seconds)
+    if exc is not None:
+        status = error_status(exc)
+        google_errors.inc(tab, op, status)
+        if status == "429":
+            google_quota_errors.inc(tab, op)
+
+
+def _render_cache(stats: dict[str, dict]) -> list[str]:
+    lines = [
+        "# HELP sheets_cache_requests_total Cache lookups by result.",
+        "# TYPE sheets_cache_requests_total counter",
+    ]
+    for key, s in sorted(stats.items()):
+        lines += [f'sheets_cache_requests_total{{key="{key}",result="{r}"}} {s[f]}' for f, r in CACHE_RESULTS.items()]
+    lines += ["# HELP sheets_cache_refreshes_total Background revalidations started.",
+              "# TYPE sheets_cache_refreshes_total counter"]
+    lines += [f'sheets_cache_refreshes_total{{key="{k}"}} {s["refreshes"]}' for k, s in sorted(stats.items())]
+    lines += ["# HELP sheets_cache_refresh_errors_total Background revalidations that failed.",
+              "# TYPE sheets_cache_refresh_errors_total counter"]
+    lines += [f'sheets_cache_refresh_errors_total{{key="{k}"}} {s["refresh_errors"]}' for k, s in sorted(stats.items())]
+    lines += ["# HELP sheets_cache_age_seconds Age of the cached entry.", "# TYPE sheets_cache_age_seconds gauge"]
+    lines += [
+        f'sheets_cache_age_seconds{{key="{k}"}} {_number(s["age_seconds"])}'
+        for k, s in sorted(stats.items()) if s["age_seconds"] is not None
+    ]
+    return lines
+
+
+def render_prometheus(cache_stats: dict[str, dict]) -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines: list[str] = []
+    for metric in _registry:
+        lines += metric.render()
+    lines += _render_cache(cache_stats)
+    return "\n".join(lines) + "\n"
+
+
+def start_metrics_server(host: str, port: int, cache_stats: Callable[[], dict[str, dict]]):
+    """Serve GET /metrics on its own port from a daemon thread.
+
+    Kept off the app's public port: Fly scrapes it over the private network.
+    Returns the server; call ``shutdown()`` to stop it.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # deferred: only when serving
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render_prometheus(cache_stats()).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # a line per scrape is noise
+
+    class Server(ThreadingHTTPServer):
+        address_family = socket.AF_INET6 if ":" in host else socket.AF_INET
+        daemon_threads = True
+
+    server = Server((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
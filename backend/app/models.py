@@ -14,6 +14,11 @@ class LoginResponse(BaseModel):
     expires_in_days: int = 7
 
 
+class StreamTokenResponse(BaseModel):
+    token: str
+    expires_in_seconds: int
+
+
 class Product(BaseModel):
     row_number: int  # 1-indexed row in the sheet (for updates)
     material_no: str
@@ -32,6 +37,13 @@ class Product(BaseModel):
     notes: str
 
 
+class ProductDelta(BaseModel):
+    version: str  # pass back as ?since= on the next request
+    full: bool  # True when products is the whole list rather than a delta
+    products: list[Product]
+    deleted: list[str]  # material numbers removed since the given version
+
+
 class MarkupUpdate(BaseModel):
     markup_pct: float  # e.g. 0.25 for 25%
 
@@ -79,8 +91,13 @@ class FileInvoiceRequest(BaseModel):
     paid: bool = False
 
 
-class FileInvoiceResponse(BaseModel):
-    message: str
+class InvoiceJob(BaseModel):
+    id: str
+    invoice_number: str
+    status: str  # queued, uploading, logging, done, failed
+    attempts: int = 0  # tries of the current step
     drive_url: str = ""
-    invoice_number: str = ""
     drive_error: str = ""
+    error: str = ""
+    created_at: str
+    updated_at: str
@@ -3,5 +3,6 @@ from .products import router as products_router
 from .inventory import router as inventory_router
 from .pricelist import router as pricelist_router
 from .invoices import router as invoices_router
+from .stats import router as stats_router
 
-__all__ = ["auth_router", "products_router", "inventory_router", "pricelist_router", "invoices_router"]
+__all__ = ["auth_router", "products_router", "inventory_router", "pricelist_router", "invoices_router", "stats_router"]
@@ -2,8 +2,8 @@
 
 from fastapi import APIRouter, Depends
 
-from ..auth import create_token, verify_token
-from ..models import LoginRequest, LoginResponse
+from ..auth import create_stream_token, create_token, verify_token
+from ..models import LoginRequest, LoginResponse, StreamTokenResponse
 
 router = APIRouter(tags=["auth"])
 
@@ -17,3 +17,10 @@ async def login(body: LoginRequest):
 @router.get("/auth/verify")
 async def verify(user: str = Depends(verify_token)):
     return {"status": "authenticated", "user": user}
+
+
+@router.post("/auth/stream-token", response_model=StreamTokenResponse)
+async def stream_token(user: str = Depends(verify_token)):
+    """A short-lived token for opening /inventory/stream, which takes it as ?token=."""
+    token, expires_in = create_stream_token(user)
+    return StreamTokenResponse(token=token, expires_in_seconds=expires_in)
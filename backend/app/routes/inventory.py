@@ -1,8 +1,14 @@
 """Inventory routes."""
 
-from fastapi import APIRouter, Depends, Query
+import asyncio
+from typing import Optional
 
-from ..auth import verify_token
+from fastapi import APIRouter, Depends, Header, Query, Request
+from fastapi.responses import StreamingResponse
+
+from ..auth import verify_stream_token, verify_token
+from ..events import broker
+from ..executor import run_blocking
 from ..models import InventoryAdjustment, BulkAdjustment, Product, LogEntry
 from ..sheets import get_sheets_service
 
@@ -11,23 +17,33 @@ router = APIRouter(tags=["inventory"])
 
 @router.post("/inventory/adjust", response_model=Product)
 async def adjust_inventory(
-    body: InventoryAdjustment, user: str = Depends(verify_token)
+    body: InventoryAdjustment,
+    user: str = Depends(verify_token),
+    idempotency_key: Optional[str] = Header(default=None, description="Sent again on retries; applied once"),
 ):
     svc = get_sheets_service()
-    return svc.adjust_inventory(
+    return await run_blocking(
+        svc.adjust_inventory,
         material_no=body.material_no,
         change_type=body.change_type,
         quantity=body.quantity,
         notes=body.notes or "",
         changed_by="web",
+        idempotency_key=idempotency_key,
     )
 
 
 @router.post("/inventory/bulk-adjust", response_model=list[Product])
-async def bulk_adjust(body: BulkAdjustment, user: str = Depends(verify_token)):
+async def bulk_adjust(
+    body: BulkAdjustment,
+    user: str = Depends(verify_token),
+    idempotency_key: Optional[str] = Header(default=None, description="Sent again on retries; applied once"),
+):
     svc = get_sheets_service()
     adjustments = [adj.model_dump() for adj in body.adjustments]
-    return svc.bulk_adjust_inventory(adjustments, changed_by="web")
+    return await run_blocking(
+        svc.bulk_adjust_inventory, adjustments, changed_by="web", idempotency_key=idempotency_key
+    )
 
 
 @router.get("/inventory/log", response_model=list[LogEntry])
@@ -36,10 +52,54 @@ async def get_log(
     user: str = Depends(verify_token),
 ):
     svc = get_sheets_service()
-    return svc.get_log(limit=limit)
+    return await run_blocking(svc.get_log, limit=limit)
 
 
 @router.get("/inventory/low-stock", response_model=list[Product])
 async def get_low_stock(user: str = Depends(verify_token)):
     svc = get_sheets_service()
-    return svc.get_low_stock()
+    return await run_blocking(svc.get_low_stock)
+
+
+STREAM_KEEPALIVE_SECONDS = 15
+
+
+@router.get("/inventory/stream")
+async def stream_changes(
+    request: Request,
+    last_event_id: Optional[str] = Header(default=None),
+    resume_from: Optional[str] = Query(default=None, alias="last_event_id"),
+    user: str = Depends(verify_stream_token),
+):
+    """Server-sent events for product and log changes.
+
+    Event types: ``products`` ({version, products, deleted}), ``log``
+    ({entries}) and ``resync`` (the client should refetch; sent when a
+    Last-Event-ID can't be resumed). Browsers reconnect automatically and
+    send Last-Event-ID, so missed events are replayed. A client opening a
+    new stream, with a fresh stream token, passes it as ?last_event_id=.
+    """
+    sub, backlog = broker.subscribe(last_event_id or resume_from)
+
+    async def events():
+        try:
+            yield "retry: 3000\n\n"
+            for item in backlog:
+                yield item.encode()
+            while not sub.dropped:
+                try:
+                    item = await asyncio.wait_for(sub.queue.get(), timeout=STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                yield item.encode()
+        finally:
+            broker.unsubscribe(sub)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
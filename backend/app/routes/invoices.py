@@ -2,22 +2,27 @@
 
 import json
 
-from fastapi import APIRouter, Depends, File, Form, UploadFile, HTTPException
+from fastapi import APIRouter, Depends, File, Form, Response, UploadFile, HTTPException
 
 from ..auth import verify_token
-from ..models import FileInvoiceResponse
-from ..sheets import get_sheets_service
+from ..executor import run_blocking
+from ..jobs import get_invoice_jobs
+from ..models import InvoiceJob
 
 router = APIRouter(tags=["invoices"])
 
 
-@router.post("/invoices/file", response_model=FileInvoiceResponse)
+@router.post("/invoices/file", response_model=InvoiceJob, status_code=202)
 async def file_invoice(
+    response: Response,
     invoice_data: str = Form(...),
     pdf: UploadFile = File(...),
     user: str = Depends(verify_token),
 ):
-    """File an invoice: log to Google Sheets and upload PDF to Google Drive."""
+    """Queue an invoice for filing: number it now, upload to Drive and log to Sheets in the background.
+
+    Returns 202 with the job; poll ``/api/invoices/jobs/{id}`` for progress.
+    """
     try:
         data = json.loads(invoice_data)
     except json.JSONDecodeError:
@@ -39,26 +44,27 @@ async def file_invoice(
         f"{it.get('product_name', '?')} x{it.get('qty', 0)}" for it in items
     )
 
-    pdf_bytes = await pdf.read()
-
-    svc = get_sheets_service()
-    result = svc.file_invoice(
-        customer_name=customer_name,
-        invoice_date=invoice_date,
-        items_summary=items_summary,
-        total=total,
-        paid=paid,
-        pdf_bytes=pdf_bytes,
+    # The multipart parser has already spooled the upload to a temp file
+    # (in memory only up to 1 MB); the queue copies it to the data volume
+    job = await run_blocking(
+        get_invoice_jobs().enqueue,
+        {
+            "customer_name": customer_name,
+            "invoice_date": invoice_date,
+            "items_summary": items_summary,
+            "total": total,
+            "paid": paid,
+        },
+        pdf.file,
     )
+    response.headers["Location"] = f"/api/invoices/jobs/{job['id']}"
+    return job
 
-    drive_error = result.get("drive_error", "")
-    message = "Invoice filed successfully"
-    if drive_error:
-        message = f"Invoice logged but Drive upload failed: {drive_error}"
 
-    return FileInvoiceResponse(
-        message=message,
-        drive_url=result.get("drive_url", ""),
-        invoice_number=result.get("invoice_number", ""),
-        drive_error=drive_error,
-    )
+@router.get("/invoices/jobs/{job_id}", response_model=InvoiceJob)
+async def get_invoice_job(job_id: str, user: str = Depends(verify_token)):
+    """Status of a queued invoice filing."""
+    job = await run_blocking(get_invoice_jobs().get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Invoice job not found")
+    return job
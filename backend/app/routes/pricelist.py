@@ -1,11 +1,15 @@
 """Price list import route."""
 
 import csv
+import hashlib
 import io
 
-from fastapi import APIRouter, Depends, UploadFile, File
+from fastapi import APIRouter, Depends, Query, Request, UploadFile, File
+from fastapi.responses import JSONResponse, Response
 
 from ..auth import verify_token
+from ..executor import run_blocking
+from ..scheduler import Lane, priority
 from ..sheets import get_sheets_service
 
 router = APIRouter(tags=["pricelist"])
@@ -13,42 +17,105 @@ router = APIRouter(tags=["pricelist"])
 # Categories we care about
 WANTED_CATEGORIES = {"HORSE", "ALL PURPOSE"}
 
+CATEGORY_HEADER = "Price List Category"
+
 
 @router.get("/pricelist/archive")
-async def get_archive(user: str = Depends(verify_token)):
-    """Get the Price List Archive tab contents."""
+async def get_archive(
+    request: Request,
+    page: int = Query(default=1, ge=1),
+    page_size: int = Query(default=100, ge=1, le=1000),
+    columns: str = Query(default="", description="Comma-separated header names to return"),
+    category: str = Query(default=""),
+    q: str = Query(default="", description="Space-separated terms that must all appear in a row"),
+    user: str = Depends(verify_token),
+):
+    """Get one page of the Price List Archive tab, optionally filtered and projected.
+
+    Responses carry an ETag derived from the archive content and the query,
+    so an unchanged page comes back as 304 Not Modified.
+    """
+    svc = get_sheets_service()
+    archive = await run_blocking(svc.get_archive)
+
+    query_key = f"{page}|{page_size}|{columns}|{category}|{q}"
+    etag = f'"{archive.etag[:16]}-{hashlib.sha1(query_key.encode()).hexdigest()[:12]}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    indices = range(len(archive.rows))
+    if category and CATEGORY_HEADER in archive.headers:
+        col = archive.headers.index(CATEGORY_HEADER)
+        wanted = category.strip().upper()
+        indices = [i for i in indices if len(archive.rows[i]) > col and archive.rows[i][col].upper() == wanted]
+    terms = q.lower().split()
+    if terms:
+        indices = [i for i in indices if all(t in archive.search_text[i] for t in terms)]
+    indices = list(indices)
+
+    selected = [h.strip() for h in columns.split(",") if h.strip() in archive.headers]
+    col_idx = [archive.headers.index(h) for h in selected] if selected else list(range(len(archive.headers)))
+
+    start = (page - 1) * page_size
+    rows = [
+        [archive.rows[i][c] if c < len(archive.rows[i]) else "" for c in col_idx]
+        for i in indices[start:start + page_size]
+    ]
+    return JSONResponse(
+        {
+            "headers": [archive.headers[c] for c in col_idx],
+            "rows": rows,
+            "total": len(indices),
+            "page": page,
+            "page_size": page_size,
+        },
+        headers=headers,
+    )
+
+
+@router.get("/pricelist/archive/categories")
+async def get_archive_categories(user: str = Depends(verify_token)):
+    """Distinct price list categories in the archive."""
     svc = get_sheets_service()
-    ws = svc._get_worksheet("Price List Archive")
-    data = ws.get_all_values()
-    return {
-        "headers": data[0] if data else [],
-        "rows": data[1:] if len(data) > 1 else [],
-    }
+    archive = await run_blocking(svc.get_archive)
+    if CATEGORY_HEADER not in archive.headers:
+        return []
+    col = archive.headers.index(CATEGORY_HEADER)
+    return sorted({row[col] for row in archive.rows if len(row) > col and row[col]})
 
 
 @router.post("/pricelist/import")
 async def import_pricelist(
-    file: UploadFile = File(...), user: str = Depends(verify_token)
+    file: UploadFile = File(...),
+    dry_run: bool = Query(default=False),
+    user: str = Depends(verify_token),
 ):
-    """Upload a new Purina CSV to refresh costs in the Inventory tab."""
+    """Upload a new Purina CSV to refresh costs in the Inventory tab.
+
+    Only cost cells that differ from the sheet are written. With
+    ``dry_run=true`` the diff is returned without writing anything.
+    """
     content = await file.read()
-    text = content.decode("utf-8-sig")  # handle BOM
-    reader = csv.DictReader(io.StringIO(text))
+    items = parse_pricelist(content.decode("utf-8-sig"))  # handle BOM
 
     svc = get_sheets_service()
-    ws = svc._get_worksheet("Inventory")
-    rows = ws.get_all_values()
-
-    # Build lookup: material_no -> row_number
-    material_to_row = {}
-    for i, row in enumerate(rows[1:], start=2):
-        if row and row[0]:
-            material_to_row[row[0]] = i
-
-    updated = 0
-    new_products = []
-
-    for record in reader:
+    # Imports yield Sheets quota to interactive sales and adjustments
+    with priority(Lane.BULK):
+        result = await run_blocking(svc.import_pricelist, items, dry_run=dry_run)
+
+    verb = "Would update" if dry_run else "Updated"
+    added = "would add" if dry_run else "added"
+    result["message"] = (
+        f"{verb} {result['updated']} existing products, {added} {len(result['new_products'])} new products."
+    )
+    return result
+
+
+def parse_pricelist(text: str) -> list[dict]:
+    """Parse a Purina price list CSV, keeping HORSE products and CA ALL STOCK."""
+    items = []
+    for record in csv.DictReader(io.StringIO(text)):
         category = record.get("Price List Category", "")
         # Filter: only HORSE products + CA ALL STOCK
         is_horse = "HORSE" in category.upper()
@@ -61,39 +128,13 @@ async def import_pricelist(
         if not material_no:
             continue
 
-        single_price = float(record.get("Single Unit List Price", 0) or 0)
-        pallet_price = float(record.get("Full Pallet List Price", 0) or 0)
-
-        if material_no in material_to_row:
-            # Update existing product costs
-            row_num = material_to_row[material_no]
-            ws.update_cell(row_num, 6, single_price)   # Purina Cost (col F)
-            ws.update_cell(row_num, 7, pallet_price)    # Pallet Cost (col G)
-            updated += 1
-        else:
-            # New product - append
-            formula_code = record.get("Formula Code", "")
-            product_name = record.get("Product Name", "")
-            product_form = record.get("Product Form", "")
-            unit_weight = record.get("Individual Unit Wt.", "")
-
-            from ..sheets import calc_retail_pre_tax, calc_retail_with_tax
-            markup = 0.25
-            pre_tax = calc_retail_pre_tax(single_price, markup)
-            with_tax = calc_retail_with_tax(pre_tax)
-
-            new_row = [
-                material_no, formula_code, product_name, product_form, unit_weight,
-                single_price, pallet_price, markup, pre_tax, with_tax,
-                0, 5, "", ""  # qty=0, reorder=5, no timestamp, no notes
-            ]
-            ws.append_row(new_row, value_input_option="USER_ENTERED")
-            new_products.append(product_name)
-
-    svc._invalidate_cache()
-
-    return {
-        "updated": updated,
-        "new_products": new_products,
-        "message": f"Updated {updated} existing products, added {len(new_products)} new products.",
-    }
+        items.append({
+            "material_no": material_no,
+            "purina_cost": float(record.get("Single Unit List Price", 0) or 0),
+            "pallet_cost": float(record.get("Full Pallet List Price", 0) or 0),
+            "formula_code": record.get("Formula Code", ""),
+            "product_name": record.get("Product Name", ""),
+            "product_form": record.get("Product Form", ""),
+            "unit_weight": record.get("Individual Unit Wt.", ""),
+        })
+    return items
@@ -1,18 +1,50 @@
 """Product routes."""
 
-from fastapi import APIRouter, Depends
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, Request, Response
 
 from ..auth import verify_token
-from ..models import Product, MarkupUpdate, ReorderUpdate
-from ..sheets import get_sheets_service
+from ..executor import run_blocking
+from ..models import Product, ProductDelta, MarkupUpdate, ReorderUpdate
+from ..sheets import EncodedProducts, get_sheets_service
 
 router = APIRouter(tags=["products"])
 
 
-@router.get("/products", response_model=list[Product])
-async def list_products(user: str = Depends(verify_token)):
+@router.get("/products", response_model=list[Product] | ProductDelta)
+async def list_products(
+    request: Request,
+    response: Response,
+    since: Optional[str] = Query(default=None, description="Version token from a previous response"),
+    user: str = Depends(verify_token),
+):
+    """List products.
+
+    The response's ETag is the product-set version; a matching If-None-Match
+    gets 304. With ``since``, only products changed after that version (plus
+    deleted material numbers) are returned.
+    """
     svc = get_sheets_service()
-    return svc.get_all_products()
+    if since is not None:
+        delta = await run_blocking(svc.products_since, since)
+        response.headers["ETag"] = f'"{delta["version"]}"'
+        return ProductDelta(**delta)
+
+    return encoded_products_response(request, await run_blocking(svc.encoded_products))
+
+
+def encoded_products_response(request: Request, encoded: EncodedProducts) -> Response:
+    """The full product list as pre-encoded bytes, built once per version, so
+    there is no per-request validation or JSON encoding."""
+    etag = f'"{encoded.version}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    if encoded.gzipped is not None and "gzip" in request.headers.get("accept-encoding", ""):
+        headers.update({"Content-Encoding": "gzip", "Vary": "Accept-Encoding"})
+        return Response(encoded.gzipped, media_type="application/json", headers=headers)
+    return Response(encoded.body, media_type="application/json", headers=headers)
 
 
 @router.put("/products/{material_no}/markup", response_model=Product)
@@ -20,7 +52,7 @@ async def update_markup(
     material_no: str, body: MarkupUpdate, user: str = Depends(verify_token)
 ):
     svc = get_sheets_service()
-    return svc.update_markup(material_no, body.markup_pct)
+    return await run_blocking(svc.update_markup, material_no, body.markup_pct)
 
 
 @router.put("/products/{material_no}/reorder", response_model=Product)
@@ -28,4 +60,4 @@ async def update_reorder(
     material_no: str, body: ReorderUpdate, user: str = Depends(verify_token)
 ):
     svc = get_sheets_service()
-    return svc.update_reorder_point(material_no, body.reorder_point)
+    return await run_blocking(svc.update_reorder_point, material_no, body.reorder_point)
@@ -0,0 +1,46 @@
+"""Operational stats routes."""
+
+from fastapi import APIRouter, Depends
+
+from ..auth import verify_token
+from ..google_clients import get_google_clients
+from ..metrics import api_calls
+from ..sheets import get_sheets_service
+
+router = APIRouter(tags=["stats"])
+
+
+@router.get("/stats/api-calls")
+async def get_api_calls(user: str = Depends(verify_token)):
+    """Google API round trips per endpoint since start-up."""
+    return api_calls.snapshot()
+
+
+@router.get("/stats/cache")
+async def get_cache_stats(user: str = Depends(verify_token)):
+    """Hit/miss/refresh counters and entry age for each cached tab."""
+    return get_sheets_service().cache_stats()
+
+
+@router.get("/stats/clients")
+async def get_client_stats(user: str = Depends(verify_token)):
+    """Shared Google client pool and access token state."""
+    return get_google_clients().stats()
+
+
+@router.get("/stats/scheduler")
+async def get_scheduler_stats(user: str = Depends(verify_token)):
+    """Sheets quota tokens available and calls waiting per priority lane."""
+    return get_sheets_service().scheduler_stats()
+
+
+@router.get("/stats/journal")
+async def get_journal_stats(user: str = Depends(verify_token)):
+    """Write-ahead journal: changes not yet in the sheet and replication lag."""
+    return get_sheets_service().journal_stats()
+
+
+@router.get("/stats/startup")
+async def get_startup_stats(user: str = Depends(verify_token)):
+    """Seconds each start-up warm-up step took (null until it finishes)."""
+    return get_sheets_service().startup_stats()
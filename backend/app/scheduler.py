@@ -0,0 +1,144 @@
+"""Quota-aware scheduling of Google Sheets calls.
+
+Every Sheets call made by ``SheetsService`` takes a token from one bucket,
+refilled at ``SHEETS_QUOTA_PER_MINUTE``, so the app paces itself under the
+per-minute quota instead of running into 429s. When tokens run short,
+waiting calls are served by priority lane: interactive work (sales,
+adjustments, product reads) goes before background work (the invoice
+queue), which goes before bulk work (price imports, archive reads).
+
+Calls that fail with 429 or a 5xx are retried with full-jitter exponential
+backoff. Appends are not retried on 5xx, because the first attempt may have
+landed.
+"""
+
+import heapq
+import itertools
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Callable, TypeVar
+
+from .metrics import Counter, Histogram, error_status
+
+T = TypeVar("T")
+
+
+class Lane(IntEnum):
+    """Priority lanes; lower goes first."""
+
+    INTERACTIVE = 0
+    BACKGROUND = 1
+    BULK = 2
+
+
+RETRYABLE_STATUSES = {"429", "500", "502", "503", "504"}
+NON_IDEMPOTENT_OPS = {"append_row", "append_rows", "add_worksheet"}
+
+_lane: ContextVar[Lane] = ContextVar("google_lane", default=Lane.INTERACTIVE)
+
+queue_seconds = Histogram(
+    "google_api_queue_seconds", "Time Sheets calls waited for a quota token.", ("lane",),
+    buckets=(0.001, 0.01, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+retries = Counter("google_api_retries_total", "Google API calls retried after an error.", ("tab", "op", "status"))
+
+
+@contextmanager
+def priority(lane: Lane):
+    """Run the Google calls made inside the block (and the threads it hands
+    work to through ``run_blocking``) in the given lane."""
+    token = _lane.set(lane)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+def retryable(op: str, exc: BaseException) -> bool:
+    status = error_status(exc)
+    if op in NON_IDEMPOTENT_OPS:
+        return status == "429"
+    return status in RETRYABLE_STATUSES
+
+
+class QuotaScheduler:
+    """Token bucket with priority lanes, plus retry with backoff."""
+
+    def __init__(self, per_minute: int, burst: int, max_retries: int, backoff_base: float, backoff_max: float):
+        self._rate = max(per_minute, 1) / 60.0  # tokens per second
+        self._capacity = max(burst, 1)
+        self._tokens = float(self._capacity)
+        self._updated = time.monotonic()
+        self._max_retries = max_retries
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+        self._cond = threading.Condition()
+        self._waiting: list[tuple[int, int]] = []  # heap of (lane, ticket)
+        self._tickets = itertools.count()
+
+    def _refill(self):
+        # Called with _cond held
+        now = time.monotonic()
+        self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def acquire(self, lane: Lane):
+        """Block until a token is free and no higher-priority call is waiting."""
+        start = time.monotonic()
+        with self._cond:
+            entry = (int(lane), next(self._tickets))
+            heapq.heappush(self._waiting, entry)
+            try:
+                while True:
+                    self._refill()
+                    first = self._waiting[0] == entry
+                    if first and self._tokens >= 1:
+                        heapq.heappop(self._waiting)
+                        self._tokens -= 1
+                        self._cond.notify_all()
+                        break
+                    # Only the head of the queue needs to track the refill
+                    self._cond.wait((1 - self._tokens) / self._rate if first else None)
+            except BaseException:
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+                self._cond.notify_all()
+                raise
+        queue_seconds.observe(lane.name.lower(), value=time.monotonic() - start)
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter delay before retry number ``attempt`` (1-based)."""
+        return random.uniform(0, min(self._backoff_max, self._backoff_base * 2 ** (attempt - 1)))
+
+    def run(self, tab: str, op: str, func: Callable[[], T], throttle: bool = True) -> T:
+        """Call ``func`` in the current lane, retrying quota and server errors."""
+        lane = _lane.get()
+        attempt = 0
+        while True:
+            if throttle:
+                self.acquire(lane)
+            try:
+                return func()
+            except Exception as exc:
+                attempt += 1
+                if attempt > self._max_retries or not retryable(op, exc):
+                    raise
+                retries.inc(tab, op, error_status(exc))
+                time.sleep(self.backoff(attempt))
+
+    def stats(self) -> dict:
+        with self._cond:
+            self._refill()
+            waiting: dict[str, int] = {lane.name.lower(): 0 for lane in Lane}
+            for lane, _ in self._waiting:
+                waiting[Lane(lane).name.lower()] += 1
+            return {
+                "tokens": round(self._tokens, 2),
+                "capacity": self._capacity,
+                "per_minute": round(self._rate * 60),
+                "waiting": waiting,
+            }
@@ -1,19 +1,36 @@
 """Google Sheets service with caching."""
 
+import gzip
+import hashlib
 import io
 import json
 import logging
-import time
 import math
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from typing import Optional
+from pathlib import Path
+from typing import BinaryIO, Optional
 
 import gspread
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseUpload
-from google.oauth2.service_account import Credentials as SACredentials
+from pydantic import TypeAdapter
+from gspread.utils import a1_range_to_grid_range, rowcol_to_a1
 
+from .breaker import CircuitBreaker, is_outage
+from .cache import CachePolicy, SWRCache, record_stale
 from .config import get_settings
+from .events import broker
+from .google_clients import get_google_clients
+from .journal import ADJUST, MARKUP, REORDER, SENT, WriteJournal
+from .metrics import Counter, api_calls, error_status, observe_google_call
+from .scheduler import Lane, QuotaScheduler, priority
+from .storage import LocalSpreadsheet, Spreadsheet, Worksheet, open_local_spreadsheet
 from .models import Product, LogEntry
 
 logger = logging.getLogger(__name__)
@@ -41,10 +58,39 @@ TAB_LOG = "Inventory Log"
 TAB_ARCHIVE = "Price List Archive"
 TAB_INVOICES = "Invoices"
 
-DRIVE_SCOPES = [
-    "https://www.googleapis.com/auth/drive",
-    "https://www.googleapis.com/auth/drive.file",
+INVENTORY_HEADERS = [
+    "Material No", "Formula Code", "Product Name", "Product Form", "Unit Weight", "Purina Cost", "Pallet Cost",
+    "Markup %", "Retail Pre-Tax", "Retail w/ Tax", "Qty On Hand", "Reorder Point", "Last Updated", "Notes",
 ]
+LOG_HEADERS = [
+    "Timestamp", "Product Name", "Material No", "Change Type", "Qty Changed", "Previous Qty", "New Qty",
+    "Changed By", "Notes",
+]
+INVOICE_HEADERS = ["Invoice #", "Date", "Customer", "Items Summary", "Total", "Paid", "Filed At", "Drive URL"]
+
+DEFAULT_MARKUP = 0.25
+DEFAULT_REORDER_POINT = 5
+
+stale_rows = Counter(
+    "inventory_stale_rows_total",
+    "Rows that differed from the sheet when checked before an inventory write.",
+    ("reason",),
+)
+
+LOG_BUFFER_SIZE = 500  # parsed recent log entries kept in memory (max /inventory/log limit)
+LOG_INITIAL_ROWS = 100  # rows read from the end of the log on a cold start
+LAST_ROW_PROBES = 64  # sample cells per batch_get when locating the end of a tab
+
+DRIVE_CHUNK_UNIT = 256 * 1024
+SNAPSHOT_FILE = "snapshot.json"  # under DATA_DIR
+SNAPSHOT_FORMAT = 1
+JOURNAL_FILE = "journal.db"  # under DATA_DIR
+REQUEST_KEYS_KEPT = 10000  # idempotency keys remembered in memory when the journal is off
+GZIP_MIN_SIZE = 1024  # same threshold as the GZipMiddleware in main
+# The list is re-encoded after every change; 9 takes ~4x as long as 6 for ~20% fewer bytes
+GZIP_LEVEL = 6
+
+_product_list = TypeAdapter(list[Product])
 
 
 def ceil_quarter(value: float) -> float:
@@ -60,187 +106,1277 @@ def calc_retail_with_tax(pre_tax: float, tax_rate: float = 0.055) -> float:
     return ceil_quarter(pre_tax * (1 + tax_rate))
 
 
+def parse_product_row(row_number: int, row: list[str]) -> Optional[Product]:
+    """Build a Product from a raw Inventory row, or None if the row is unusable."""
+    if not row or not row[0]:
+        return None
+    try:
+        purina_cost = float(row[COL["purina_cost"]] or 0)
+        pallet_cost = float(row[COL["pallet_cost"]] or 0)
+        markup_pct = float(row[COL["markup_pct"]] or 0.25)
+        pre_tax = float(row[COL["retail_pre_tax"]] or 0)
+        with_tax = float(row[COL["retail_with_tax"]] or 0)
+        qty = int(float(row[COL["qty_on_hand"]] or 0))
+        reorder = int(float(row[COL["reorder_point"]] or 5))
+    except (ValueError, IndexError):
+        return None
+
+    return Product(
+        row_number=row_number,
+        material_no=row[COL["material_no"]],
+        formula_code=row[COL["formula_code"]],
+        product_name=row[COL["product_name"]],
+        product_form=row[COL["product_form"]],
+        unit_weight=row[COL["unit_weight"]],
+        purina_cost=purina_cost,
+        pallet_cost=pallet_cost,
+        markup_pct=markup_pct,
+        retail_pre_tax=pre_tax if pre_tax else calc_retail_pre_tax(purina_cost, markup_pct),
+        retail_with_tax=with_tax if with_tax else calc_retail_with_tax(
+            pre_tax if pre_tax else calc_retail_pre_tax(purina_cost, markup_pct)
+        ),
+        qty_on_hand=qty,
+        reorder_point=reorder,
+        last_updated=row[COL["last_updated"]] if len(row) > COL["last_updated"] else "",
+        notes=row[COL["notes"]] if len(row) > COL["notes"] else "",
+    )
+
+
+def row_update_ranges(row_number: int, updates: dict[str, object]) -> list[dict]:
+    """Group cell updates for one row into contiguous A1 ranges for batch_update."""
+    cols = sorted((COL[field], value) for field, value in updates.items())
+    ranges: list[dict] = []
+    start, values = None, []
+    for col, value in cols:
+        if start is not None and col == start + len(values):
+            values.append(value)
+            continue
+        if start is not None:
+            ranges.append(_range_entry(row_number, start, values))
+        start, values = col, [value]
+    if start is not None:
+        ranges.append(_range_entry(row_number, start, values))
+    return ranges
+
+
+def parse_log_row(row: list[str]) -> Optional[LogEntry]:
+    """Parse a raw Inventory Log row, or None if the row is unusable."""
+    if not row or not row[0]:
+        return None
+    try:
+        return LogEntry(
+            timestamp=row[0],
+            product_name=row[1],
+            material_no=row[2],
+            change_type=row[3],
+            qty_changed=int(float(row[4] or 0)),
+            previous_qty=int(float(row[5] or 0)),
+            new_qty=int(float(row[6] or 0)),
+            changed_by=row[7] if len(row) > 7 else "",
+            notes=row[8] if len(row) > 8 else "",
+        )
+    except (ValueError, IndexError):
+        return None
+
+
+def parse_log_rows(first_row: int, rows: list[list[str]]) -> list[tuple[int, LogEntry]]:
+    """Parse consecutive log rows starting at sheet row first_row into (row_number, entry) pairs."""
+    parsed = []
+    for i, row in enumerate(rows, start=first_row):
+        entry = parse_log_row(row)
+        if entry is not None:
+            parsed.append((i, entry))
+    return parsed
+
+
+def updated_rows(response: dict) -> Optional[tuple[int, int]]:
+    """First and last sheet row touched by an append, from its API response."""
+    updated_range = (response or {}).get("updates", {}).get("updatedRange", "")
+    if "!" not in updated_range:
+        return None
+    grid = a1_range_to_grid_range(updated_range.rsplit("!", 1)[1])
+    if "startRowIndex" not in grid:
+        return None
+    return grid["startRowIndex"] + 1, grid.get("endRowIndex", grid["startRowIndex"] + 1)
+
+
+def beyond_grid(exc: gspread.exceptions.APIError) -> bool:
+    """Whether a read failed only because its range starts past the tab's last row."""
+    return error_status(exc) == "400" and "exceeds grid limits" in str(exc)
+
+
+def _same_number(cell: str, value: float) -> bool:
+    try:
+        return abs(float(cell) - value) < 1e-9
+    except (TypeError, ValueError):
+        return False
+
+
+def call_target(func) -> str:
+    """Metrics label for what a Google call touches: the tab title, or
+    ``spreadsheet`` / ``drive`` for calls not bound to a worksheet."""
+    owner = getattr(func, "__self__", None)
+    if isinstance(owner, (gspread.Spreadsheet, gspread.Client, LocalSpreadsheet)):
+        return "spreadsheet"
+    # Checked by module, so metrics don't import googleapiclient before an upload does
+    if type(owner).__module__.startswith("googleapiclient."):
+        return "drive"
+    return getattr(owner, "title", None) or "unknown"
+
+
+def apply_row_updates(row: list[str], updates: dict[str, object]) -> list[str]:
+    """Return a copy of an Inventory row with updates applied as the sheet would store them."""
+    new_row = list(row) + [""] * (len(COL) - len(row))
+    for field, value in updates.items():
+        new_row[COL[field]] = str(value)
+    return new_row
+
+
+def journal_updates(row: list[str], kind: str, data: dict) -> dict[str, object]:
+    """The cell updates a journaled change makes to an Inventory row as it stands.
+
+    Quantities are applied as a delta and retail prices worked out from the
+    row's cost, so replaying a change on top of a hand-edited row keeps the
+    edit.
+    """
+    last_updated = data["at"][:16]
+    if kind == ADJUST:
+        previous_qty = int(float(row[COL["qty_on_hand"]] or 0))
+        return {"qty_on_hand": max(previous_qty + data["quantity"], 0), "last_updated": last_updated}
+    if kind == MARKUP:
+        pre_tax = calc_retail_pre_tax(float(row[COL["purina_cost"]] or 0), data["markup_pct"])
+        return {
+            "markup_pct": data["markup_pct"],
+            "retail_pre_tax": pre_tax,
+            "retail_with_tax": calc_retail_with_tax(pre_tax),
+            "last_updated": last_updated,
+        }
+    if kind == REORDER:
+        return {"reorder_point": data["reorder_point"], "last_updated": last_updated}
+    raise ValueError(f"Unknown journal entry kind: {kind}")
+
+
+def journal_log_row(product_name: str, material_no: str, data: dict) -> list:
+    """The Inventory Log row for a journaled adjustment."""
+    return [
+        data["at"], product_name, material_no, data["change_type"], data["quantity"],
+        data["previous_qty"], data["new_qty"], data["changed_by"], data["notes"],
+    ]
+
+
+def undo_sent(row: list[str], entries: list[dict]) -> Optional[list[str]]:
+    """If a cut-short replay already wrote the quantity of a product's sent
+    adjustments to this row, the row with the quantity taken back to where
+    that replay started, so applying the entries again doesn't count them
+    twice. Otherwise None.
+    """
+    sent = [entry for entry in entries if entry["kind"] == ADJUST and entry["status"] == SENT]
+    if sent and int(float(row[COL["qty_on_hand"]] or 0)) == sent[-1]["data"]["new_qty"]:
+        return apply_row_updates(row, {"qty_on_hand": sent[0]["data"]["previous_qty"]})
+    return None
+
+
+def apply_journaled(row: list[str], entries: list[dict]) -> list[str]:
+    """Return a copy of an Inventory row with journaled changes applied in order."""
+    for entry in entries:
+        row = apply_row_updates(row, journal_updates(row, entry["kind"], entry["data"]))
+    return row
+
+
+def _range_entry(row_number: int, start_col: int, values: list) -> dict:
+    first = rowcol_to_a1(row_number, start_col + 1)
+    last = rowcol_to_a1(row_number, start_col + len(values))
+    return {"range": first if first == last else f"{first}:{last}", "values": [values]}
+
+
+@dataclass
+class EncodedProducts:
+    """The product list serialized once for a product-set version."""
+
+    version: str
+    body: bytes  # JSON
+    gzipped: Optional[bytes]  # None below GZIP_MIN_SIZE
+
+    @classmethod
+    def encode(cls, version: str, products: list[Product]) -> "EncodedProducts":
+        body = _product_list.dump_json(products)
+        gzipped = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0) if len(body) >= GZIP_MIN_SIZE else None
+        return cls(version, body, gzipped)
+
+
+@dataclass
+class PriceListArchive:
+    """Parsed Price List Archive tab with a content hash for ETags."""
+
+    headers: list[str]
+    rows: list[list[str]]
+    etag: str
+    search_text: list[str] = field(default_factory=list)  # lowercased row text, for q= filtering
+
+    @classmethod
+    def from_values(cls, values: list[list[str]]) -> "PriceListArchive":
+        headers = values[0] if values else []
+        rows = values[1:]
+        digest = hashlib.sha1(json.dumps(values, separators=(",", ":")).encode()).hexdigest()
+        return cls(headers, rows, digest, ["\t".join(row).lower() for row in rows])
+
+
+class ProductVersions:
+    """Tracks a version number for the product set and for each product.
+
+    Every change the service sees (our own writes, or differences found when
+    the tab is re-read) bumps the version. Tokens look like ``<epoch>.<n>``;
+    the epoch changes on every process start, so a token from before a
+    restart is never mistaken for a current one. Not thread-safe on its own;
+    SheetsService calls it under its lock.
+    """
+
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex[:8]
+        self.version = 0
+        self._products: dict[str, Product] = {}
+        self._changed_at: dict[str, int] = {}
+        self._deleted_at: dict[str, int] = {}
+
+    @property
+    def token(self) -> str:
+        return f"{self.epoch}.{self.version}"
+
+    def observe_all(self, products: list[Product]) -> tuple[list[Product], list[str]]:
+        """Diff a freshly read product list against what we knew.
+
+        Returns the products that changed and the material numbers that
+        disappeared.
+        """
+        current = {}
+        for p in products:
+            current.setdefault(p.material_no, p)
+        changed = [m for m, p in current.items() if self._products.get(m) != p]
+        deleted = [m for m in self._products if m not in current]
+        if not changed and not deleted and self.version:
+            return [], []
+        self.version += 1
+        for m in changed:
+            self._changed_at[m] = self.version
+            self._deleted_at.pop(m, None)
+        for m in deleted:
+            self._deleted_at[m] = self.version
+            self._changed_at.pop(m, None)
+        self._products = current
+        return [current[m] for m in changed], deleted
+
+    def observe(self, product: Product) -> bool:
+        """Record a single product we just wrote; returns whether it changed."""
+        if self._products.get(product.material_no) == product:
+            return False
+        self.version += 1
+        self._products[product.material_no] = product
+        self._changed_at[product.material_no] = self.version
+        self._deleted_at.pop(product.material_no, None)
+        return True
+
+    def since(self, token: str) -> Optional[tuple[set[str], list[str]]]:
+        """Material numbers changed and deleted after token, or None if the token is unusable."""
+        epoch, _, number = (token or "").partition(".")
+        if epoch != self.epoch or not number.isdigit() or int(number) > self.version:
+            return None
+        base = int(number)
+        changed = {m for m, v in self._changed_at.items() if v > base}
+        deleted = sorted(m for m, v in self._deleted_at.items() if v > base)
+        return changed, deleted
+
+
+class InvoiceSequence:
+    """Allocates INV-#### numbers without reading the Invoices tab each time.
+
+    The counter is seeded from the sheet, then advanced under a lock, so two
+    invoices filed at once can never get the same number. ``reconcile``
+    returns the highest number the sheet knows about; it is consulted
+    through the ``invoices`` cache entry, so a cold or expired entry
+    re-checks the sheet and the counter only ever moves forward.
+    """
+
+    def __init__(self, reconcile):
+        self._reconcile = reconcile
+        self._lock = threading.Lock()
+        self._last: int = 0
+
+    def next(self) -> str:
+        with self._lock:
+            self._last = max(self._last, self._reconcile())
+            self._last += 1
+            return f"INV-{self._last:04d}"
+
+    def reserve(self, number: int):
+        """Never hand out ``number`` or anything below it."""
+        with self._lock:
+            self._last = max(self._last, number)
+
+
+class KeyedLocks:
+    """One lock per key (material number), created on demand and dropped
+    once nobody holds or waits for it."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._locks: dict[str, list] = {}  # key -> [Lock, holders and waiters]
+
+    @contextmanager
+    def hold(self, *keys: str):
+        """Hold the locks for all keys. Taken in sorted order, so two callers
+        locking overlapping sets can't deadlock."""
+        keys = sorted(set(keys))
+        with self._lock:
+            entries = []
+            for key in keys:
+                entry = self._locks.setdefault(key, [threading.Lock(), 0])
+                entry[1] += 1
+                entries.append(entry)
+        acquired = []
+        try:
+            for entry in entries:
+                entry[0].acquire()
+                acquired.append(entry)
+            yield
+        finally:
+            for entry in reversed(acquired):
+                entry[0].release()
+            with self._lock:
+                for key, entry in zip(keys, entries):
+                    entry[1] -= 1
+                    if entry[1] == 0:
+                        del self._locks[key]
+
+
+def parse_invoice_number(value: str) -> Optional[int]:
+    """The numeric part of an INV-#### invoice number, or None."""
+    prefix, _, digits = (value or "").strip().partition("-")
+    if prefix.upper() != "INV" or not digits.isdigit():
+        return None
+    return int(digits)
+
+
 class SheetsService:
-    """Google Sheets client with in-memory caching."""
+    """Google Sheets client with in-memory caching.
+
+    Methods block on Google I/O and are called from the worker threads in
+    ``executor``; ``_lock`` guards the cached state and ``_handles_lock`` the
+    lazily opened spreadsheet and worksheet handles.
+    """
 
     def __init__(self):
-        self._client: Optional[gspread.Client] = None
-        self._spreadsheet: Optional[gspread.Spreadsheet] = None
-        self._cache: dict = {}
-        self._cache_time: float = 0
+        self._lock = threading.RLock()
+        # Held while opening the spreadsheet or a tab (a Google round trip), so
+        # readers of the cached state under _lock aren't kept waiting
+        self._handles_lock = threading.RLock()
+        self._spreadsheet: Optional[Spreadsheet] = None
+        self._worksheets: dict[str, Worksheet] = {}
         self._settings = get_settings()
-
-    def _get_client(self) -> gspread.Client:
-        if self._client is None:
-            creds_json = self._settings.google_credentials_json
-            if not creds_json:
-                raise RuntimeError("GOOGLE_CREDENTIALS_JSON not set")
-            creds = json.loads(creds_json)
-            self._client = gspread.service_account_from_dict(creds)
-        return self._client
-
-    def _get_spreadsheet(self) -> gspread.Spreadsheet:
-        if self._spreadsheet is None:
-            client = self._get_client()
-            sheet_id = self._settings.google_sheet_id
-            if not sheet_id:
-                raise RuntimeError("GOOGLE_SHEET_ID not set")
-            self._spreadsheet = client.open_by_key(sheet_id)
-        return self._spreadsheet
-
-    def _get_worksheet(self, tab_name: str) -> gspread.Worksheet:
-        return self._get_spreadsheet().worksheet(tab_name)
-
-    def _invalidate_cache(self):
-        self._cache = {}
-        self._cache_time = 0
-
-    def _is_cache_valid(self) -> bool:
-        return (
-            bool(self._cache)
-            and (time.time() - self._cache_time) < self._settings.cache_ttl_seconds
+        # While Google is down, reads fall back to the last values loaded
+        self._cache = SWRCache(self._cache_policies(), serve_stale_on=is_outage)
+        self._scheduler = QuotaScheduler(
+            per_minute=self._settings.sheets_quota_per_minute,
+            burst=self._settings.sheets_quota_burst,
+            max_retries=self._settings.google_max_retries,
+            backoff_base=self._settings.google_backoff_base_seconds,
+            backoff_max=self._settings.google_backoff_max_seconds,
         )
+        # Sheets and Drive fail independently, so each has its own breaker
+        self._breakers = {
+            target: CircuitBreaker(
+                target,
+                failure_threshold=self._settings.breaker_failure_threshold,
+                slow_call_seconds=self._settings.breaker_slow_call_seconds,
+                open_seconds=self._settings.breaker_open_seconds,
+                half_open_probes=self._settings.breaker_half_open_probes,
+            )
+            for target in ("sheets", "drive")
+        }
+        # A local store has no quota to pace for, unless one is being simulated
+        self._throttle = self._settings.storage_backend != "local" or self._settings.local_storage_quota_per_minute > 0
+        # material_no -> (row_number, raw row). Rebuilt from every full read of
+        # the Inventory tab and patched in place after our own writes.
+        self._index: dict[str, tuple[int, list[str]]] = {}
+        self._positions: dict[str, int] = {}  # material_no -> slot in cached product list
+        self._versions = ProductVersions()
+        self._encoded_products: Optional[EncodedProducts] = None
+        # Serializes read-modify-write of a product's quantity
+        self._material_locks = KeyedLocks()
+        # Recent Inventory Log entries as (row_number, entry), oldest first. Rows
+        # between _log_floor and _log_last_row have been read; older ones have not.
+        self._log_tail: deque[tuple[int, LogEntry]] = deque(maxlen=LOG_BUFFER_SIZE)
+        self._log_last_row: Optional[int] = None
+        self._log_floor: int = 2
+        self._warm_up_seconds: Optional[dict[str, Optional[float]]] = None
+        self._invoice_seq = InvoiceSequence(
+            lambda: self._cache.get("invoices", self._load_last_invoice_number)
+        )
+        # Inventory changes are committed here first and replayed to the sheet
+        # in the background; the index already includes the pending ones.
+        self._journal: Optional[WriteJournal] = None
+        if self._settings.write_journal:
+            self._journal = WriteJournal(Path(self._settings.data_dir) / JOURNAL_FILE, self._replicate)
+        self._journal_seq = 0  # newest journaled change applied to the index
+        # Without the journal, idempotency keys of applied requests, oldest first
+        self._request_keys: OrderedDict[str, None] = OrderedDict()
+        # Bumped for every row stored after a write, so a reload that read the
+        # tab before the write keeps the row as written instead of its older read
+        self._write_gen = 0
+        self._written: dict[str, int] = {}  # material_no -> generation of its last write
+
+    def _cache_policies(self) -> dict[str, CachePolicy]:
+        s = self._settings
+        return {
+            "products": CachePolicy(s.cache_ttl_seconds, s.cache_max_stale_seconds),
+            "log": CachePolicy(s.cache_log_ttl_seconds, s.cache_max_stale_seconds),
+            "invoices": CachePolicy(s.cache_invoices_ttl_seconds, s.cache_max_stale_seconds),
+            "archive": CachePolicy(s.cache_archive_ttl_seconds, max(s.cache_max_stale_seconds, s.cache_archive_ttl_seconds)),
+        }
+
+    def cache_stats(self) -> dict[str, dict]:
+        return self._cache.stats()
+
+    def scheduler_stats(self) -> dict:
+        return self._scheduler.stats()
+
+    def breaker_stats(self) -> dict[str, dict]:
+        return {target: breaker.stats() for target, breaker in self._breakers.items()}
+
+    def _get_spreadsheet(self) -> Spreadsheet:
+        with self._handles_lock:
+            if self._spreadsheet is None and self._settings.storage_backend == "local":
+                self._spreadsheet = self._open_local()
+            if self._spreadsheet is None:
+                client = get_google_clients().sheets()
+                sheet_id = self._settings.google_sheet_id
+                if not sheet_id:
+                    raise RuntimeError("GOOGLE_SHEET_ID not set")
+                self._spreadsheet = self._call("open_by_key", client.open_by_key, sheet_id)
+            return self._spreadsheet
+
+    def _open_local(self) -> LocalSpreadsheet:
+        spreadsheet = open_local_spreadsheet()
+        for title, header in ((TAB_INVENTORY, INVENTORY_HEADERS), (TAB_LOG, LOG_HEADERS), (TAB_ARCHIVE, [])):
+            spreadsheet.ensure_tab(title, header)
+        logger.info("Using local storage %s", spreadsheet.path)
+        return spreadsheet
+
+    def _get_worksheet(self, tab_name: str) -> Worksheet:
+        # Worksheet handles are cached: each lookup is a metadata round trip
+        ws = self._worksheets.get(tab_name)
+        if ws is None:
+            with self._handles_lock:
+                ws = self._worksheets.get(tab_name)
+                if ws is None:
+                    ws = self._call("worksheet", self._get_spreadsheet().worksheet, tab_name)
+                    self._worksheets[tab_name] = ws
+        return ws
+
+    def _call(self, op: str, func, *args, **kwargs):
+        """Make one Google API call through its circuit breaker and the quota scheduler.
+
+        Each attempt is counted against the current endpoint and recorded for
+        /metrics. Sheets calls are paced by the token bucket; Drive has its own
+        quota and is only retried, and an unthrottled local store is only
+        retried too. While the breaker is open, calls raise
+        ``CircuitOpenError`` before queueing for a token.
+        """
+        tab = call_target(func)
+        breaker = self._breakers["drive" if tab == "drive" else "sheets"]
+        breaker.check()
+
+        def attempt():
+            with breaker.guard():
+                api_calls.record(op)
+                start = time.perf_counter()
+                try:
+                    result = func(*args, **kwargs)
+                except Exception as exc:
+                    observe_google_call(tab, op, time.perf_counter() - start, exc)
+                    raise
+                observe_google_call(tab, op, time.perf_counter() - start)
+                return result
+
+        return self._scheduler.run(tab, op, attempt, throttle=self._throttle and tab != "drive")
+
+    def _write_row(self, ws: Worksheet, row_num: int, row: list[str], updates: dict[str, object]) -> list[str]:
+        """Write several cells of one row in a single batch_update.
+
+        Returns the row as it now reads in the sheet, so callers can build the
+        updated Product without reading it back.
+        """
+        return self._write_rows(ws, [(row_num, row, updates)])[0]
+
+    def _write_rows(
+        self, ws: Worksheet, writes: list[tuple[int, list[str], dict[str, object]]]
+    ) -> list[list[str]]:
+        """Write cell updates for any number of rows in a single batch_update."""
+        data = []
+        new_rows = []
+        for row_num, row, updates in writes:
+            data.extend(row_update_ranges(row_num, updates))
+            new_rows.append(apply_row_updates(row, updates))
+        if data:
+            self._call("batch_update", ws.batch_update, data, value_input_option="USER_ENTERED")
+        return new_rows
+
+    def _store_row(self, row_num: int, row: list[str], updates: Optional[dict[str, object]] = None) -> Product:
+        """Record a row we just wrote in the index and product cache.
+
+        With ``updates``, only those cells are applied, on top of the row as
+        currently indexed, so writers touching different columns of the same
+        row (a markup change and a sale) don't undo each other.
+        """
+        with self._lock:
+            if updates is not None:
+                entry = self._index.get(row[COL["material_no"]])
+                base = entry[1] if entry is not None and entry[0] == row_num else row
+                row = apply_row_updates(base, updates)
+            product = parse_product_row(row_num, row)
+            self._index[row[COL["material_no"]]] = (row_num, row)
+            self._write_gen += 1
+            self._written[row[COL["material_no"]]] = self._write_gen
+            products = self._cache.peek("products")
+            pos = self._positions.get(product.material_no)
+            if products is not None and pos is not None:
+                products[pos] = product
+            changed = self._versions.observe(product)
+            version = self._versions.token
+        if changed:
+            self._publish_products(version, [product], [])
+        return product
+
+    def _publish_products(self, version: str, products: list[Product], deleted: list[str]):
+        broker.publish("products", {
+            "version": version,
+            "products": [p.model_dump() for p in products],
+            "deleted": deleted,
+        })
+
+    def _invalidate_cache(self, key: Optional[str] = None):
+        """Drop one cached tab (or all); dropping products also drops the row index."""
+        with self._lock:
+            self._cache.invalidate(key)
+            if key in (None, "products"):
+                self._index = {}
+                self._positions = {}
 
     def get_all_products(self) -> list[Product]:
         """Get all products from the Inventory tab."""
-        if self._is_cache_valid() and "products" in self._cache:
-            return self._cache["products"]
+        return self._cache.get("products", self._load_inventory)
 
+    def _load_inventory(self) -> list[Product]:
+        """Read the whole Inventory tab, rebuilding the row index (cache loader)."""
         ws = self._get_worksheet(TAB_INVENTORY)
-        rows = ws.get_all_values()
+        with self._lock:
+            write_gen = self._write_gen
+        rows = self._call("get_all_values", ws.get_all_values)
+        # skip header, row_number is 1-indexed
+        products = self._install_inventory(
+            [(i, row) for i, row in enumerate(rows[1:], start=2) if row and row[COL["material_no"]]],
+            written_after=write_gen,
+        )
+        threading.Thread(target=self.save_local_snapshot, name="snapshot", daemon=True).start()
+        return products
 
+    def _install_inventory(
+        self,
+        numbered_rows: list[tuple[int, list[str]]],
+        journal_after: int = 0,
+        written_after: Optional[int] = None,
+    ) -> list[Product]:
+        """Rebuild the index and product list from (row_number, row) pairs.
+
+        Rows we wrote after write generation ``written_after`` (while the tab
+        was being read) are kept as written; that includes rows stored by a
+        journal replay that completed meanwhile. Journaled changes newer than
+        ``journal_after`` that are not in the sheet yet are applied on top of
+        the others, so a reload doesn't undo them. Sent adjustments whose
+        write already shows in the row read are not applied twice.
+        """
         products = []
-        for i, row in enumerate(rows[1:], start=2):  # skip header, row_number is 1-indexed
-            if not row or not row[0]:
-                continue
-            try:
-                purina_cost = float(row[COL["purina_cost"]] or 0)
-                pallet_cost = float(row[COL["pallet_cost"]] or 0)
-                markup_pct = float(row[COL["markup_pct"]] or 0.25)
-                pre_tax = float(row[COL["retail_pre_tax"]] or 0)
-                with_tax = float(row[COL["retail_with_tax"]] or 0)
-                qty = int(float(row[COL["qty_on_hand"]] or 0))
-                reorder = int(float(row[COL["reorder_point"]] or 5))
-            except (ValueError, IndexError):
-                continue
-
-            products.append(Product(
-                row_number=i,
-                material_no=row[COL["material_no"]],
-                formula_code=row[COL["formula_code"]],
-                product_name=row[COL["product_name"]],
-                product_form=row[COL["product_form"]],
-                unit_weight=row[COL["unit_weight"]],
-                purina_cost=purina_cost,
-                pallet_cost=pallet_cost,
-                markup_pct=markup_pct,
-                retail_pre_tax=pre_tax if pre_tax else calc_retail_pre_tax(purina_cost, markup_pct),
-                retail_with_tax=with_tax if with_tax else calc_retail_with_tax(
-                    pre_tax if pre_tax else calc_retail_pre_tax(purina_cost, markup_pct)
-                ),
-                qty_on_hand=qty,
-                reorder_point=reorder,
-                last_updated=row[COL["last_updated"]] if len(row) > COL["last_updated"] else "",
-                notes=row[COL["notes"]] if len(row) > COL["notes"] else "",
-            ))
-
-        self._cache["products"] = products
-        self._cache_time = time.time()
+        index: dict[str, tuple[int, list[str]]] = {}
+        positions: dict[str, int] = {}
+        for i, row in numbered_rows:
+            index.setdefault(row[COL["material_no"]], (i, row))
+            product = parse_product_row(i, row)
+            if product is not None:
+                positions.setdefault(product.material_no, len(products))
+                products.append(product)
+
+        def replace(material_no: str, row_num: int, row: list[str]):
+            index[material_no] = (row_num, row)
+            product = parse_product_row(row_num, row)
+            if product is not None and material_no in positions:
+                products[positions[material_no]] = product
+
+        with self._lock:
+            kept = set()
+            if written_after is not None:
+                for material_no, gen in self._written.items():
+                    current, read = self._index.get(material_no), index.get(material_no)
+                    if gen > written_after and current and read and read[0] == current[0]:
+                        replace(material_no, *current)  # already includes its journaled changes
+                        kept.add(material_no)
+            # Read under _lock: a change journaled after this is stored on top
+            if self._journal is not None:
+                for material_no, entries in self._journal.pending_by_material(journal_after).items():
+                    if material_no not in index or material_no in kept or not entries:
+                        continue
+                    row_num, row = index[material_no]
+                    row = undo_sent(row, entries) or row
+                    replace(material_no, row_num, apply_journaled(row, entries))
+            self._index = index
+            self._positions = positions
+            first_load = self._versions.version == 0
+            changed, deleted = self._versions.observe_all(products)
+            version = self._versions.token
+        if (changed or deleted) and not first_load:
+            self._publish_products(version, changed, deleted)
         return products
 
+    def _snapshot_path(self) -> Path:
+        return Path(self._settings.data_dir) / SNAPSHOT_FILE
+
+    def save_local_snapshot(self):
+        """Write the indexed Inventory rows and the log tail to DATA_DIR.
+
+        Read back by ``load_local_snapshot`` when the machine next starts, so
+        the first requests don't wait on Google. Written to a temp file and
+        renamed, so a stop mid-write leaves the previous snapshot intact.
+        """
+        with self._lock:
+            if not self._index:
+                return
+            inventory = sorted(self._index.values())
+            journal_seq = self._journal_seq
+            log = {
+                "last_row": self._log_last_row,
+                "floor": self._log_floor,
+                "entries": [[row_num, entry.model_dump()] for row_num, entry in self._log_tail],
+            }
+        snapshot = {
+            "format": SNAPSHOT_FORMAT,
+            "sheet_id": self._settings.google_sheet_id,
+            "saved_at": time.time(),
+            "inventory": inventory,
+            "journal_seq": journal_seq,  # journaled changes the inventory rows include
+            "log": log if log["last_row"] is not None else None,
+        }
+        path = self._snapshot_path()
+        tmp = path.with_suffix(".tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp.write_text(json.dumps(snapshot, separators=(",", ":")))
+            os.replace(tmp, path)
+        except OSError as exc:
+            logger.warning("Could not save snapshot to %s: %s", path, exc)
+
+    def load_local_snapshot(self) -> bool:
+        """Seed the products and log caches from the last saved snapshot.
+
+        The entries are marked stale, so they are served at once while the
+        first request (or ``warm_up``) reloads them from Google.
+        Returns False when there is no usable snapshot, or when the service
+        already holds live data.
+        """
+        with self._lock:
+            if self._index:
+                return False
+        path = self._snapshot_path()
+        try:
+            snapshot = json.loads(path.read_text())
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as exc:
+            logger.warning("Ignoring unreadable snapshot %s: %s", path, exc)
+            return False
+        if snapshot.get("format") != SNAPSHOT_FORMAT or snapshot.get("sheet_id") != self._settings.google_sheet_id:
+            logger.info("Ignoring snapshot from another sheet or format")
+            return False
+
+        products = self._install_inventory(
+            [(row_num, row) for row_num, row in snapshot["inventory"]], journal_after=snapshot.get("journal_seq", 0)
+        )
+        self._cache.prime("products", products)
+        log = snapshot.get("log")
+        if log:
+            with self._lock:
+                self._log_tail = deque(
+                    ((row_num, LogEntry(**entry)) for row_num, entry in log["entries"]), maxlen=LOG_BUFFER_SIZE
+                )
+                self._log_floor = log["floor"]
+                self._log_last_row = log["last_row"]
+            self._cache.prime("log", log["last_row"])
+        logger.info(
+            "Warm start: %d products and %d log entries from a snapshot %.0fs old",
+            len(products), len(log["entries"]) if log else 0, time.time() - snapshot["saved_at"],
+        )
+        return True
+
+    def _open_worksheets(self):
+        """Open the spreadsheet and cache every tab handle from one metadata read."""
+        spreadsheet = self._get_spreadsheet()
+        worksheets = self._call("worksheets", spreadsheet.worksheets)
+        with self._handles_lock:
+            for ws in worksheets:
+                self._worksheets.setdefault(ws.title, ws)
+
+    def warm_up(self) -> dict[str, float]:
+        """Open the spreadsheet, then reload the products, log and invoice
+        caches in parallel.
+
+        Run at start-up so the first requests find open handles and fresh
+        caches; requests arriving meanwhile wait on the same loads rather than
+        starting their own. Failures are logged, not raised. Returns the
+        seconds each step took.
+        """
+        loaders = {
+            "products": self._load_inventory,
+            "log": self._refresh_log_tail,
+            "invoices": self._load_last_invoice_number,
+        }
+
+        def timed(step, func):
+            start = time.perf_counter()
+            try:
+                func()
+            except Exception as exc:
+                logger.warning("Warm-up step %s failed: %s", step, exc)
+                return None
+            return round(time.perf_counter() - start, 3)
+
+        timings = {"spreadsheet": timed("spreadsheet", self._open_worksheets)}
+        if timings["spreadsheet"] is not None:
+            # Own threads rather than the I/O pool, which may be running this
+            with ThreadPoolExecutor(max_workers=len(loaders), thread_name_prefix="warm-up") as pool:
+                futures = {
+                    key: pool.submit(timed, key, lambda key=key, loader=loader: self._cache.load(key, loader))
+                    for key, loader in loaders.items()
+                }
+            timings.update((key, future.result()) for key, future in futures.items())
+        with self._lock:
+            self._warm_up_seconds = timings
+        logger.info("Warm-up done: %s", timings)
+        return timings
+
+    def startup_stats(self) -> dict:
+        return {"warm_up_seconds": self._warm_up_seconds}
+
+    def start_journal(self):
+        """Start replaying journaled changes (including any left from before a restart)."""
+        if self._journal is not None:
+            self._journal.start()
+
+    def stop_journal(self):
+        if self._journal is not None:
+            self._journal.stop()
+
+    def flush_journal(self, timeout: float = 30.0) -> bool:
+        """Wait until every journaled change is in the sheet; False on timeout."""
+        return self._journal is None or self._journal.flush(timeout)
+
+    def journal_stats(self) -> dict:
+        if self._journal is None:
+            return {"enabled": False}
+        return {"enabled": True, **self._journal.stats()}
+
+    def products_snapshot(self) -> tuple[str, list[Product]]:
+        """The current product-set version token and a consistent copy of the products."""
+        products = self.get_all_products()
+        with self._lock:
+            return self._versions.token, list(products)
+
+    def encoded_products(self) -> EncodedProducts:
+        """The product list as response bytes, encoded once per version."""
+        version, products = self.products_snapshot()
+        encoded = self._encoded_products
+        if encoded is None or encoded.version != version:
+            encoded = EncodedProducts.encode(version, products)
+            with self._lock:
+                if self._versions.token == version:
+                    self._encoded_products = encoded
+        return encoded
+
+    def products_since(self, token: str) -> dict:
+        """Products changed (and material numbers deleted) since a version token.
+
+        Falls back to the full list, with ``full`` set, when the token is from
+        another process lifetime or otherwise unknown.
+        """
+        products = self.get_all_products()
+        with self._lock:
+            current = self._versions.token
+            delta = self._versions.since(token)
+            products = list(products)
+        if delta is None:
+            return {"version": current, "full": True, "products": products, "deleted": []}
+        changed, deleted = delta
+        return {
+            "version": current,
+            "full": False,
+            "products": [p for p in products if p.material_no in changed],
+            "deleted": deleted,
+        }
+
     def _find_product_row(self, material_no: str) -> tuple[int, list[str]]:
-        """Find the row number and data for a product by material number."""
-        ws = self._get_worksheet(TAB_INVENTORY)
-        rows = ws.get_all_values()
-        for i, row in enumerate(rows[1:], start=2):
-            if row and row[COL["material_no"]] == material_no:
-                return i, row
-        raise ValueError(f"Product not found: {material_no}")
+        """Find the row number and data for a product by material number.
+
+        Served from the index; the tab is only read when the index is empty or
+        the product is unknown (it may have been added to the sheet by hand).
+        Lookups that miss at the same time share one reload.
+        """
+        entry = self._index.get(material_no)
+        if entry is None and not self._index:
+            self.get_all_products()
+            entry = self._index.get(material_no)
+        if entry is None:
+            self._cache.load("products", self._load_inventory)
+            entry = self._index.get(material_no)
+        if entry is None:
+            raise ValueError(f"Product not found: {material_no}")
+        return entry
+
+    def product_rows(self) -> dict[str, int]:
+        """Map every material number in the Inventory tab to its row number."""
+        if not self._index:
+            self.get_all_products()
+        return {material_no: row_num for material_no, (row_num, _) in self._index.items()}
 
     def update_markup(self, material_no: str, markup_pct: float) -> Product:
         """Update markup % for a product. Recalculates retail prices."""
-        row_num, row = self._find_product_row(material_no)
+        self._find_product_row(material_no)  # unknown products fail before locking
+        if self._journal is not None:
+            with self._material_locks.hold(material_no):
+                return self._journal_changes([(MARKUP, material_no, {"markup_pct": markup_pct})])[0]
         ws = self._get_worksheet(TAB_INVENTORY)
 
-        purina_cost = float(row[COL["purina_cost"]] or 0)
-        pre_tax = calc_retail_pre_tax(purina_cost, markup_pct)
-        with_tax = calc_retail_with_tax(pre_tax)
-        now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M")
-
-        # Update markup, pre-tax, with-tax, last_updated (H, I, J, M columns = 8, 9, 10, 13 in 1-indexed)
-        ws.update_cell(row_num, COL["markup_pct"] + 1, markup_pct)
-        ws.update_cell(row_num, COL["retail_pre_tax"] + 1, pre_tax)
-        ws.update_cell(row_num, COL["retail_with_tax"] + 1, with_tax)
-        ws.update_cell(row_num, COL["last_updated"] + 1, now)
-
-        self._invalidate_cache()
-
-        # Return updated product
-        products = self.get_all_products()
-        return next(p for p in products if p.material_no == material_no)
+        with self._material_locks.hold(material_no):
+            # Price from the cost the sheet holds now; it may have been edited by hand
+            row_num, row = self._current_row(ws, material_no)
+            purina_cost = float(row[COL["purina_cost"]] or 0)
+            pre_tax = calc_retail_pre_tax(purina_cost, markup_pct)
+            with_tax = calc_retail_with_tax(pre_tax)
+            now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M")
+
+            # Update markup, pre-tax, with-tax, last_updated (H:J and M) in one call
+            updates = {
+                "markup_pct": markup_pct,
+                "retail_pre_tax": pre_tax,
+                "retail_with_tax": with_tax,
+                "last_updated": now,
+            }
+            return self._store_row(row_num, self._write_row(ws, row_num, row, updates))
 
     def update_reorder_point(self, material_no: str, reorder_point: int) -> Product:
         """Update reorder point for a product."""
-        row_num, _ = self._find_product_row(material_no)
+        self._find_product_row(material_no)  # unknown products fail before locking
+        if self._journal is not None:
+            with self._material_locks.hold(material_no):
+                return self._journal_changes([(REORDER, material_no, {"reorder_point": reorder_point})])[0]
         ws = self._get_worksheet(TAB_INVENTORY)
 
-        ws.update_cell(row_num, COL["reorder_point"] + 1, reorder_point)
-        ws.update_cell(row_num, COL["last_updated"] + 1,
-                       datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M"))
-
-        self._invalidate_cache()
-        products = self.get_all_products()
-        return next(p for p in products if p.material_no == material_no)
+        with self._material_locks.hold(material_no):
+            row_num, row = self._current_row(ws, material_no)
+            updates = {
+                "reorder_point": reorder_point,
+                "last_updated": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M"),
+            }
+            return self._store_row(row_num, self._write_row(ws, row_num, row, updates))
+
+    def _current_row(self, ws: Worksheet, material_no: str) -> tuple[int, list[str]]:
+        """The product's row as the sheet has it now (see ``_verify_rows``).
+
+        Called with the product's lock held, so the row can be written back
+        whole without undoing another writer.
+        """
+        return self._verify_rows(ws, {material_no: self._find_product_row(material_no)})[material_no]
+
+    def _verify_rows(
+        self, ws: Worksheet, located: dict[str, tuple[int, list[str]]]
+    ) -> dict[str, tuple[int, list[str]]]:
+        """Re-read the rows about to be written and return them as the sheet has them.
+
+        This is the compare step of the compare-and-set: our own writes are
+        serialized per material, but the sheet can also be edited by hand. A
+        row whose quantity changed under us is taken from the sheet (and the
+        index updated); if a row no longer holds its material, the rows have
+        moved and the index is rebuilt. All rows are read in one batch_get.
+        """
+        current_rows, moved = self._read_rows(ws, located)
+        verified = {}
+        for material_no, (row_num, current) in current_rows.items():
+            row = located[material_no][1]
+            if not _same_number(current[COL["qty_on_hand"]] or "0", float(row[COL["qty_on_hand"]] or 0)):
+                logger.warning(
+                    "Quantity for %s changed in the sheet (%s -> %s); using the sheet value",
+                    material_no, row[COL["qty_on_hand"]], current[COL["qty_on_hand"]],
+                )
+                stale_rows.inc("quantity")
+                self._store_row(row_num, current)
+            verified[material_no] = (row_num, current)
+        if moved:
+            self._invalidate_cache("products")
+            for material_no in moved:
+                verified[material_no] = self._find_product_row(material_no)
+        return verified
+
+    def _read_rows(
+        self, ws: Worksheet, located: dict[str, tuple[int, list[str]]]
+    ) -> tuple[dict[str, tuple[int, list[str]]], list[str]]:
+        """Read the located rows in one batch_get, as the sheet has them now.
+
+        Returns the rows still holding their material, and the materials
+        whose row now holds something else (rows have moved).
+        """
+        materials = list(located)
+        values = self._call(
+            "batch_get", ws.batch_get, [f"A{located[m][0]}:{rowcol_to_a1(located[m][0], len(COL))}" for m in materials]
+        )
+        current_rows = {}
+        moved = []
+        for material_no, rows in zip(materials, values):
+            row_num = located[material_no][0]
+            current = list(rows[0]) if rows else []
+            current += [""] * (len(COL) - len(current))
+            if current[COL["material_no"]] != material_no:
+                moved.append(material_no)
+                continue
+            current_rows[material_no] = (row_num, current)
+        if moved:
+            logger.warning("Rows moved in the Inventory tab; rebuilding the index")
+            stale_rows.inc("moved", amount=len(moved))
+        return current_rows, moved
 
     def adjust_inventory(
-        self, material_no: str, change_type: str, quantity: int, notes: str = "", changed_by: str = "web"
+        self,
+        material_no: str,
+        change_type: str,
+        quantity: int,
+        notes: str = "",
+        changed_by: str = "web",
+        idempotency_key: Optional[str] = None,
     ) -> Product:
-        """Adjust inventory for a single product and log the change."""
-        row_num, row = self._find_product_row(material_no)
+        """Adjust inventory for a single product and log the change.
+
+        With the journal on, the change is committed locally and replayed to
+        the sheet later. Otherwise the read-modify-write of the quantity runs
+        under the product's lock, after checking the sheet still holds the
+        quantity we are adding to. Either way a repeated ``idempotency_key``
+        is not applied twice.
+        """
+        self._find_product_row(material_no)  # unknown products fail before locking
+        if self._journal is not None:
+            adjustment = {"material_no": material_no, "change_type": change_type, "quantity": quantity, "notes": notes}
+            with self._material_locks.hold(material_no):
+                return self._journal_adjustments([adjustment], changed_by, idempotency_key)[0]
         ws = self._get_worksheet(TAB_INVENTORY)
 
-        previous_qty = int(float(row[COL["qty_on_hand"]] or 0))
-        new_qty = previous_qty + quantity
-        if new_qty < 0:
-            new_qty = 0
-        now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M")
+        with self._material_locks.hold(material_no):
+            if self._seen_request(idempotency_key):
+                return parse_product_row(*self._find_product_row(material_no))
+            row_num, row = self._current_row(ws, material_no)
 
-        # Update qty and timestamp
-        ws.update_cell(row_num, COL["qty_on_hand"] + 1, new_qty)
-        ws.update_cell(row_num, COL["last_updated"] + 1, now)
-
-        # Append to log
-        self._append_log(
-            product_name=row[COL["product_name"]],
-            material_no=material_no,
-            change_type=change_type,
-            qty_changed=quantity,
-            previous_qty=previous_qty,
-            new_qty=new_qty,
-            changed_by=changed_by,
-            notes=notes,
-        )
+            previous_qty = int(float(row[COL["qty_on_hand"]] or 0))
+            new_qty = previous_qty + quantity
+            if new_qty < 0:
+                new_qty = 0
+            now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M")
 
-        self._invalidate_cache()
-        products = self.get_all_products()
-        return next(p for p in products if p.material_no == material_no)
+            # Update qty and timestamp
+            updates = {"qty_on_hand": new_qty, "last_updated": now}
+            self._write_row(ws, row_num, row, updates)
+            product = self._store_row(row_num, row, updates)
+
+            # Append to log (still under the lock, so log order matches the quantities)
+            self._append_log(
+                product_name=row[COL["product_name"]],
+                material_no=material_no,
+                change_type=change_type,
+                qty_changed=quantity,
+                previous_qty=previous_qty,
+                new_qty=new_qty,
+                changed_by=changed_by,
+                notes=notes,
+            )
+            self._remember_request(idempotency_key)
+
+        return product
 
     def bulk_adjust_inventory(
-        self, adjustments: list[dict], changed_by: str = "web"
+        self, adjustments: list[dict], changed_by: str = "web", idempotency_key: Optional[str] = None
     ) -> list[Product]:
-        """Adjust inventory for multiple products."""
+        """Adjust inventory for multiple products.
+
+        Locates rows through the index, applies every adjustment in memory (in
+        order, so repeated material numbers accumulate), then writes all changed
+        rows in one batch_update and all log rows in one append_rows.
+        Returns the product as it stood after each adjustment.
+
+        Holds the locks of every product in the batch and checks their rows
+        against the sheet first, as ``adjust_inventory`` does. With the
+        journal on, the batch is committed locally in one transaction instead.
+        """
+        if not adjustments:
+            return []
+        # Locate (and so validate) the whole batch before writing anything
+        materials = list(dict.fromkeys(adj["material_no"] for adj in adjustments))
+        for material_no in materials:
+            self._find_product_row(material_no)
+
+        if self._journal is not None:
+            with self._material_locks.hold(*materials):
+                return self._journal_adjustments(adjustments, changed_by, idempotency_key)
+        ws = self._get_worksheet(TAB_INVENTORY)
+
+        with self._material_locks.hold(*materials):
+            if self._seen_request(idempotency_key):
+                return [parse_product_row(*self._find_product_row(adj["material_no"])) for adj in adjustments]
+            located = self._verify_rows(ws, {m: self._find_product_row(m) for m in materials})
+            results = self._apply_adjustments(ws, located, adjustments, changed_by)
+            self._remember_request(idempotency_key)
+            return results
+
+    def _seen_request(self, key: Optional[str]) -> bool:
+        """Whether a request with this idempotency key was applied already.
+
+        For writes straight to the sheet (the journal keeps its own keys).
+        Called with the request's material locks held, so a retry arriving
+        while the first attempt is still writing waits for it.
+        """
+        with self._lock:
+            return key is not None and key in self._request_keys
+
+    def _remember_request(self, key: Optional[str]):
+        if key is None:
+            return
+        with self._lock:
+            self._request_keys[key] = None
+            self._request_keys.move_to_end(key)
+            while len(self._request_keys) > REQUEST_KEYS_KEPT:
+                self._request_keys.popitem(last=False)
+
+    def _apply_adjustments(
+        self,
+        ws: Worksheet,
+        located: dict[str, tuple[int, list[str]]],
+        adjustments: list[dict],
+        changed_by: str,
+    ) -> list[Product]:
+        # Called with the material locks held
+        now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M")
+        current: dict[str, list[str]] = {}
+        log_rows = []
         results = []
         for adj in adjustments:
-            product = self.adjust_inventory(
-                material_no=adj["material_no"],
+            material_no = adj["material_no"]
+            row_num, row = located[material_no]
+            row = current.get(material_no, row)
+
+            previous_qty = int(float(row[COL["qty_on_hand"]] or 0))
+            new_qty = max(previous_qty + adj["quantity"], 0)
+            row = apply_row_updates(row, {"qty_on_hand": new_qty, "last_updated": now})
+            current[material_no] = row
+
+            log_rows.append(self._log_row(
+                product_name=row[COL["product_name"]],
+                material_no=material_no,
                 change_type=adj["change_type"],
-                quantity=adj["quantity"],
-                notes=adj.get("notes", ""),
+                qty_changed=adj["quantity"],
+                previous_qty=previous_qty,
+                new_qty=new_qty,
                 changed_by=changed_by,
-            )
-            results.append(product)
+                notes=adj.get("notes", "") or "",
+            ))
+            results.append(parse_product_row(row_num, row))
+
+        self._write_rows(ws, [
+            (located[material_no][0], row, {
+                "qty_on_hand": row[COL["qty_on_hand"]],
+                "last_updated": row[COL["last_updated"]],
+            })
+            for material_no, row in current.items()
+        ])
+        self._append_log_rows(log_rows)
+
+        for material_no, row in current.items():
+            self._store_row(located[material_no][0], row, {
+                "qty_on_hand": row[COL["qty_on_hand"]],
+                "last_updated": row[COL["last_updated"]],
+            })
         return results
 
+    def _journal_adjustments(
+        self, adjustments: list[dict], changed_by: str, idempotency_key: Optional[str]
+    ) -> list[Product]:
+        # Called with the material locks held
+        changes = [
+            (ADJUST, adj["material_no"], {
+                "change_type": adj["change_type"],
+                "quantity": adj["quantity"],
+                "notes": adj.get("notes", "") or "",
+                "changed_by": changed_by,
+            })
+            for adj in adjustments
+        ]
+        results = self._journal_changes(changes, idempotency_key)
+        if results is None:
+            # A retried request: answer with the products as they now stand
+            return [parse_product_row(*self._find_product_row(adj["material_no"])) for adj in adjustments]
+        return results
+
+    def _journal_changes(
+        self, changes: list[tuple[str, str, dict]], idempotency_key: Optional[str] = None
+    ) -> Optional[list[Product]]:
+        """Commit (kind, material_no, data) changes to the journal, then apply
+        them to the index.
+
+        Returns the product after each change, or None when the key was
+        recorded before. Called with the material locks held, so the indexed
+        rows can't change between reading and storing them.
+        """
+        at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        current: dict[str, tuple[int, list[str]]] = {}
+        updated: dict[str, dict[str, object]] = {}
+        entries = []
+        results = []
+        log_rows = []
+        for kind, material_no, data in changes:
+            row_num, row = current.get(material_no) or self._find_product_row(material_no)
+            data = {**data, "at": at}
+            updates = journal_updates(row, kind, data)
+            if kind == ADJUST:
+                data.update(
+                    product_name=row[COL["product_name"]],
+                    previous_qty=int(float(row[COL["qty_on_hand"]] or 0)),
+                    new_qty=updates["qty_on_hand"],
+                )
+                log_rows.append([str(v) for v in journal_log_row(row[COL["product_name"]], material_no, data)])
+            row = apply_row_updates(row, updates)
+            current[material_no] = (row_num, row)
+            updated.setdefault(material_no, {}).update(updates)
+            entries.append((kind, material_no, data))
+            results.append(parse_product_row(row_num, row))
+
+        seq = self._journal.record(entries, idempotency_key)
+        if seq is None:
+            return None
+        for material_no, updates in updated.items():
+            self._store_row(*current[material_no], updates)
+        with self._lock:
+            self._journal_seq = max(self._journal_seq, seq)
+        if log_rows:
+            self._publish_log(log_rows)
+        return results
+
+    def _replicate(self, entries: list[dict]):
+        """Write a batch of journaled changes to the sheet (journal replay thread).
+
+        The batch's rows are read in one batch_get and each product's changes
+        re-applied, in order, to the row as the sheet has it, so a quantity
+        edited by hand since is added to rather than overwritten. Then every
+        changed cell goes in one batch_update and every log row in one
+        append_rows.
+        """
+        ws = self._get_worksheet(TAB_INVENTORY)
+        groups: dict[str, list[dict]] = {}
+        for entry in entries:
+            groups.setdefault(entry["material_no"], []).append(entry)
+
+        failed: dict[int, str] = {}
+        sheet_rows: dict[str, tuple[int, list[str]]] = {}
+        pending = list(groups)
+        for _ in range(2):
+            located = {}
+            for material_no in pending:
+                try:
+                    located[material_no] = self._find_product_row(material_no)
+                except ValueError as exc:
+                    failed.update((entry["seq"], str(exc)) for entry in groups[material_no])
+            if not located:
+                break
+            found, pending = self._read_rows(ws, located)
+            sheet_rows.update(found)
+            if not pending:
+                break
+            self._invalidate_cache("products")  # rows moved: look them up again in a fresh index
+        else:
+            raise RuntimeError(f"Inventory rows moved while replaying: {', '.join(pending)}")
+
+        writes = []
+        final: dict[str, tuple[int, list[str]]] = {}
+        log_rows: list[tuple[dict, list]] = []
+        for material_no, group in groups.items():
+            if material_no not in sheet_rows:
+                continue
+            row_num, row = sheet_rows[material_no]
+            row = self._replay_base(material_no, row, group)
+            updates: dict[str, object] = {}
+            for entry in group:
+                data = entry["data"]
+                change = journal_updates(row, entry["kind"], data)
+                if entry["kind"] == ADJUST:
+                    data["previous_qty"] = int(float(row[COL["qty_on_hand"]] or 0))
+                    data["new_qty"] = change["qty_on_hand"]
+                    log_rows.append((entry, journal_log_row(row[COL["product_name"]], material_no, data)))
+                row = apply_row_updates(row, change)
+                updates.update(change)
+            writes.append((row_num, row, updates))
+            final[material_no] = (row_num, row)
+
+        if any(entry["status"] == SENT for entry, _ in log_rows):
+            log_rows = self._unlogged(log_rows)
+        self._journal.mark_sent([entry for entry in entries if entry["seq"] not in failed])
+        self._write_rows(ws, writes)
+        span = self._write_log_rows([row for _, row in log_rows])
+
+        # Store the rows as written plus anything journaled since, and drop
+        # the batch from the journal, in one step as far as readers can tell
+        with self._material_locks.hold(*final):
+            with self._lock:
+                if span is not None:
+                    self._merge_log_rows(span[0], [[str(v) for v in row] for _, row in log_rows])
+                newer = self._journal.pending_by_material(entries[-1]["seq"])
+                for material_no, (row_num, row) in final.items():
+                    self._store_row(row_num, apply_journaled(row, newer.get(material_no, [])))
+                self._journal.complete(entries, failed)
+
+    def _replay_base(self, material_no: str, row: list[str], entries: list[dict]) -> list[str]:
+        """The row to replay a product's journaled changes onto.
+
+        Normally the sheet's row. If an earlier replay of these changes wrote
+        the quantity before it was cut short, the quantity is taken back to
+        where that replay started, so the same values are written again
+        instead of the changes being applied twice.
+        """
+        adjustments = [entry for entry in entries if entry["kind"] == ADJUST]
+        if not adjustments:
+            return row
+        base = undo_sent(row, adjustments)
+        if base is not None:
+            return base
+        sheet_qty = int(float(row[COL["qty_on_hand"]] or 0))
+        expected = adjustments[0]["data"]["previous_qty"]
+        if sheet_qty != expected:
+            logger.warning(
+                "Quantity for %s changed in the sheet (%s -> %s); applying the journaled changes on top",
+                material_no, expected, sheet_qty,
+            )
+            stale_rows.inc("quantity")
+        return row
+
+    def _unlogged(self, log_rows: list[tuple[dict, list]]) -> list[tuple[dict, list]]:
+        """Leave out log rows that a cut-short replay already appended."""
+        self._cache.set("log", self._refresh_log_tail())
+        with self._lock:
+            logged = {
+                (e.timestamp, e.material_no, e.qty_changed, e.previous_qty, e.new_qty) for _, e in self._log_tail
+            }
+        return [
+            (entry, row) for entry, row in log_rows
+            if entry["status"] != SENT or (row[0], row[2], row[4], row[5], row[6]) not in logged
+        ]
+
     def _append_log(
         self,
         product_name: str,
@@ -253,40 +1389,233 @@ class SheetsService:
         notes: str,
     ):
         """Append a row to the Inventory Log tab."""
-        ws = self._get_worksheet(TAB_LOG)
+        self._append_log_rows([self._log_row(
+            product_name, material_no, change_type, qty_changed, previous_qty, new_qty, changed_by, notes,
+        )])
+
+    @staticmethod
+    def _log_row(
+        product_name: str,
+        material_no: str,
+        change_type: str,
+        qty_changed: int,
+        previous_qty: int,
+        new_qty: int,
+        changed_by: str,
+        notes: str,
+    ) -> list:
         now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
-        ws.append_row(
-            [now, product_name, material_no, change_type, qty_changed, previous_qty, new_qty, changed_by, notes],
-            value_input_option="USER_ENTERED",
-        )
+        return [now, product_name, material_no, change_type, qty_changed, previous_qty, new_qty, changed_by, notes]
+
+    def _append_log_rows(self, log_rows: list[list]):
+        """Append any number of rows to the Inventory Log tab in one call."""
+        if not log_rows:
+            return
+        span = self._write_log_rows(log_rows)
+        rows = [[str(v) for v in row] for row in log_rows]
+        if span is not None:
+            self._merge_log_rows(span[0], rows)
+        self._publish_log(rows)
+
+    def _write_log_rows(self, log_rows: list[list]) -> Optional[tuple[int, int]]:
+        """Append rows to the Inventory Log tab; returns the sheet rows they landed on."""
+        if not log_rows:
+            return None
+        ws = self._get_worksheet(TAB_LOG)
+        response = self._call("append_rows", ws.append_rows, log_rows, value_input_option="USER_ENTERED")
+        return updated_rows(response)
+
+    def _publish_log(self, rows: list[list[str]]):
+        entries = [entry for entry in map(parse_log_row, rows) if entry is not None]
+        broker.publish("log", {"entries": [e.model_dump() for e in entries]})
+
+    def import_pricelist(self, items: list[dict], dry_run: bool = False) -> dict:
+        """Apply parsed price list items to the Inventory tab.
+
+        Each item carries material_no, purina_cost and pallet_cost, plus the
+        descriptive fields used when the product is new. Costs are diffed
+        against the current sheet values and only cells that actually change
+        are written, all in one batch_update; new products go in one
+        append_rows. With dry_run, the diff is returned and nothing is written.
+        """
+        ws = self._get_worksheet(TAB_INVENTORY)
+        # Diff against the sheet as it is now: the cached copy can be minutes
+        # old, and would miss a cost edited by hand since
+        self._cache.load("products", self._load_inventory)
+
+        # A product listed twice takes its last row, as applying them in turn would
+        latest: dict[str, dict] = {}
+        for item in items:
+            latest[item["material_no"]] = item
+
+        changes = []
+        writes = []
+        new_rows = []
+        unchanged = 0
+        for material_no, item in latest.items():
+            entry = self._index.get(material_no)
+            if entry is None:
+                markup = DEFAULT_MARKUP
+                pre_tax = calc_retail_pre_tax(item["purina_cost"], markup)
+                new_rows.append([
+                    material_no, item.get("formula_code", ""), item.get("product_name", ""),
+                    item.get("product_form", ""), item.get("unit_weight", ""),
+                    item["purina_cost"], item["pallet_cost"], markup, pre_tax, calc_retail_with_tax(pre_tax),
+                    0, DEFAULT_REORDER_POINT, "", "",  # qty=0, no timestamp, no notes
+                ])
+                continue
+
+            row_num, row = entry
+            updates = {}
+            for field in ("purina_cost", "pallet_cost"):
+                old = row[COL[field]] if len(row) > COL[field] else ""
+                if not _same_number(old, item[field]):
+                    updates[field] = item[field]
+                    changes.append({
+                        "material_no": material_no,
+                        "product_name": row[COL["product_name"]],
+                        "field": field,
+                        "old": old,
+                        "new": item[field],
+                    })
+            if updates:
+                writes.append((row_num, row, updates))
+            else:
+                unchanged += 1
+
+        if not dry_run:
+            self._write_rows(ws, writes)
+            for row_num, row, updates in writes:
+                self._store_row(row_num, row, updates)
+            if new_rows:
+                self._call("append_rows", ws.append_rows, new_rows, value_input_option="USER_ENTERED")
+                self._invalidate_cache("products")
+
+        return {
+            "updated": len(writes),
+            "unchanged": unchanged,
+            "new_products": [row[COL["product_name"]] for row in new_rows],
+            "changes": changes,
+            "dry_run": dry_run,
+        }
 
     def get_log(self, limit: int = 100) -> list[LogEntry]:
-        """Get recent log entries."""
+        """Get recent log entries, most recent first.
+
+        Served from an in-memory tail of the log. Only rows past the last one
+        we know about are read on refresh, and older rows only when a caller
+        asks for more than the tail holds, so cost follows limit rather than
+        the size of the log.
+        """
+        limit = min(limit, LOG_BUFFER_SIZE)
+        if limit <= 0:
+            return []
+        self._cache.get("log", self._refresh_log_tail)
+        if len(self._log_tail) < limit:
+            try:
+                self._extend_log_tail(limit)
+            except Exception as exc:
+                if not is_outage(exc) or self._log_last_row is None:
+                    raise
+                # Google is down: serve the entries already held
+                record_stale("log", self._cache.age("log") or 0.0)
+        with self._lock:
+            entries = [entry for _, entry in self._log_tail]
+            if self._journal is not None:
+                # Journaled adjustments not yet in the sheet are the newest
+                entries += self._journaled_log_entries()
+        return entries[:-limit - 1:-1]
+
+    def _journaled_log_entries(self) -> list[LogEntry]:
+        rows = [
+            [str(v) for v in journal_log_row(entry["data"]["product_name"], entry["material_no"], entry["data"])]
+            for entry in self._journal.pending() if entry["kind"] == ADJUST
+        ]
+        return [entry for entry in map(parse_log_row, rows) if entry is not None]
+
+    def _refresh_log_tail(self) -> int:
+        """Pick up rows appended to the log since we last looked (cache loader)."""
         ws = self._get_worksheet(TAB_LOG)
-        rows = ws.get_all_values()
-
-        entries = []
-        for row in rows[1:]:  # skip header
-            if not row or not row[0]:
-                continue
+        if self._log_last_row is None:
+            last_row = self._find_last_row(ws)
+            start = max(2, last_row - LOG_INITIAL_ROWS + 1)
+            rows = self._read_log_rows(ws, start, last_row) if last_row >= start else []
+            with self._lock:
+                if self._log_last_row is None:
+                    self._log_tail = deque(parse_log_rows(start, rows), maxlen=LOG_BUFFER_SIZE)
+                    self._log_floor = start
+                    self._log_last_row = max(last_row, 1)
+        else:
+            start = self._log_last_row + 1
             try:
-                entries.append(LogEntry(
-                    timestamp=row[0],
-                    product_name=row[1],
-                    material_no=row[2],
-                    change_type=row[3],
-                    qty_changed=int(float(row[4] or 0)),
-                    previous_qty=int(float(row[5] or 0)),
-                    new_qty=int(float(row[6] or 0)),
-                    changed_by=row[7] if len(row) > 7 else "",
-                    notes=row[8] if len(row) > 8 else "",
-                ))
-            except (ValueError, IndexError):
-                continue
-
-        # Return most recent first, limited
-        entries.reverse()
-        return entries[:limit]
+                rows = self._call("get", ws.get, f"A{start}:I")
+            except gspread.exceptions.APIError as exc:
+                # Appends grow the grid only to the last row written, so a full
+                # grid has no row past its end to read from
+                if not beyond_grid(exc):
+                    raise
+                rows = []
+            self._merge_log_rows(start, rows)
+        return self._log_last_row
+
+    def _merge_log_rows(self, first_row: int, rows: list[list[str]]):
+        """Add newly seen log rows to the tail, ignoring any we already have."""
+        with self._lock:
+            if self._log_last_row is None:
+                return
+            for row_num, entry in parse_log_rows(first_row, rows):
+                if row_num > self._log_last_row:
+                    self._log_tail.append((row_num, entry))
+            self._log_last_row = max(self._log_last_row, first_row + len(rows) - 1)
+            if len(self._log_tail) == self._log_tail.maxlen:
+                self._log_floor = max(self._log_floor, self._log_tail[0][0])
+
+    def _extend_log_tail(self, limit: int):
+        """Read older log rows until the tail holds limit entries or the log starts."""
+        while True:
+            with self._lock:
+                floor, have = self._log_floor, len(self._log_tail)
+            if floor <= 2 or have >= limit:
+                return
+            start = max(2, floor - (limit - have))
+            rows = self._read_log_rows(self._get_worksheet(TAB_LOG), start, floor - 1)
+            with self._lock:
+                if self._log_floor != floor:
+                    return  # another thread got there first
+                older = parse_log_rows(start, rows)
+                room = self._log_tail.maxlen - len(self._log_tail)
+                self._log_tail.extendleft(reversed(older[-room:] if room else []))
+                self._log_floor = start
+
+    def _read_log_rows(self, ws: Worksheet, first_row: int, last_row: int) -> list[list[str]]:
+        """Read log rows first_row..last_row in one call."""
+        return self._call("get", ws.get, f"A{first_row}:I{last_row}")
+
+    def _find_last_row(self, ws: Worksheet) -> int:
+        """Locate the last non-empty row of a tab without reading the whole tab.
+
+        One batch_get samples column A across the grid to find the last filled
+        sample, then one open-ended read from there finds the exact end.
+        """
+        step = max(1, ws.row_count // LAST_ROW_PROBES)
+        probes = list(range(1, ws.row_count + 1, step))
+        samples = self._call("batch_get", ws.batch_get, [f"A{r}" for r in probes])
+        filled = [r for r, value in zip(probes, samples) if value and value[0] and value[0][0]]
+        if not filled:
+            return 0
+        from_row = filled[-1]
+        rest = self._call("get", ws.get, f"A{from_row}:A")
+        return from_row + max(len(rest), 1) - 1
+
+    def get_archive(self) -> PriceListArchive:
+        """Get the Price List Archive tab."""
+        return self._cache.get("archive", self._load_archive)
+
+    def _load_archive(self) -> PriceListArchive:
+        # A large read nobody is waiting on at the counter: queue it behind sales
+        with priority(Lane.BULK):
+            ws = self._get_worksheet(TAB_ARCHIVE)
+            return PriceListArchive.from_values(self._call("get_all_values", ws.get_all_values))
 
     def get_low_stock(self) -> list[Product]:
         """Get products at or below reorder point."""
@@ -295,53 +1624,80 @@ class SheetsService:
 
     # ── Invoice filing ──────────────────────────────────────────────
 
-    def _get_or_create_invoices_tab(self) -> gspread.Worksheet:
+    def _get_or_create_invoices_tab(self) -> Worksheet:
         """Get the Invoices tab, creating it with headers if it doesn't exist."""
-        ss = self._get_spreadsheet()
         try:
-            return ss.worksheet(TAB_INVOICES)
+            return self._get_worksheet(TAB_INVOICES)
         except gspread.WorksheetNotFound:
-            ws = ss.add_worksheet(title=TAB_INVOICES, rows=1000, cols=8)
-            ws.append_row(
-                ["Invoice #", "Date", "Customer", "Items Summary", "Total", "Paid", "Filed At", "Drive URL"],
+            ss = self._get_spreadsheet()
+            ws = self._call("add_worksheet", ss.add_worksheet, title=TAB_INVOICES, rows=1000, cols=8)
+            self._call(
+                "append_row", ws.append_row,
+                INVOICE_HEADERS,
                 value_input_option="USER_ENTERED",
             )
+            with self._handles_lock:
+                self._worksheets[TAB_INVOICES] = ws
             return ws
 
-    def _next_invoice_number(self, ws: gspread.Worksheet) -> str:
-        """Generate the next invoice number like INV-0001."""
-        rows = ws.get_all_values()
-        # rows[0] is header, data rows start at index 1
-        count = len(rows) - 1 if len(rows) > 1 else 0
-        return f"INV-{count + 1:04d}"
-
-    def _build_drive_service(self):
-        """Build a Google Drive API service using the same service account."""
-        creds_json = self._settings.google_credentials_json
-        if not creds_json:
-            raise RuntimeError("GOOGLE_CREDENTIALS_JSON not set")
-        creds_info = json.loads(creds_json)
-        creds = SACredentials.from_service_account_info(creds_info, scopes=DRIVE_SCOPES)
-        return build("drive", "v3", credentials=creds, cache_discovery=False)
-
-    def upload_to_drive(self, file_bytes: bytes, filename: str, mime_type: str = "application/pdf") -> str:
-        """Upload a file to a Shared Drive folder and return its web view URL."""
+    def _load_last_invoice_number(self) -> int:
+        """Highest invoice number recorded in the Invoices tab (cache loader).
+
+        Reads only the end of the tab. Falls back to the data row count when
+        the last row's number can't be parsed.
+        """
+        ws = self._get_or_create_invoices_tab()
+        last_row = self._find_last_row(ws)
+        if last_row < 2:
+            return 0
+        last = self._call("get", ws.get, f"A{last_row}")
+        number = parse_invoice_number(last[0][0] if last and last[0] else "")
+        return max(number or 0, last_row - 1)
+
+    def next_invoice_number(self) -> str:
+        """Allocate the next invoice number like INV-0001."""
+        return self._invoice_seq.next()
+
+    def reserve_invoice_numbers(self, up_to: int):
+        """Mark numbers as taken that aren't in the Invoices tab yet (queued filings)."""
+        self._invoice_seq.reserve(up_to)
+
+    def _drive_chunk_size(self) -> int:
+        # Resumable upload chunks must be a multiple of 256 KiB
+        return max(1, self._settings.drive_upload_chunk_size // DRIVE_CHUNK_UNIT) * DRIVE_CHUNK_UNIT
+
+    def upload_to_drive(self, file_obj: BinaryIO, filename: str, mime_type: str = "application/pdf") -> str:
+        """Upload a file to a Shared Drive folder and return its web view URL.
+
+        The file is streamed in a resumable upload, one chunk in memory at a
+        time. A chunk that fails transiently is retried on its own; the
+        upload resumes from the last byte Drive confirmed.
+        """
         folder_id = self._settings.google_drive_folder_id
         if not folder_id:
             raise RuntimeError("GOOGLE_DRIVE_FOLDER_ID not set")
 
-        logger.info("Uploading %s (%d bytes) to Drive folder %s", filename, len(file_bytes), folder_id)
+        size = file_obj.seek(0, io.SEEK_END)
+        file_obj.seek(0)
+        logger.info("Uploading %s (%d bytes) to Drive folder %s", filename, size, folder_id)
 
-        drive = self._build_drive_service()
         file_metadata = {"name": filename, "parents": [folder_id]}
-        media = MediaIoBaseUpload(io.BytesIO(file_bytes), mimetype=mime_type, resumable=False)
+        from googleapiclient.http import MediaIoBaseUpload  # deferred: only uploads need the Drive client
 
-        uploaded = drive.files().create(
-            body=file_metadata,
-            media_body=media,
-            fields="id, webViewLink, webContentLink",
-            supportsAllDrives=True,
-        ).execute()
+        media = MediaIoBaseUpload(file_obj, mimetype=mime_type, chunksize=self._drive_chunk_size(), resumable=True)
+
+        with get_google_clients().drive() as drive:
+            request = drive.files().create(
+                body=file_metadata,
+                media_body=media,
+                fields="id, webViewLink, webContentLink",
+                supportsAllDrives=True,
+            )
+            uploaded = None
+            while uploaded is None:
+                _, uploaded = self._call(
+                    "drive_upload_chunk", request.next_chunk, num_retries=self._settings.drive_upload_retries,
+                )
 
         file_id = uploaded.get("id", "")
         drive_url = uploaded.get("webViewLink") or uploaded.get("webContentLink") or ""
@@ -353,42 +1709,25 @@ class SheetsService:
         logger.info("Drive upload success: id=%s url=%s", file_id, drive_url)
         return drive_url
 
-    def file_invoice(
+    def log_invoice(
         self,
+        invoice_number: str,
         customer_name: str,
         invoice_date: str,
         items_summary: str,
         total: float,
         paid: bool,
-        pdf_bytes: bytes | None = None,
-    ) -> dict:
-        """Log an invoice to the Invoices sheet and optionally upload PDF to Drive."""
+        drive_url: str = "",
+    ):
+        """Append a filed invoice to the Invoices sheet."""
         ws = self._get_or_create_invoices_tab()
-        inv_num = self._next_invoice_number(ws)
         now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
-
-        drive_url = ""
-        drive_error = ""
-        if not self._settings.google_drive_folder_id:
-            drive_error = "GOOGLE_DRIVE_FOLDER_ID is not configured"
-            logger.warning("GOOGLE_DRIVE_FOLDER_ID not set — skipping Drive upload")
-        elif pdf_bytes:
-            name_part = customer_name.strip().replace(" ", "_")[:20]
-            date_part = invoice_date.replace("-", "")
-            filename = f"Invoice_{name_part}_{date_part}.pdf"
-            try:
-                drive_url = self.upload_to_drive(pdf_bytes, filename)
-            except Exception as exc:
-                drive_error = str(exc)
-                logger.error("Drive upload failed for %s: %s", inv_num, exc, exc_info=True)
-
-        ws.append_row(
-            [inv_num, invoice_date, customer_name, items_summary, f"${total:.2f}", "Yes" if paid else "No", now, drive_url],
+        self._call(
+            "append_row", ws.append_row,
+            [invoice_number, invoice_date, customer_name, items_summary, f"${total:.2f}", "Yes" if paid else "No", now, drive_url],
             value_input_option="USER_ENTERED",
         )
 
-        return {"invoice_number": inv_num, "drive_url": drive_url, "drive_error": drive_error}
-
 
 # Singleton instance
 _sheets_service: Optional[SheetsService] = None
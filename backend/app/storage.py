@@ -0,0 +1,442 @@
+"""Storage backends under ``SheetsService``.
+
+``SheetsService`` uses a small slice of the gspread API, described by the
+``Spreadsheet`` and ``Worksheet`` protocols below. It looks up and creates
+tabs, reads A1 ranges, writes ranges in batches and appends rows. gspread's
+own objects satisfy the protocols (``STORAGE_BACKEND=sheets``, the default).
+
+``LocalSpreadsheet`` implements the same calls on SQLite, either a file or
+``:memory:`` (``STORAGE_BACKEND=local``). The whole app can then run offline
+for benchmarks and load tests, and a shop that outgrows a spreadsheet can
+keep its data in a file on the volume instead. It follows Sheets semantics
+where the app depends on them:
+
+- Cells read back as formatted strings. Trailing empty rows and cells are
+  trimmed, and ``get_all_values`` pads rows to equal length.
+- ``USER_ENTERED`` input is parsed: numbers are shown in General format and
+  a leading apostrophe forces text. ``RAW`` input is stored as given.
+- Appends land after the last row with data, grow the grid, and report the
+  ``updatedRange``. Worksheet handles keep the row count they were fetched
+  with, as gspread's do.
+- Ranges outside the grid fail with a 400, and unknown tabs raise
+  ``WorksheetNotFound``. Each call is applied atomically.
+
+It can also add latency to every call, enforce a per-minute read and write
+quota (429s, like Sheets' per-user quota), and fail a fraction of calls with
+a 503. The errors are real gspread ``APIError``s, so the scheduler's retries
+and the metrics treat them exactly as they treat Google's.
+
+Copy the live spreadsheet into a local store (run from backend/):
+    python -m app.storage copy [--path data/sheets.db]
+"""
+
+import argparse
+import json
+import math
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, Optional, Protocol
+
+import gspread
+import requests
+from gspread.utils import a1_range_to_grid_range, absolute_range_name, rowcol_to_a1
+
+from .config import get_settings
+
+LOCAL_STORAGE_FILE = "sheets.db"  # under DATA_DIR unless LOCAL_STORAGE_PATH is set
+DEFAULT_ROWS = 1000  # grid size of a new tab, as in Sheets
+DEFAULT_COLS = 26
+
+READ = "read"
+WRITE = "write"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tabs (
+    title TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    row_count INTEGER NOT NULL,
+    col_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sheet_rows (
+    tab TEXT NOT NULL,
+    row INTEGER NOT NULL,  -- 1-based, as in A1 notation
+    cells TEXT NOT NULL,  -- JSON list of display strings, trailing blanks trimmed
+    PRIMARY KEY (tab, row)
+) WITHOUT ROWID;
+"""
+
+
+class Worksheet(Protocol):
+    """The worksheet calls ``SheetsService`` makes."""
+
+    @property
+    def title(self) -> str: ...
+
+    @property
+    def row_count(self) -> int: ...
+
+    def get_all_values(self) -> list[list[str]]: ...
+
+    def get(self, range_name: str) -> list[list[str]]: ...
+
+    def batch_get(self, ranges: list[str]) -> list[list[list[str]]]: ...
+
+    def batch_update(self, data: list[dict], value_input_option: str = ...) -> Any: ...
+
+    def append_rows(self, values: list[list], value_input_option: str = ...) -> dict: ...
+
+    def append_row(self, values: list, value_input_option: str = ...) -> dict: ...
+
+
+class Spreadsheet(Protocol):
+    """The spreadsheet calls ``SheetsService`` makes."""
+
+    def worksheet(self, title: str) -> Worksheet: ...
+
+    def worksheets(self) -> list[Worksheet]: ...
+
+    def add_worksheet(self, title: str, rows: int, cols: int) -> Worksheet: ...
+
+
+def api_error(code: int, status: str, message: str) -> gspread.exceptions.APIError:
+    """A gspread APIError carrying the given HTTP status, as Google would send it."""
+    response = requests.Response()
+    response.status_code = code
+    response._content = json.dumps({"error": {"code": code, "message": message, "status": status}}).encode()
+    return gspread.exceptions.APIError(response)
+
+
+def _general(number: float) -> str:
+    # How a number displays in a General-format cell
+    if number.is_integer() and abs(number) < 1e15:
+        return str(int(number))
+    return f"{number:.15g}"
+
+
+def cell_value(value: Any, value_input_option: str = "RAW") -> str:
+    """The string Sheets shows for a value written with the given input option."""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float)):
+        return _general(float(value)) if math.isfinite(value) else str(value)
+    text = str(value)
+    if value_input_option != "USER_ENTERED":
+        return text
+    if text.startswith("'"):
+        return text[1:]
+    if text.upper() in ("TRUE", "FALSE"):
+        return text.upper()
+    if "_" in text:  # float() accepts digit separators, Sheets doesn't
+        return text
+    try:
+        number = float(text)
+    except ValueError:
+        return text
+    return _general(number) if math.isfinite(number) else text
+
+
+def _trim(cells: list[str]) -> list[str]:
+    while cells and not cells[-1]:
+        cells.pop()
+    return cells
+
+
+class LocalWorksheet:
+    """A tab of a ``LocalSpreadsheet``; every method is one counted call."""
+
+    def __init__(self, spreadsheet: "LocalSpreadsheet", title: str, row_count: int):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.row_count = row_count  # as of when the handle was fetched, like gspread
+
+    def __repr__(self) -> str:
+        return f"<LocalWorksheet {self.title!r}>"
+
+    def get_all_values(self, **kwargs) -> list[list[str]]:
+        with self.spreadsheet._request(READ) as db:
+            values = self.spreadsheet._read(db, self.title, None)
+        width = max((len(row) for row in values), default=0)
+        return [row + [""] * (width - len(row)) for row in values]
+
+    def get(self, range_name: str, **kwargs) -> list[list[str]]:
+        with self.spreadsheet._request(READ) as db:
+            return self.spreadsheet._read(db, self.title, range_name)
+
+    def batch_get(self, ranges: list[str], **kwargs) -> list[list[list[str]]]:
+        with self.spreadsheet._request(READ) as db:
+            return [self.spreadsheet._read(db, self.title, a1) for a1 in ranges]
+
+    def batch_update(self, data: list[dict], value_input_option: str = "RAW", **kwargs) -> dict:
+        with self.spreadsheet._request(WRITE) as db:
+            cells = sum(self.spreadsheet._write(db, self.title, entry["range"], entry["values"], value_input_option)
+                        for entry in data)
+        return {"totalUpdatedCells": cells}
+
+    def append_rows(self, values: list[list], value_input_option: str = "RAW", **kwargs) -> dict:
+        with self.spreadsheet._request(WRITE) as db:
+            return self.spreadsheet._append(db, self.title, values, value_input_option)
+
+    def append_row(self, values: list, value_input_option: str = "RAW", **kwargs) -> dict:
+        return self.append_rows([values], value_input_option=value_input_option, **kwargs)
+
+
+class LocalSpreadsheet:
+    """A spreadsheet kept in SQLite, with optional latency, quota and faults.
+
+    ``latency`` is seconds added to every call. ``quota_per_minute`` limits
+    reads and writes separately over a rolling minute (0 = no limit).
+    ``error_rate`` is the fraction of calls that fail with a 503.
+    """
+
+    title = "local"
+
+    def __init__(
+        self,
+        path: str = ":memory:",
+        latency: float = 0.0,
+        quota_per_minute: int = 0,
+        error_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.path = path
+        self.latency = latency
+        self.quota_per_minute = quota_per_minute
+        self.error_rate = error_rate
+        self.calls = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._recent: dict[str, deque[float]] = {READ: deque(), WRITE: deque()}
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+
+    def __repr__(self) -> str:
+        return f"<LocalSpreadsheet {self.path!r}>"
+
+    # ------------------------------------------------------------------
+    # Spreadsheet calls
+    # ------------------------------------------------------------------
+
+    def worksheet(self, title: str) -> LocalWorksheet:
+        with self._request(READ) as db:
+            row_count, _ = self._grid(db, title)
+        return LocalWorksheet(self, title, row_count)
+
+    def worksheets(self) -> list[LocalWorksheet]:
+        with self._request(READ) as db:
+            tabs = db.execute("SELECT title, row_count FROM tabs ORDER BY position").fetchall()
+        return [LocalWorksheet(self, title, row_count) for title, row_count in tabs]
+
+    def add_worksheet(self, title: str, rows: int = DEFAULT_ROWS, cols: int = DEFAULT_COLS, **kwargs) -> LocalWorksheet:
+        with self._request(WRITE) as db:
+            if db.execute("SELECT 1 FROM tabs WHERE title = ?", (title,)).fetchone():
+                raise api_error(
+                    400, "INVALID_ARGUMENT",
+                    f'Invalid requests[0].addSheet: A sheet with the name "{title}" already exists.',
+                )
+            self._add_tab(db, title, rows, cols)
+        return LocalWorksheet(self, title, rows)
+
+    # ------------------------------------------------------------------
+    # Setup (not counted, no latency or faults)
+    # ------------------------------------------------------------------
+
+    def ensure_tab(self, title: str, header: list[str]):
+        """Create the tab with a header row unless it exists."""
+        with self._lock, self._db as db:
+            if not db.execute("SELECT 1 FROM tabs WHERE title = ?", (title,)).fetchone():
+                self._add_tab(db, title, DEFAULT_ROWS, max(DEFAULT_COLS, len(header)))
+                self._put_row(db, title, 1, [str(v) for v in header])
+
+    def replace_tab(self, title: str, rows: list[list]):
+        """Create or overwrite a tab with the given rows, stored as given."""
+        with self._lock, self._db as db:
+            db.execute("DELETE FROM sheet_rows WHERE tab = ?", (title,))
+            db.execute("DELETE FROM tabs WHERE title = ?", (title,))
+            width = max((len(row) for row in rows), default=0)
+            self._add_tab(db, title, max(DEFAULT_ROWS, len(rows)), max(DEFAULT_COLS, width))
+            for i, row in enumerate(rows, start=1):
+                self._put_row(db, title, i, [cell_value(v) for v in row])
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"calls": self.calls, "errors": self.errors}
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def _request(self, kind: str) -> Iterator[sqlite3.Connection]:
+        """One API call: count it, apply quota and faults, wait out the
+        latency, then hold the store while the call applies."""
+        with self._lock:
+            self.calls += 1
+            error = None
+            if self._over_quota(kind):
+                error = api_error(
+                    429, "RESOURCE_EXHAUSTED",
+                    f"Quota exceeded for quota metric '{kind.title()} requests' and limit "
+                    f"'{kind.title()} requests per minute per user'",
+                )
+            elif self.error_rate and self._random.random() < self.error_rate:
+                error = api_error(503, "UNAVAILABLE", "The service is currently unavailable.")
+            if error is not None:
+                self.errors += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if error is not None:
+            raise error
+        with self._lock, self._db as db:
+            yield db
+
+    def _over_quota(self, kind: str) -> bool:
+        # Called with _lock held
+        if not self.quota_per_minute:
+            return False
+        now = time.monotonic()
+        recent = self._recent[kind]
+        while recent and now - recent[0] >= 60:
+            recent.popleft()
+        if len(recent) >= self.quota_per_minute:
+            return True
+        recent.append(now)
+        return False
+
+    def _add_tab(self, db: sqlite3.Connection, title: str, rows: int, cols: int):
+        position = db.execute("SELECT COALESCE(MAX(position) + 1, 0) FROM tabs").fetchone()[0]
+        db.execute("INSERT INTO tabs VALUES (?, ?, ?, ?)", (title, position, rows, cols))
+
+    def _grid(self, db: sqlite3.Connection, title: str) -> tuple[int, int]:
+        grid = db.execute("SELECT row_count, col_count FROM tabs WHERE title = ?", (title,)).fetchone()
+        if grid is None:
+            raise gspread.WorksheetNotFound(title)
+        return grid
+
+    def _bounds(self, db: sqlite3.Connection, title: str, a1: Optional[str]) -> tuple[int, int, int, int]:
+        """0-based [r0, r1) x [c0, c1) for a range, checked against the grid."""
+        rows, cols = self._grid(db, title)
+        grid = a1_range_to_grid_range(a1) if a1 else {}
+        r0, r1 = grid.get("startRowIndex", 0), grid.get("endRowIndex", rows)
+        c0, c1 = grid.get("startColumnIndex", 0), grid.get("endColumnIndex", cols)
+        if r1 > rows or c1 > cols or r0 >= r1 or c0 >= c1:
+            raise api_error(
+                400, "INVALID_ARGUMENT",
+                f"Range ({absolute_range_name(title, a1)}) exceeds grid limits. Max rows: {rows}, max columns: {cols}",
+            )
+        return r0, r1, c0, c1
+
+    def _read(self, db: sqlite3.Connection, title: str, a1: Optional[str]) -> list[list[str]]:
+        r0, r1, c0, c1 = self._bounds(db, title, a1)
+        values: list[list[str]] = []
+        for row, cells in db.execute(
+            "SELECT row, cells FROM sheet_rows WHERE tab = ? AND row > ? AND row <= ? ORDER BY row", (title, r0, r1)
+        ):
+            values.extend([] for _ in range(row - r0 - 1 - len(values)))
+            values.append(_trim(json.loads(cells)[c0:c1]))
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def _get_row(self, db: sqlite3.Connection, title: str, row: int) -> list[str]:
+        found = db.execute("SELECT cells FROM sheet_rows WHERE tab = ? AND row = ?", (title, row)).fetchone()
+        return json.loads(found[0]) if found else []
+
+    def _put_row(self, db: sqlite3.Connection, title: str, row: int, cells: list[str]):
+        cells = _trim(cells)
+        if cells:
+            db.execute("INSERT OR REPLACE INTO sheet_rows VALUES (?, ?, ?)", (title, row, json.dumps(cells)))
+        else:
+            db.execute("DELETE FROM sheet_rows WHERE tab = ? AND row = ?", (title, row))
+
+    def _write(self, db: sqlite3.Connection, title: str, a1: str, values: list[list], option: str) -> int:
+        r0, r1, c0, c1 = self._bounds(db, title, a1)
+        if ":" not in a1:
+            # A single cell is where the values start; they may extend to the grid's edge
+            r1, c1 = self._grid(db, title)
+        if r0 + len(values) > r1 or c0 + max((len(v) for v in values), default=0) > c1:
+            raise api_error(400, "INVALID_ARGUMENT", f"Requested writing within range [{a1}], but tried writing outside it.")
+        for i, new in enumerate(values):
+            cells = self._get_row(db, title, r0 + i + 1)
+            cells.extend([""] * (c0 + len(new) - len(cells)))
+            cells[c0:c0 + len(new)] = [cell_value(v, option) for v in new]
+            self._put_row(db, title, r0 + i + 1, cells)
+        return sum(len(v) for v in values)
+
+    def _append(self, db: sqlite3.Connection, title: str, values: list[list], option: str) -> dict:
+        rows, cols = self._grid(db, title)
+        last = db.execute("SELECT COALESCE(MAX(row), 0) FROM sheet_rows WHERE tab = ?", (title,)).fetchone()[0]
+        first, end = last + 1, last + len(values)
+        width = max((len(v) for v in values), default=1)
+        if end > rows or width > cols:
+            # Appending past the grid grows it, as in Sheets
+            db.execute(
+                "UPDATE tabs SET row_count = ?, col_count = ? WHERE title = ?",
+                (max(rows, end), max(cols, width), title),
+            )
+        for i, new in enumerate(values):
+            self._put_row(db, title, first + i, [cell_value(v, option) for v in new])
+        return {
+            "tableRange": absolute_range_name(title, f"A1:{rowcol_to_a1(max(last, 1), width)}"),
+            "updates": {
+                "updatedRange": absolute_range_name(title, f"A{first}:{rowcol_to_a1(end, width)}"),
+                "updatedRows": len(values),
+                "updatedColumns": width,
+                "updatedCells": sum(len(v) for v in values),
+            },
+        }
+
+
+def open_local_spreadsheet() -> LocalSpreadsheet:
+    """The local store configured by the LOCAL_STORAGE_* settings."""
+    s = get_settings()
+    return LocalSpreadsheet(
+        s.local_storage_path or str(Path(s.data_dir) / LOCAL_STORAGE_FILE),
+        latency=s.local_storage_latency_ms / 1000,
+        quota_per_minute=s.local_storage_quota_per_minute,
+        error_rate=s.local_storage_error_rate,
+    )
+
+
+def copy_to_local(path: str):
+    """Copy every tab of the configured Google spreadsheet into a local store."""
+    from .google_clients import get_google_clients
+
+    sheet_id = get_settings().google_sheet_id
+    if not sheet_id:
+        raise RuntimeError("GOOGLE_SHEET_ID not set")
+    source = get_google_clients().sheets().open_by_key(sheet_id)
+    target = LocalSpreadsheet(path)
+    for ws in source.worksheets():
+        rows = ws.get_all_values()
+        target.replace_tab(ws.title, rows)
+        print(f"  {ws.title}: {max(len(rows) - 1, 0)} rows")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the local storage backend.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    copy = commands.add_parser("copy", help="copy the Google spreadsheet into a local store")
+    copy.add_argument("--path", default=None, help=f"SQLite file (default: DATA_DIR/{LOCAL_STORAGE_FILE})")
+    args = parser.parse_args()
+
+    if args.command == "copy":
+        s = get_settings()
+        path = args.path or s.local_storage_path or str(Path(s.data_dir) / LOCAL_STORAGE_FILE)
+        print(f"Copying spreadsheet {s.google_sheet_id} to {path}")
+        copy_to_local(path)
+
+
+if __name__ == "__main__":
+    main()
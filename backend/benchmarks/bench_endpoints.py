@@ -0,0 +1,336 @@
+"""End-to-end benchmark of every API route against the local storage backend.
+
+Each catalogue size runs in its own interpreter, with the app on
+``STORAGE_BACKEND=local``: an in-memory ``LocalSpreadsheet`` seeded with
+that many products, adding ``--latency`` seconds to every call. Every route
+is driven through the FastAPI TestClient. For each route the benchmark
+records:
+
+- p50 and p95 latency
+- Google API calls per request, from the ``X-Google-API-Calls`` header
+- request and response bytes on the wire (responses gzipped when the
+  server gzips them)
+- peak Python heap allocated while the app handles the request
+  (tracemalloc, median of a few requests in a separate pass so it doesn't
+  skew the timings). The
+  peak stops when the response is sent, so it leaves out the test client
+  decoding the body, but it includes any background threads running at
+  the time.
+
+Caches are given long TTLs so warm routes measure the steady state.
+"cold" rows drop the cache before every request.
+
+Results are JSON (``--json`` or ``--out``). ``--compare`` diffs a run with
+an earlier file and exits non-zero when a route makes more API calls or its
+p50 grew by more than ``--tolerance``.
+
+Run from backend/:
+    python -m benchmarks.bench_endpoints [--sizes 50 500 5000] [--latency 0.02] [--iterations 20]
+        [--out results.json] [--compare baseline.json]
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable
+
+SIZES = (50, 500, 5000)
+BULK_SIZE = 5  # adjustments per bulk-adjust request
+PDF_BYTES = 40 * 1024  # a typical one-page invoice
+MEMORY_RUNS = 5  # traced requests per route; the median is reported
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def pricelist_csv(products: int, bump: float) -> bytes:
+    lines = ["Price List Category,Material No,Product Name,Formula Code,Product Form,Individual Unit Wt.,"
+             "Single Unit List Price,Full Pallet List Price"]
+    lines += [f"HORSE,{100000 + i},PRODUCT {i},F{i},PELLET,50 LB,{20 + i % 7 + bump:.2f},{900 + i % 7 + bump:.2f}"
+              for i in range(products)]
+    return "\n".join(lines).encode()
+
+
+def routes(client, svc, products: int) -> list[tuple[str, bool, Callable[[int], Callable]]]:
+    """(name, full run count, prepare) for each benchmarked route.
+
+    ``prepare(i)`` does any untimed setup for request ``i`` and returns the
+    request to time.
+    """
+    materials = [f"{100000 + i}" for i in range(products)]
+
+    def pick(i: int) -> str:
+        return materials[(i * 7919) % len(materials)]  # spread writes over the catalogue
+
+    pdf = b"%PDF-1.4\n" + b"0" * PDF_BYTES
+    invoice = json.dumps({
+        "customer_name": "Bench Ranch", "invoice_date": "2026-10-17", "total": 62.5, "paid": True,
+        "items": [{"product_name": "PRODUCT 1", "material_no": materials[0], "qty": 2, "unit_price": 31.25,
+                   "extended": 62.5}],
+    })
+
+    def products_cold(i):
+        svc._cache.invalidate("products")
+        return lambda: client.get("/api/products")
+
+    def products_since(i):
+        # One sale since the version the client last saw
+        version = client.get("/api/products").headers["etag"].strip('"')
+        client.post("/api/inventory/adjust", json={"material_no": pick(i), "change_type": "sale", "quantity": -1})
+        return lambda: client.get("/api/products", params={"since": version})
+
+    def pricelist_import(i):
+        csv = pricelist_csv(products, i % 2 * 0.5)  # every other run moves all costs back
+        return lambda: client.post("/api/pricelist/import", files={"file": ("prices.csv", csv, "text/csv")})
+
+    return [
+        ("GET /api/products", True, lambda i: lambda: client.get("/api/products")),
+        ("GET /api/products (cold)", True, products_cold),
+        ("GET /api/products?since", True, products_since),
+        ("PUT /api/products/{m}/markup", True, lambda i: lambda: client.put(
+            f"/api/products/{pick(i)}/markup", json={"markup_pct": 0.25 + i % 3 / 100})),
+        ("PUT /api/products/{m}/reorder", True, lambda i: lambda: client.put(
+            f"/api/products/{pick(i)}/reorder", json={"reorder_point": 5 + i % 3})),
+        ("POST /api/inventory/adjust", True, lambda i: lambda: client.post(
+            "/api/inventory/adjust", json={"material_no": pick(i), "change_type": "sale", "quantity": -1})),
+        ("POST /api/inventory/bulk-adjust", True, lambda i: lambda: client.post(
+            "/api/inventory/bulk-adjust", json={"adjustments": [
+                {"material_no": pick(i * BULK_SIZE + k), "change_type": "restock", "quantity": 2}
+                for k in range(BULK_SIZE)
+            ]})),
+        ("GET /api/inventory/log", True, lambda i: lambda: client.get("/api/inventory/log", params={"limit": 100})),
+        ("GET /api/inventory/low-stock", True, lambda i: lambda: client.get("/api/inventory/low-stock")),
+        ("GET /api/pricelist/archive", True, lambda i: lambda: client.get(
+            "/api/pricelist/archive", params={"page": 1 + i % 3})),
+        # Every run rewrites all costs, so it gets a fifth of the runs
+        ("POST /api/pricelist/import", False, pricelist_import),
+        ("POST /api/invoices/file", True, lambda i: lambda: client.post(
+            "/api/invoices/file", data={"invoice_data": invoice}, files={"pdf": ("invoice.pdf", pdf, "application/pdf")})),
+    ]
+
+
+class PeakMemory:
+    """ASGI wrapper recording the traced heap peak of each request."""
+
+    def __init__(self, app):
+        self.app = app
+        self.last = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not tracemalloc.is_tracing():
+            return await self.app(scope, receive, send)
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.last = tracemalloc.get_traced_memory()[1] - base
+
+
+def settle(client, job_ids: list[str], timeout: float = 30.0):
+    """Wait for background work (journal replays, snapshot saves, cache
+    refreshes, queued invoice filings) so it doesn't land in the next
+    measurement."""
+    from app.sheets import get_sheets_service
+
+    deadline = time.monotonic() + timeout
+    get_sheets_service().flush_journal(timeout)
+    for thread in threading.enumerate():
+        if thread.name == "snapshot" or thread.name.startswith("cache-refresh"):
+            thread.join(max(0.0, deadline - time.monotonic()))
+    if job_ids:
+        while time.monotonic() < deadline:
+            status = client.get(f"/api/invoices/jobs/{job_ids[-1]}").json()["status"]
+            if status in ("done", "failed"):
+                break
+            time.sleep(0.05)
+
+
+def request_bytes(response) -> int:
+    request = response.request
+    return len(request.read()) + sum(len(k) + len(v) + 4 for k, v in request.headers.raw)
+
+
+def run_size(products: int, latency: float, iterations: int) -> list[dict]:
+    """Benchmark every route at one catalogue size (in this interpreter)."""
+    from fastapi.testclient import TestClient
+
+    from app.config import get_settings
+    from app.main import app
+    from app.sheets import get_sheets_service
+
+    from .fake_sheets import seed
+
+    svc = get_sheets_service()
+    sheet = svc._get_spreadsheet()
+    seed(sheet, products)
+    sheet.latency = latency
+
+    results = []
+    measured = PeakMemory(app)
+    with TestClient(measured) as client:
+        token = client.post("/api/auth/login", json={"pin": get_settings().admin_pin}).json()["token"]
+        client.headers["Authorization"] = f"Bearer {token}"
+        table = routes(client, svc, products)
+
+        job_ids: list[str] = []
+        for name, full, prepare in table:
+            runs = iterations if full else max(3, iterations // 5)
+            prepare(0)()  # warm handles and caches
+            settle(client, job_ids)
+            times, calls, sent, received = [], [], [], []
+            for i in range(1, runs + 1):
+                request = prepare(i)
+                start = time.perf_counter()
+                response = request()
+                times.append((time.perf_counter() - start) * 1000)
+                if response.status_code >= 400:
+                    raise RuntimeError(f"{name}: {response.status_code} {response.text[:200]}")
+                if response.status_code == 202:
+                    job_ids.append(response.json()["id"])
+                calls.append(int(response.headers.get("x-google-api-calls", 0)))
+                sent.append(request_bytes(response))
+                received.append(response.num_bytes_downloaded)
+            results.append({
+                "products": products,
+                "route": name,
+                "runs": runs,
+                "p50_ms": round(statistics.median(times), 2),
+                "p95_ms": round(percentile(times, 95), 2),
+                "api_calls": statistics.median(calls),
+                "api_calls_max": max(calls),
+                "request_bytes": round(statistics.median(sent)),
+                "response_bytes": round(statistics.median(received)),
+            })
+
+        # Memory pass, apart from the timings: tracemalloc slows allocation down
+        tracemalloc.start()
+        for (name, _, prepare), result in zip(table, results):
+            peaks = []
+            for i in range(iterations + 1, iterations + 1 + MEMORY_RUNS):
+                request = prepare(i)
+                settle(client, job_ids)
+                response = request()
+                if response.status_code == 202:
+                    job_ids.append(response.json()["id"])
+                peaks.append(measured.last)
+            result["peak_kib"] = round(statistics.median(peaks) / 1024, 1)
+        tracemalloc.stop()
+    return results
+
+
+def run_isolated(products: int, latency: float, iterations: int) -> list[dict]:
+    """Run one size in a fresh interpreter with its own settings and data dir."""
+    with tempfile.TemporaryDirectory() as data_dir:
+        env = {
+            **os.environ,
+            "DATA_DIR": data_dir,
+            "STORAGE_BACKEND": "local",
+            "LOCAL_STORAGE_PATH": ":memory:",
+            "CACHE_TTL_SECONDS": "3600",
+            "CACHE_LOG_TTL_SECONDS": "3600",
+            "CACHE_INVOICES_TTL_SECONDS": "3600",
+            "CACHE_ARCHIVE_TTL_SECONDS": "3600",
+            "INVOICE_JOB_MAX_ATTEMPTS": "1",  # there is no Drive here; log the invoice without it
+        }
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_endpoints", "--worker", "--sizes", str(products),
+             "--latency", str(latency), "--iterations", str(iterations)],
+            env=env, capture_output=True, text=True,
+        )
+        if proc.returncode:
+            raise RuntimeError(f"{products} products failed:\n{proc.stderr[-2000:]}")
+        return json.loads(proc.stdout)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def compare(results: list[dict], baseline: dict, tolerance: float) -> list[str]:
+    """Regressions against an earlier run."""
+    before = {(r["products"], r["route"]): r for r in baseline["results"]}
+    problems = []
+    for r in results:
+        old = before.get((r["products"], r["route"]))
+        if old is None:
+            continue
+        if r["api_calls"] > old["api_calls"]:
+            problems.append(f"{r['route']} @ {r['products']}: {old['api_calls']} -> {r['api_calls']} API calls")
+        if r["p50_ms"] > old["p50_ms"] * (1 + tolerance) and r["p50_ms"] - old["p50_ms"] > 1:
+            problems.append(f"{r['route']} @ {r['products']}: p50 {old['p50_ms']} -> {r['p50_ms']} ms")
+    return problems
+
+
+def print_table(results: list[dict]):
+    print(f"{'products':>8}  {'route':<34} {'p50 ms':>8} {'p95 ms':>8} {'calls':>5} "
+          f"{'req B':>8} {'resp B':>9} {'peak KiB':>9}")
+    for r in results:
+        print(f"{r['products']:>8}  {r['route']:<34} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['api_calls']:>5g} "
+              f"{r['request_bytes']:>8} {r['response_bytes']:>9} {r['peak_kib']:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="catalogue sizes")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per storage call")
+    parser.add_argument("--iterations", type=int, default=20, help="timed requests per route")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    parser.add_argument("--out", help="also write the JSON results to this file")
+    parser.add_argument("--compare", help="earlier JSON results to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p50 growth, as a fraction")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        json.dump(run_size(args.sizes[0], args.latency, args.iterations), sys.stdout)
+        return
+
+    results = []
+    for products in args.sizes:
+        print(f"benchmarking {products} products...", file=sys.stderr)
+        results += run_isolated(products, args.latency, args.iterations)
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "latency_s": args.latency,
+            "iterations": args.iterations,
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_table(results)
+
+    if args.compare:
+        with open(args.compare) as f:
+            problems = compare(results, json.load(f), args.tolerance)
+        for problem in problems:
+            print(f"REGRESSION: {problem}", file=sys.stderr)
+        sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
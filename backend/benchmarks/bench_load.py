@@ -0,0 +1,384 @@
+"""Concurrent load test at the Fly concurrency limits.
+
+``fly.toml`` lets the proxy send one shared-CPU, 256 MB machine up to
+``soft_limit = 80`` connections before it prefers another machine, and
+``hard_limit = 100`` before it queues. This runs the real server
+(``uvicorn app.main:app``, as the Dockerfile does) on
+``STORAGE_BACKEND=local``. It drives the server with that many concurrent
+clients, each sending its next request as soon as the last one answers.
+
+Scenarios:
+
+- ``counter-rush``: a Saturday at the counter. Sales on a handful of hot
+  products, with tills refreshing the product list (``?since``) and low
+  stock in between.
+- ``truck-restock``: a delivery being checked in, as bulk restocks of
+  ``--bulk`` products each, while a few tills keep selling.
+- ``import-during-sales``: one client imports the whole price list over
+  and over, while every other client sells.
+- ``invoice-filing``: filing invoices with a PDF each. The queue worker
+  files them in the background. After each level the test waits for the
+  queue to empty and reports how long that took.
+
+Each scenario gets a fresh server on a freshly seeded SQLite file, where
+every call takes ``--latency`` seconds (``--quota`` adds the Sheets
+per-minute quota). At each concurrency level the test reports:
+
+- throughput
+- p50, p95 and p99 latency
+- the error rate, with 5xx and timeouts counted as errors
+- the server's peak RSS, sampled from ``/proc``
+
+Results can also be written as JSON (``--json``/``--out``).
+
+The load generator runs on the same machine as the server. Use
+``--server-cpu`` to pin the server to one core, like the Fly VM.
+
+Run from backend/ (needs httpx; RSS needs Linux):
+    python -m benchmarks.bench_load [--scenarios counter-rush ...] [--levels 1 10 25 50 80 100]
+        [--duration 10] [--latency 0.15] [--products 500] [--out load.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Awaitable, Callable
+
+import httpx
+
+from app.config import get_settings
+from app.storage import LocalSpreadsheet
+
+from .bench_endpoints import PDF_BYTES, git_commit, percentile, pricelist_csv
+from .fake_sheets import seed
+
+LEVELS = (1, 10, 25, 50, 80, 100)
+SOFT_LIMIT = 80  # fly.toml [http_service.concurrency]
+HARD_LIMIT = 100
+VM_MEMORY_MIB = 256
+START_QTY = 100000  # enough stock that sales never run out
+HOT_PRODUCTS = 20  # what actually moves on a Saturday
+REQUEST_TIMEOUT = 60.0
+
+Send = Callable[[httpx.AsyncClient, random.Random, int], Awaitable[tuple[str, httpx.Response]]]
+
+
+class Scenario:
+    """Picks each client's next request.
+
+    ``send(client, rng, n)`` makes one request for client ``n`` and returns
+    (route, response). It keeps per-client state such as the last product
+    version a till has seen.
+    """
+
+    def __init__(self, products: int, bulk: int):
+        self.materials = [f"{100000 + i}" for i in range(products)]
+        self.hot = self.materials[:HOT_PRODUCTS]
+        self.bulk = bulk
+        self.versions: dict[int, str] = {}
+        self.pdf = b"%PDF-1.4\n" + b"0" * PDF_BYTES
+        self.prices = [pricelist_csv(products, 0.0), pricelist_csv(products, 0.5)]
+        self.imports = 0
+
+    async def sale(self, client, rng, n):
+        material_no = rng.choice(self.hot) if rng.random() < 0.8 else rng.choice(self.materials)
+        return "POST /api/inventory/adjust", await client.post("/api/inventory/adjust", json={
+            "material_no": material_no, "change_type": "sale", "quantity": -rng.choice((1, 1, 1, 2, 5)),
+        })
+
+    async def refresh(self, client, rng, n):
+        version = self.versions.get(n)
+        response = await client.get("/api/products", params={"since": version} if version else None)
+        if response.status_code == 200 and response.headers.get("etag"):
+            self.versions[n] = response.headers["etag"].strip('"')
+        return "GET /api/products", response
+
+    async def low_stock(self, client, rng, n):
+        return "GET /api/inventory/low-stock", await client.get("/api/inventory/low-stock")
+
+    async def counter(self, client, rng, n):
+        """One till: mostly sales, refreshing now and then."""
+        roll = rng.random()
+        if roll < 0.7:
+            return await self.sale(client, rng, n)
+        if roll < 0.95:
+            return await self.refresh(client, rng, n)
+        return await self.low_stock(client, rng, n)
+
+    async def restock(self, client, rng, n):
+        adjustments = [
+            {"material_no": material_no, "change_type": "restock", "quantity": rng.choice((10, 20, 40))}
+            for material_no in rng.sample(self.materials, self.bulk)
+        ]
+        return "POST /api/inventory/bulk-adjust", await client.post(
+            "/api/inventory/bulk-adjust", json={"adjustments": adjustments})
+
+    async def price_import(self, client, rng, n):
+        self.imports += 1
+        csv = self.prices[self.imports % 2]  # every other import moves all costs back
+        return "POST /api/pricelist/import", await client.post(
+            "/api/pricelist/import", files={"file": ("prices.csv", csv, "text/csv")})
+
+    async def invoice(self, client, rng, n):
+        material_no = rng.choice(self.materials)
+        invoice = json.dumps({
+            "customer_name": f"Customer {rng.randint(1, 400)}", "invoice_date": "2026-10-17",
+            "total": 62.5, "paid": rng.random() < 0.7,
+            "items": [{"product_name": "PRODUCT", "material_no": material_no, "qty": 2, "unit_price": 31.25,
+                       "extended": 62.5}],
+        })
+        return "POST /api/invoices/file", await client.post(
+            "/api/invoices/file", data={"invoice_data": invoice},
+            files={"pdf": ("invoice.pdf", self.pdf, "application/pdf")})
+
+
+def scenario_send(name: str, scenario: Scenario) -> Send:
+    if name == "counter-rush":
+        return scenario.counter
+    if name == "truck-restock":
+        # One in four clients is a till still selling while the truck is checked in
+        return lambda client, rng, n: (scenario.counter if n % 4 == 3 else scenario.restock)(client, rng, n)
+    if name == "import-during-sales":
+        return lambda client, rng, n: (scenario.price_import if n == 0 else scenario.counter)(client, rng, n)
+    if name == "invoice-filing":
+        return scenario.invoice
+    raise ValueError(f"unknown scenario {name!r}")
+
+
+SCENARIOS = ("counter-rush", "truck-restock", "import-during-sales", "invoice-filing")
+
+
+def rss_kib(pid: int) -> tuple[int, int]:
+    """(current, peak) resident set size of a process, from /proc."""
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("VmRSS", "VmHWM"):
+                    fields[key] = int(value.split()[0])
+    except OSError:
+        pass
+    return fields.get("VmRSS", 0), fields.get("VmHWM", 0)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class Server:
+    """The app under uvicorn, on a freshly seeded local spreadsheet."""
+
+    def __init__(self, args):
+        self.args = args
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.proc: subprocess.Popen | None = None
+        self._dir = tempfile.TemporaryDirectory()
+
+    def __enter__(self) -> "Server":
+        data_dir = self._dir.name
+        path = os.path.join(data_dir, "sheets.db")
+        seed(LocalSpreadsheet(path), self.args.products, START_QTY)
+        env = {
+            **os.environ,
+            "DATA_DIR": data_dir,
+            "STORAGE_BACKEND": "local",
+            "LOCAL_STORAGE_PATH": path,
+            "LOCAL_STORAGE_LATENCY_MS": str(self.args.latency * 1000),
+            "LOCAL_STORAGE_QUOTA_PER_MINUTE": str(self.args.quota),
+            "INVOICE_JOB_MAX_ATTEMPTS": "1",  # there is no Drive here; log the invoice without it
+        }
+        command = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+                   "--port", str(self.port), "--no-access-log", "--log-level", "warning"]
+        cpu = self.args.server_cpu
+        self.proc = subprocess.Popen(
+            command, env=env, stdout=subprocess.DEVNULL,  # errors still reach stderr
+            preexec_fn=(lambda: os.sched_setaffinity(0, {cpu})) if cpu is not None else None,
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if self.proc.poll() is not None:
+                raise RuntimeError(f"server exited with {self.proc.returncode}")
+            try:
+                if httpx.get(f"{self.url}/health", timeout=1).status_code == 200:
+                    return self
+            except httpx.TransportError:
+                pass
+            time.sleep(0.1)
+        self.__exit__()
+        raise RuntimeError("server did not start within 30s")
+
+    def __exit__(self, *exc):
+        if self.proc and self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(10)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+        self._dir.cleanup()
+
+
+async def sample_rss(pid: int, peaks: list[int], stop: asyncio.Event):
+    while not stop.is_set():
+        peaks.append(rss_kib(pid)[0])
+        try:
+            await asyncio.wait_for(stop.wait(), 0.1)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def wait_for_jobs(client: httpx.AsyncClient, job_ids: list[str], timeout: float = 300.0) -> float:
+    """Seconds until the last queued invoice filing finishes."""
+    start = time.monotonic()
+    while job_ids and time.monotonic() - start < timeout:
+        response = await client.get(f"/api/invoices/jobs/{job_ids[-1]}")
+        if response.status_code == 200 and response.json()["status"] in ("done", "failed"):
+            break
+        await asyncio.sleep(0.1)
+    return time.monotonic() - start
+
+
+async def run_level(server: Server, token: str, send: Send, level: int, duration: float, seed_: int) -> dict:
+    """``level`` clients sending requests back to back for ``duration`` seconds."""
+    times: list[float] = []
+    statuses: Counter = Counter()
+    by_route: dict[str, list[float]] = defaultdict(list)
+    job_ids: list[str] = []
+    rss: list[int] = []
+    stop = asyncio.Event()
+
+    limits = httpx.Limits(max_connections=level, max_keepalive_connections=level)
+    async with httpx.AsyncClient(base_url=server.url, headers={"Authorization": f"Bearer {token}"},
+                                 limits=limits, timeout=REQUEST_TIMEOUT) as client:
+        deadline = time.monotonic() + duration
+
+        async def user(n: int):
+            rng = random.Random(seed_ * 1000 + n)
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                try:
+                    route, response = await send(client, rng, n)
+                    status = str(response.status_code)
+                except httpx.TimeoutException:
+                    route, status = "?", "timeout"
+                except httpx.TransportError:
+                    route, status = "?", "connection"
+                elapsed = (time.perf_counter() - start) * 1000
+                times.append(elapsed)
+                by_route[route].append(elapsed)
+                statuses[status] += 1
+                if status == "202":
+                    job_ids.append(response.json()["id"])
+
+        sampler = asyncio.create_task(sample_rss(server.proc.pid, rss, stop))
+        started = time.perf_counter()
+        await asyncio.gather(*(user(n) for n in range(level)))
+        elapsed = time.perf_counter() - started
+        backlog = await wait_for_jobs(client, job_ids) if job_ids else 0.0
+        stop.set()
+        await sampler
+
+    errors = sum(count for status, count in statuses.items() if not status.isdigit() or int(status) >= 500)
+    return {
+        "concurrency": level,
+        "requests": len(times),
+        "rps": round(len(times) / elapsed, 1),
+        "p50_ms": round(percentile(times, 50), 1),
+        "p95_ms": round(percentile(times, 95), 1),
+        "p99_ms": round(percentile(times, 99), 1),
+        "error_rate": round(errors / len(times), 4) if times else 0.0,
+        "statuses": dict(statuses),
+        "rss_peak_mib": round(max(rss, default=0) / 1024, 1),
+        "queue_drain_s": round(backlog, 1),
+        "routes": {
+            route: {"requests": len(samples), "p50_ms": round(percentile(samples, 50), 1),
+                    "p99_ms": round(percentile(samples, 99), 1)}
+            for route, samples in sorted(by_route.items())
+        },
+    }
+
+
+async def run_scenario(name: str, args) -> list[dict]:
+    scenario = Scenario(args.products, args.bulk)
+    send = scenario_send(name, scenario)
+    results = []
+    with Server(args) as server:
+        async with httpx.AsyncClient(base_url=server.url) as client:
+            token = (await client.post("/api/auth/login", json={"pin": get_settings().admin_pin})).json()["token"]
+            await client.get("/api/products", headers={"Authorization": f"Bearer {token}"})  # past the warm-up
+        for seed_, level in enumerate(args.levels):
+            print(f"{name}: {level} clients...", file=sys.stderr)
+            result = await run_level(server, token, send, level, args.duration, seed_)
+            result["scenario"] = name
+            results.append(result)
+        results[-1]["rss_high_water_mib"] = round(rss_kib(server.proc.pid)[1] / 1024, 1)
+    return results
+
+
+def print_table(results: list[dict]):
+    print(f"{'scenario':<20} {'conc':>4} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'errors':>7} {'RSS MiB':>8} {'drain s':>7}")
+    for r in results:
+        limit = "  (soft limit)" if r["concurrency"] == SOFT_LIMIT else "  (hard limit)" if r["concurrency"] == HARD_LIMIT else ""
+        memory = "  OVER VM MEMORY" if r["rss_peak_mib"] > VM_MEMORY_MIB else ""
+        print(f"{r['scenario']:<20} {r['concurrency']:>4} {r['rps']:>7.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+              f"{r['p99_ms']:>8.1f} {r['error_rate']:>7.1%} {r['rss_peak_mib']:>8.1f} {r['queue_drain_s']:>7.1f}"
+              f"{limit}{memory}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--levels", type=int, nargs="+", default=list(LEVELS), help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per level")
+    parser.add_argument("--latency", type=float, default=0.15, help="seconds per storage call")
+    parser.add_argument("--quota", type=int, default=0, help="storage calls per minute (0 = no quota)")
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--bulk", type=int, default=30, help="products per bulk restock")
+    parser.add_argument("--server-cpu", type=int, help="pin the server to this CPU")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    parser.add_argument("--out", help="also write the JSON results to this file")
+    args = parser.parse_args()
+    if max(args.levels) > HARD_LIMIT:
+        parser.error(f"Fly queues connections past hard_limit = {HARD_LIMIT}")
+
+    results = []
+    for name in args.scenarios:
+        results += asyncio.run(run_scenario(name, args))
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "latency_s": args.latency,
+            "quota_per_minute": args.quota,
+            "products": args.products,
+            "duration_s": args.duration,
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_table(results)
+
+
+if __name__ == "__main__":
+    main()
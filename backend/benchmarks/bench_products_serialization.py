@@ -0,0 +1,96 @@
+"""Microbenchmark: cost of serializing GET /api/products.
+
+Compares what FastAPI does on every request when the route returns
+``list[Product]`` through ``response_model`` (validate, serialize, JSON
+encode, then gzip in the middleware) with the pre-encoded bytes the route
+now serves from ``SheetsService.encoded_products``: encoding them once per
+version, and serving them (``encoded_products_response``, which builds the
+Response and picks 304, gzip or plain) on every request. A second table
+shows the cost of each gzip level for the largest list.
+
+Run from backend/:
+    python -m benchmarks.bench_products_serialization
+"""
+
+import asyncio
+import gzip
+import statistics
+import time
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from starlette.requests import Request
+
+from app.models import Product, ProductDelta
+from app.routes.products import encoded_products_response
+from app.sheets import GZIP_LEVEL, EncodedProducts, _product_list, parse_product_row
+
+SIZES = (50, 500, 5000)
+GZIP_LEVELS = (1, 6, 9)
+
+
+def make_products(n: int) -> list[Product]:
+    rows = [
+        [f"{100000 + i}", f"FORMULA{i}", f"PRODUCT NAME {i}", "BAG", "50 LB", "24.85", "1150.00",
+         "0.25", "31.25", "1437.50", str(i % 40), "5", "2026-10-01 12:00:00", "HORSE"]
+        for i in range(n)
+    ]
+    return [parse_product_row(i + 2, row) for i, row in enumerate(rows)]
+
+
+def browser_request() -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/api/products", "headers": [
+        (b"accept-encoding", b"gzip, deflate, br"),
+        (b"if-none-match", b'"an-older-version"'),
+    ]})
+
+
+def timeit(func, repeat: int) -> float:
+    """Median milliseconds per call."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    field = create_model_field("Response", list[Product] | ProductDelta, mode="serialization")
+
+    def before(products, compress):
+        content = asyncio.run(serialize_response(field=field, response_content=products))
+        body = JSONResponse(content).body
+        return gzip.compress(body, compresslevel=9) if compress else body
+
+    request = browser_request()
+    print(f"{'products':>8}  {'before':>9}  {'before+gz':>9}  {'encode+gz':>9}  {'serve':>9}  {'bytes':>9}  {'gzipped':>9}")
+    for n in SIZES:
+        products = make_products(n)
+        repeat = max(5, 5000 // n)
+        encoded = EncodedProducts.encode("v", products)
+        assert JSONResponse(asyncio.run(serialize_response(field=field, response_content=products))).body == encoded.body
+        assert encoded_products_response(request, encoded).body == encoded.gzipped
+        print(
+            f"{n:>8}"
+            f"  {timeit(lambda: before(products, False), repeat):>7.2f}ms"
+            f"  {timeit(lambda: before(products, True), repeat):>7.2f}ms"
+            f"  {timeit(lambda: EncodedProducts.encode('v', products), repeat):>7.2f}ms"
+            f"  {timeit(lambda: encoded_products_response(request, encoded), repeat * 10):>7.4f}ms"
+            f"  {len(encoded.body):>9}"
+            f"  {len(encoded.gzipped or b''):>9}"
+        )
+
+    body = _product_list.dump_json(make_products(SIZES[-1]))
+    print(f"\n{'gzip level':>10}  {'compress':>9}  {'gzipped':>9}   ({SIZES[-1]} products; encode uses {GZIP_LEVEL})")
+    for level in GZIP_LEVELS:
+        print(
+            f"{level:>10}"
+            f"  {timeit(lambda: gzip.compress(body, compresslevel=level, mtime=0), 5):>7.2f}ms"
+            f"  {len(gzip.compress(body, compresslevel=level, mtime=0)):>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Seeded local spreadsheets for benchmarks and stress runs.
+
+Builds a ``LocalSpreadsheet`` (``app/storage.py``) holding generated
+products and an empty log, in memory or in a SQLite file. Attach one with
+``service._spreadsheet = fake_spreadsheet(...)``, or write a file and run
+the app on it with ``STORAGE_BACKEND=local``.
+
+Seed a file for offline runs (run from backend/):
+    python -m benchmarks.fake_sheets data/sheets.db [--products 500] [--qty 10]
+"""
+
+import argparse
+
+from app.sheets import INVENTORY_HEADERS, LOG_HEADERS, TAB_ARCHIVE, TAB_INVENTORY, TAB_LOG
+from app.storage import LocalSpreadsheet
+
+
+def inventory_rows(n: int, qty: int = 10) -> list[list]:
+    return [INVENTORY_HEADERS] + [
+        [f"{100000 + i}", f"F{i}", f"PRODUCT {i}", "PELLET", "50 LB", 20 + i % 7, 900 + i % 7, 0.25,
+         25.0, 26.38, qty, 5, "", ""]
+        for i in range(n)
+    ]
+
+
+def seed(sheet: LocalSpreadsheet, products: int = 50, qty: int = 10) -> LocalSpreadsheet:
+    sheet.replace_tab(TAB_INVENTORY, inventory_rows(products, qty))
+    sheet.replace_tab(TAB_LOG, [LOG_HEADERS])
+    sheet.replace_tab(TAB_ARCHIVE, [["Material No", "Product Name"]] + [
+        [f"{100000 + i}", f"PRODUCT {i}"] for i in range(products)
+    ])
+    return sheet
+
+
+def fake_spreadsheet(products: int = 50, qty: int = 10, latency: float = 0.0, **kwargs) -> LocalSpreadsheet:
+    """An in-memory spreadsheet whose every call takes ``latency`` seconds.
+
+    Extra keyword arguments (``quota_per_minute``, ``error_rate``, ``seed``)
+    go to ``LocalSpreadsheet``.
+    """
+    return seed(LocalSpreadsheet(":memory:", latency=latency, **kwargs), products, qty)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed a local storage file with generated products.")
+    parser.add_argument("path", help="SQLite file to (re)write")
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--qty", type=int, default=10, help="starting quantity on hand")
+    args = parser.parse_args()
+    seed(LocalSpreadsheet(args.path), args.products, args.qty)
+    print(f"{args.path}: {args.products} products")
+
+
+if __name__ == "__main__":
+    main()
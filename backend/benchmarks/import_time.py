@@ -0,0 +1,95 @@
+"""Start-up import cost of the backend, from ``python -X importtime``.
+
+Imports ``app.main`` in fresh interpreters, takes the median over the runs,
+and reports the total and the most expensive top-level packages (summed
+self time of every module in the package). Exits non-zero when a module
+that should load lazily was imported at start-up, or when the total is over
+``--budget-ms``, so it can gate CI or a pre-deploy check.
+
+Run from backend/:
+    python -m benchmarks.import_time [--runs 5] [--top 15] [--budget-ms 900] [--json]
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+TARGET = "app.main"
+# Packages only some requests need; importing them at start-up is a regression
+DEFERRED = ("googleapiclient", "httplib2")
+
+
+def measure(target: str) -> dict[str, tuple[int, int]]:
+    """One fresh interpreter: module -> (self µs, cumulative µs)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        capture_output=True, text=True, check=True,
+    )
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def report(runs: int, top: int) -> dict:
+    samples = [measure(TARGET) for _ in range(runs)]
+    total_ms = statistics.median(s[TARGET][1] for s in samples) / 1000
+
+    by_package: dict[str, list[int]] = defaultdict(list)
+    for sample in samples:
+        sums: dict[str, int] = defaultdict(int)
+        for name, (self_us, _) in sample.items():
+            sums[name.split(".")[0]] += self_us
+        for package, us in sums.items():
+            by_package[package].append(us)
+    packages = sorted(
+        ((package, statistics.median(us) / 1000) for package, us in by_package.items()),
+        key=lambda item: item[1], reverse=True,
+    )
+    loaded = set().union(*samples)
+    return {
+        "target": TARGET,
+        "runs": runs,
+        "total_ms": round(total_ms, 1),
+        "modules": round(statistics.median(len(s) for s in samples)),
+        "packages_ms": {package: round(ms, 1) for package, ms in packages[:top]},
+        "deferred_imported": sorted({name for name in loaded if name.split(".")[0] in DEFERRED}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="packages to list")
+    parser.add_argument("--budget-ms", type=float, default=None, help="fail when the median total is over this")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    result = report(args.runs, args.top)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"import {result['target']}: {result['total_ms']:.1f} ms, {result['modules']} modules "
+              f"(median of {result['runs']} runs)")
+        for package, ms in result["packages_ms"].items():
+            print(f"  {package:<28} {ms:8.1f} ms")
+
+    failed = False
+    if result["deferred_imported"]:
+        print(f"FAIL: imported at start-up but should be deferred: {', '.join(result['deferred_imported'])}",
+              file=sys.stderr)
+        failed = True
+    if args.budget_ms is not None and result["total_ms"] > args.budget_ms:
+        print(f"FAIL: {result['total_ms']:.1f} ms is over the {args.budget_ms:.0f} ms budget", file=sys.stderr)
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""Concurrency stress test for inventory adjustments against a fake sheet.
+
+Many threads sell and restock a few hot products at once, through both
+``adjust_inventory`` and ``bulk_adjust_inventory``. Afterwards every
+product's quantity must equal its start plus the sum of its adjustments,
+in the sheet and in the cached index. Each product's log must also form
+an unbroken previous -> new chain.
+
+The same workload is then timed with all adjustments serialized behind one
+lock, to show what per-product locking saves. Those runs write straight to
+the sheet. A last run goes through the write-ahead journal, waits for it to
+replay, and checks the sheet the same way.
+
+Run from backend/ (exits non-zero on a lost update):
+    python -m benchmarks.stress_adjustments [--threads 16] [--ops 40] [--latency 0.005]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+from app.config import get_settings
+from app.journal import WriteJournal
+from app.sheets import COL, SheetsService, TAB_INVENTORY, TAB_LOG
+from app.storage import LocalSpreadsheet
+
+from .fake_sheets import fake_spreadsheet
+
+START_QTY = 100000
+
+
+class GlobalLock:
+    """Drop-in for KeyedLocks that serializes every adjustment."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def hold(self, *keys):
+        with self._lock:
+            yield
+
+
+def build_service(
+    products: int, latency: float, serialize_all: bool = False, journal_dir: str = ""
+) -> tuple[SheetsService, LocalSpreadsheet]:
+    svc = SheetsService()
+    svc._throttle = False  # the fake has no quota
+    sheet = fake_spreadsheet(products=products, qty=START_QTY, latency=latency)
+    svc._spreadsheet = sheet
+    if serialize_all:
+        svc._material_locks = GlobalLock()
+    svc._journal = WriteJournal(Path(journal_dir) / "journal.db", svc._replicate) if journal_dir else None
+    svc.get_all_products()
+    return svc, sheet
+
+
+def workload(svc: SheetsService, materials: list[str], threads: int, ops: int, seed: int) -> dict[str, int]:
+    """Run the adjustments; returns the expected net change per material."""
+    expected: dict[str, int] = defaultdict(int)
+    expected_lock = threading.Lock()
+    errors = []
+
+    def worker(n: int):
+        rng = random.Random(seed + n)
+        try:
+            for i in range(ops):
+                if i % 5 == 4:
+                    batch = [
+                        {"material_no": rng.choice(materials), "change_type": "sale", "quantity": -rng.randint(1, 3)}
+                        for _ in range(3)
+                    ]
+                    svc.bulk_adjust_inventory(batch, changed_by=f"t{n}")
+                    changes = [(adj["material_no"], adj["quantity"]) for adj in batch]
+                else:
+                    material_no = rng.choice(materials)
+                    quantity = rng.choice([-2, -1, -1, 1, 4])
+                    svc.adjust_inventory(material_no, "sale" if quantity < 0 else "restock", quantity, changed_by=f"t{n}")
+                    changes = [(material_no, quantity)]
+                with expected_lock:
+                    for material_no, quantity in changes:
+                        expected[material_no] += quantity
+        except Exception as exc:  # surfaced after join
+            errors.append(exc)
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    if errors:
+        raise errors[0]
+    return expected
+
+
+def check(svc: SheetsService, sheet: LocalSpreadsheet, expected: dict[str, int]) -> list[str]:
+    problems = []
+    rows = {row[COL["material_no"]]: row for row in sheet.worksheet(TAB_INVENTORY).get_all_values()[1:]}
+    for material_no, change in expected.items():
+        want = START_QTY + change
+        in_sheet = int(float(rows[material_no][COL["qty_on_hand"]]))
+        in_index = int(float(svc._index[material_no][1][COL["qty_on_hand"]]))
+        if in_sheet != want or in_index != want:
+            problems.append(f"{material_no}: expected {want}, sheet has {in_sheet}, index has {in_index}")
+
+    chains: dict[str, int] = {}
+    for entry in sheet.worksheet(TAB_LOG).get_all_values()[1:]:
+        material_no, changed, previous, new = entry[2], int(entry[4]), int(entry[5]), int(entry[6])
+        if previous != chains.get(material_no, START_QTY) or new != previous + changed:
+            problems.append(f"{material_no}: log entry {previous} -> {new} ({changed:+d}) breaks the chain")
+        chains[material_no] = new
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--ops", type=int, default=40, help="adjustments per thread")
+    parser.add_argument("--hot", type=int, default=4, help="products all threads contend on")
+    parser.add_argument("--products", type=int, default=40, help="products the timing run spreads over")
+    parser.add_argument("--latency", type=float, default=0.005, help="seconds per fake Sheets call")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        # The services save warm-start snapshots of the fake sheets: keep them
+        # (and the default journal) away from the real DATA_DIR
+        os.environ["DATA_DIR"] = data_dir
+        get_settings.cache_clear()
+        problems = run(args)
+    sys.exit(1 if problems else 0)
+
+
+def run(args: argparse.Namespace) -> list[str]:
+    """Run the three workloads; returns the problems found."""
+    svc, sheet = build_service(args.products, args.latency)
+    hot = [m for m in list(svc._index)[:args.hot]]
+    start = time.perf_counter()
+    expected = workload(svc, hot, args.threads, args.ops, seed=1)
+    elapsed = time.perf_counter() - start
+    problems = check(svc, sheet, expected)
+    adjustments = args.threads * args.ops
+    print(f"contended: {adjustments} adjustments on {len(hot)} products by {args.threads} threads "
+          f"in {elapsed:.2f}s, {sheet.calls} sheet calls, {len(problems)} problems")
+    for problem in problems[:20]:
+        print("  " + problem)
+
+    timings = {}
+    for label, serialize_all in (("per-product locks", False), ("one global lock", True)):
+        svc, sheet = build_service(args.products, args.latency, serialize_all=serialize_all)
+        start = time.perf_counter()
+        expected = workload(svc, list(svc._index), args.threads, args.ops, seed=2)
+        timings[label] = time.perf_counter() - start
+        problems += check(svc, sheet, expected)
+        print(f"{label:>18}: {adjustments} adjustments over {args.products} products in {timings[label]:.2f}s "
+              f"({adjustments / timings[label]:.0f}/s)")
+    print(f"speed-up over a global lock: {timings['one global lock'] / timings['per-product locks']:.1f}x")
+
+    with tempfile.TemporaryDirectory() as journal_dir:
+        svc, sheet = build_service(args.products, args.latency, journal_dir=journal_dir)
+        svc.start_journal()
+        start = time.perf_counter()
+        expected = workload(svc, hot, args.threads, args.ops, seed=3)
+        acknowledged = time.perf_counter() - start
+        replayed = svc.flush_journal(timeout=120)
+        elapsed = time.perf_counter() - start
+        svc.stop_journal()
+        journal_problems = check(svc, sheet, expected) if replayed else ["journal did not finish replaying"]
+        stats = svc.journal_stats()
+        print(f"{'journaled':>18}: {adjustments} adjustments on {len(hot)} products acknowledged in {acknowledged:.2f}s, "
+              f"in the sheet after {elapsed:.2f}s ({stats['batches']} replays, {sheet.calls} sheet calls), "
+              f"{len(journal_problems)} problems")
+        for problem in journal_problems[:20]:
+            print("  " + problem)
+        problems += journal_problems
+    return problems
+
+
+if __name__ == "__main__":
+    main()
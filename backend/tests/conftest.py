@@ -0,0 +1,31 @@
+"""Fixtures: a SheetsService over an in-memory local spreadsheet."""
+
+import pytest
+
+from app.config import get_settings
+from app.sheets import SheetsService
+from app.storage import LocalSpreadsheet
+from benchmarks.fake_sheets import fake_spreadsheet
+
+
+@pytest.fixture
+def settings(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    monkeypatch.setenv("STORAGE_BACKEND", "local")
+    monkeypatch.setenv("GOOGLE_MAX_RETRIES", "0")
+    get_settings.cache_clear()
+    yield get_settings()
+    get_settings.cache_clear()
+
+
+@pytest.fixture
+def sheet() -> LocalSpreadsheet:
+    return fake_spreadsheet(products=10)
+
+
+@pytest.fixture
+def service(settings, sheet) -> SheetsService:
+    svc = SheetsService()
+    svc._spreadsheet = sheet
+    yield svc
+    svc.stop_journal()
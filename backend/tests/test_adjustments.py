@@ -0,0 +1,46 @@
+"""Inventory adjustments written straight to the sheet and through the journal."""
+
+import pytest
+
+from app.sheets import TAB_INVENTORY, TAB_LOG
+from benchmarks.stress_adjustments import build_service, check, workload
+
+
+@pytest.mark.parametrize("journaled", [False, True], ids=["direct", "journaled"])
+def test_concurrent_adjustments_lose_no_updates(settings, tmp_path, journaled):
+    svc, sheet = build_service(products=10, latency=0.001, journal_dir=str(tmp_path) if journaled else "")
+    hot = list(svc._index)[:2]
+    svc.start_journal()
+    try:
+        expected = workload(svc, hot, threads=8, ops=20, seed=1)
+        assert svc.flush_journal(timeout=30)
+    finally:
+        svc.stop_journal()
+
+    assert sorted(expected) == sorted(hot)
+    # Quantities in the sheet and index, and each product's log chain
+    assert check(svc, sheet, expected) == []
+
+
+def test_a_repeated_key_is_applied_once_without_the_journal(service, sheet):
+    service._journal = None
+    batch = [{"material_no": "100001", "change_type": "sale", "quantity": -2}] * 2
+
+    assert service.adjust_inventory("100000", "sale", -3, idempotency_key="till-1:42").qty_on_hand == 7
+    assert [p.qty_on_hand for p in service.bulk_adjust_inventory(batch, idempotency_key="till-1:43")] == [8, 6]
+    # Retries answer with the products as they now stand
+    assert service.adjust_inventory("100000", "sale", -3, idempotency_key="till-1:42").qty_on_hand == 7
+    assert [p.qty_on_hand for p in service.bulk_adjust_inventory(batch, idempotency_key="till-1:43")] == [6, 6]
+
+    rows = {row[0]: row for row in sheet.worksheet(TAB_INVENTORY).get_all_values()}
+    assert (rows["100000"][10], rows["100001"][10]) == ("7", "6")
+    assert len(sheet.worksheet(TAB_LOG).get_all_values()) == 1 + 3
+
+
+@pytest.mark.parametrize("journaled", [False, True], ids=["direct", "journaled"])
+def test_an_empty_batch_makes_no_calls(service, sheet, journaled):
+    if not journaled:
+        service._journal = None
+    calls = sheet.calls
+    assert service.bulk_adjust_inventory([]) == []
+    assert sheet.calls == calls
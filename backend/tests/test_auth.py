@@ -0,0 +1,41 @@
+"""Session and event stream tokens."""
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+from app.auth import create_token, verify_stream_token
+from app.config import get_settings
+from app.main import app
+
+
+@pytest.fixture
+def settings(settings, monkeypatch):
+    monkeypatch.setenv("JWT_SECRET", "a-test-secret-long-enough-for-hs256")
+    get_settings.cache_clear()
+    return get_settings()
+
+
+def no_headers() -> Request:
+    return Request({"type": "http", "headers": []})
+
+
+def test_stream_token_opens_only_the_stream(settings):
+    client = TestClient(app)
+    session, role = create_token(settings.admin_pin)
+    response = client.post("/api/auth/stream-token", headers={"Authorization": f"Bearer {session}"})
+    assert response.status_code == 200
+    stream_token = response.json()["token"]
+
+    assert verify_stream_token(no_headers(), stream_token) == role
+    # ...and nothing else
+    assert client.get("/api/auth/verify", headers={"Authorization": f"Bearer {stream_token}"}).status_code == 401
+
+
+def test_session_token_is_refused_in_the_url(settings):
+    session, _ = create_token(settings.admin_pin)
+    with pytest.raises(HTTPException) as refused:
+        verify_stream_token(no_headers(), session)
+    assert refused.value.status_code == 401
+    assert TestClient(app).get(f"/api/inventory/stream?token={session}").status_code == 401
@@ -0,0 +1,72 @@
+"""Circuit breakers around Google calls."""
+
+import time
+from types import SimpleNamespace
+from typing import Optional
+
+import pytest
+
+from app.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+class ApiError(Exception):
+    def __init__(self, status: int):
+        super().__init__(f"HTTP {status}")
+        self.response = SimpleNamespace(status_code=status)
+
+
+def call(breaker: CircuitBreaker, exc: Optional[Exception] = None, seconds: float = 0.0):
+    """One guarded call that takes ``seconds`` and then raises ``exc``, if given."""
+    try:
+        with breaker.guard():
+            time.sleep(seconds)
+            if exc is not None:
+                raise exc
+    except Exception as raised:
+        assert raised is exc
+
+
+def test_opens_then_probes_then_closes():
+    breaker = CircuitBreaker("sheets", failure_threshold=3, open_seconds=0.05)
+    for _ in range(3):
+        call(breaker, ApiError(503))
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+    time.sleep(0.06)
+    assert breaker.state == HALF_OPEN
+    with breaker.guard():
+        # One probe at a time
+        with pytest.raises(CircuitOpenError):
+            breaker.check()
+    assert breaker.state == CLOSED
+    assert breaker.stats()["times_opened"] == 1
+
+
+def test_failed_probe_opens_it_again():
+    breaker = CircuitBreaker("sheets", failure_threshold=1, open_seconds=0.05)
+    call(breaker, ApiError(503))
+    time.sleep(0.06)
+    call(breaker, ConnectionError("reset"))
+    assert breaker.state == OPEN
+    assert breaker.stats()["times_opened"] == 2
+
+
+def test_slow_calls_count_as_failures():
+    breaker = CircuitBreaker("sheets", failure_threshold=2, slow_call_seconds=0.01)
+    call(breaker, seconds=0.02)
+    assert breaker.state == CLOSED
+    call(breaker, seconds=0.02)
+    assert breaker.state == OPEN
+    assert "took" in breaker.stats()["last_failure"]
+
+
+def test_request_errors_and_successes_reset_the_count():
+    breaker = CircuitBreaker("sheets", failure_threshold=2)
+    call(breaker, ApiError(503))
+    call(breaker, ApiError(400))  # the request was wrong; Google is fine
+    call(breaker)
+    call(breaker, ApiError(503))
+    assert breaker.state == CLOSED
+    assert breaker.stats()["consecutive_failures"] == 1
@@ -0,0 +1,104 @@
+"""The stale-while-revalidate cache."""
+
+import threading
+import time
+
+import pytest
+
+from app.cache import CachePolicy, SWRCache, track_staleness
+
+
+class Outage(Exception):
+    pass
+
+
+def make_cache() -> SWRCache:
+    return SWRCache({"products": CachePolicy(ttl=30, max_stale=300)}, serve_stale_on=lambda exc: isinstance(exc, Outage))
+
+
+def age_by(cache: SWRCache, key: str, seconds: float):
+    cache._entries[key].loaded_at -= seconds
+
+
+def wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def test_stale_entry_is_served_while_one_refresh_runs():
+    cache = make_cache()
+    cache.set("products", "old")
+    age_by(cache, "products", 60)
+    release = threading.Event()
+    loads = []
+
+    def loader():
+        loads.append(1)
+        release.wait(5)
+        return "new"
+
+    assert cache.get("products", loader) == "old"
+    assert cache.get("products", loader) == "old"  # the refresh is still running
+    release.set()
+    assert cache.load("products", loader) == "new"  # waits for the refresh in flight
+    assert len(loads) == 1
+    assert cache.get("products", loader) == "new"
+    assert cache.stats()["products"]["stale_hits"] == 2
+
+
+def test_concurrent_misses_share_one_load():
+    cache = make_cache()
+    started = threading.Event()
+    release = threading.Event()
+    loads = []
+
+    def loader():
+        loads.append(1)
+        started.set()
+        release.wait(5)
+        return "value"
+
+    results = []
+    first = threading.Thread(target=lambda: results.append(cache.get("products", loader)))
+    first.start()
+    started.wait(5)
+    others = [threading.Thread(target=lambda: results.append(cache.get("products", loader))) for _ in range(7)]
+    for t in others:
+        t.start()
+    wait_for(lambda: cache.stats()["products"]["coalesced"] == 7)
+    release.set()
+    for t in [first, *others]:
+        t.join(5)
+
+    assert results == ["value"] * 8
+    assert len(loads) == 1
+    assert cache.stats()["products"]["misses"] == 1
+
+
+def test_outage_serves_the_last_value_however_old():
+    cache = make_cache()
+    cache.set("products", "old")
+    age_by(cache, "products", 3600)
+
+    def down():
+        raise Outage("503")
+
+    with track_staleness() as served:
+        assert cache.get("products", down) == "old"
+    assert served["products"] >= 3600
+    assert cache.stats()["products"]["fallbacks"] == 1
+    assert cache.stats()["products"]["failing"]
+
+
+def test_other_errors_are_raised_not_hidden():
+    cache = make_cache()
+    cache.set("products", "old")
+    age_by(cache, "products", 3600)
+
+    def broken():
+        raise ValueError("bad range")
+
+    with pytest.raises(ValueError):
+        cache.get("products", broken)
@@ -0,0 +1,16 @@
+"""Start-up imports of app.main, measured in a fresh interpreter."""
+
+from pathlib import Path
+
+from benchmarks.import_time import DEFERRED, report
+
+# Generous: about 650 ms locally; this catches a heavy import creeping back in
+BUDGET_MS = 3000
+
+
+def test_start_up_imports(monkeypatch):
+    monkeypatch.chdir(Path(__file__).resolve().parents[1])  # so the interpreter finds app/
+    result = report(runs=1, top=0)
+
+    assert result["deferred_imported"] == [], f"imported at start-up but should be deferred ({', '.join(DEFERRED)})"
+    assert result["total_ms"] < BUDGET_MS
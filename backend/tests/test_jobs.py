@@ -0,0 +1,85 @@
+"""The invoice filing job queue."""
+
+import io
+import time
+
+import pytest
+
+from app import jobs
+from app.config import get_settings
+from app.jobs import DONE, LOGGING, QUEUED, InvoiceJobQueue
+from app.sheets import TAB_INVOICES
+
+INVOICE = {
+    "customer_name": "Jane Doe",
+    "invoice_date": "2026-10-17",
+    "items_summary": "PRODUCT 1 x2",
+    "total": 51.5,
+    "paid": True,
+}
+
+
+@pytest.fixture
+def settings(settings, monkeypatch):
+    monkeypatch.setenv("INVOICE_JOB_RETRY_SECONDS", "1")
+    get_settings.cache_clear()
+    return get_settings()
+
+
+@pytest.fixture
+def service(service, monkeypatch):
+    monkeypatch.setattr(jobs, "get_sheets_service", lambda: service)
+    return service
+
+
+def wait_for(condition, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def filed(sheet) -> list[str]:
+    return [row[0] for row in sheet.worksheet(TAB_INVOICES).get_all_values()[1:]]
+
+
+def test_a_job_queued_before_a_restart_is_filed_after_it(settings, service, sheet):
+    job = InvoiceJobQueue(settings.data_dir).enqueue(INVOICE, io.BytesIO(b"%PDF-1.4"))
+    assert job["status"] == QUEUED
+
+    restarted = InvoiceJobQueue(settings.data_dir)
+    restarted.start()
+    try:
+        wait_for(lambda: restarted.get(job["id"])["status"] == DONE)
+    finally:
+        restarted.stop()
+    assert filed(sheet) == [job["invoice_number"]]
+
+
+def test_a_failed_step_is_retried_after_a_restart(settings, service, sheet, monkeypatch):
+    log_invoice = service.log_invoice
+
+    def sheet_down(**kwargs):
+        raise ConnectionError("Sheets unreachable")
+
+    monkeypatch.setattr(service, "log_invoice", sheet_down)
+    queue = InvoiceJobQueue(settings.data_dir)
+    queue.start()
+    job = queue.enqueue(INVOICE, io.BytesIO(b"%PDF-1.4"))
+    try:
+        wait_for(lambda: queue.get(job["id"])["attempts"] >= 1)
+    finally:
+        queue.stop()
+    stopped = queue.get(job["id"])
+    assert stopped["status"] == LOGGING
+    assert stopped["error"] == "Sheets unreachable"
+
+    monkeypatch.setattr(service, "log_invoice", log_invoice)
+    restarted = InvoiceJobQueue(settings.data_dir)
+    restarted.start()
+    try:
+        wait_for(lambda: restarted.get(job["id"])["status"] == DONE)
+    finally:
+        restarted.stop()
+    assert filed(sheet) == [job["invoice_number"]]
+    assert restarted.get(job["id"])["error"] == ""
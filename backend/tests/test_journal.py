@@ -0,0 +1,77 @@
+"""The write-ahead journal of inventory changes."""
+
+import sqlite3
+from pathlib import Path
+
+from app.journal import DONE, FAILED, SENT
+from app.sheets import JOURNAL_FILE, TAB_INVENTORY, TAB_LOG, SheetsService
+
+
+def sheet_qty(sheet, material_no: str) -> int:
+    for row in sheet.worksheet(TAB_INVENTORY).get_all_values():
+        if row[0] == material_no:
+            return int(row[10])
+    raise KeyError(material_no)
+
+
+def logged(sheet, material_no: str) -> list[tuple[int, int]]:
+    """(previous_qty, new_qty) of each log row for a product."""
+    return [(int(row[5]), int(row[6])) for row in sheet.worksheet(TAB_LOG).get_all_values()[1:] if row[2] == material_no]
+
+
+def statuses(settings) -> list[str]:
+    with sqlite3.connect(Path(settings.data_dir) / JOURNAL_FILE) as db:
+        return [status for (status,) in db.execute("SELECT status FROM journal ORDER BY seq")]
+
+
+def test_a_repeated_key_is_applied_once(service, sheet, settings):
+    first = service.adjust_inventory("100000", "sale", -3, idempotency_key="till-1:42")
+    retried = service.adjust_inventory("100000", "sale", -3, idempotency_key="till-1:42")
+    assert first.qty_on_hand == retried.qty_on_hand == 7
+
+    service.start_journal()
+    assert service.flush_journal(timeout=10)
+    assert sheet_qty(sheet, "100000") == 7
+    assert logged(sheet, "100000") == [(10, 7)]
+    assert statuses(settings) == [DONE]
+
+
+def test_a_replay_cut_short_finishes_after_a_restart(service, sheet, settings):
+    service.adjust_inventory("100000", "sale", -3)
+
+    def crash(rows):
+        raise RuntimeError("process killed")
+
+    # The quantity is written, then the replay dies before logging it
+    service._write_log_rows = crash
+    service.start_journal()
+    assert not service.flush_journal(timeout=0.5)
+    service.stop_journal()
+    assert statuses(settings) == [SENT]
+    assert sheet_qty(sheet, "100000") == 7
+
+    restarted = SheetsService()
+    restarted._spreadsheet = sheet
+    restarted.start_journal()
+    try:
+        assert restarted.flush_journal(timeout=10)
+    finally:
+        restarted.stop_journal()
+    assert sheet_qty(sheet, "100000") == 7  # not applied twice
+    assert logged(sheet, "100000") == [(10, 7)]
+    assert statuses(settings) == [DONE]
+
+
+def test_changes_to_a_removed_product_are_failed(service, sheet, settings):
+    service.adjust_inventory("100000", "sale", -3)
+    service.adjust_inventory("100001", "sale", -1)
+    # The first product's row deleted by hand before the replay
+    ws = sheet.worksheet(TAB_INVENTORY)
+    header, _, *rest = ws.get_all_values()
+    sheet.replace_tab(TAB_INVENTORY, [header, *rest])
+
+    service.start_journal()
+    assert service.flush_journal(timeout=10)
+    assert statuses(settings) == [FAILED, DONE]
+    assert service.journal_stats()["failed"] == 1
+    assert sheet_qty(sheet, "100001") == 9
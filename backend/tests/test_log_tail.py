@@ -0,0 +1,22 @@
+"""Refreshing the Inventory Log tail."""
+
+from app.sheets import LOG_HEADERS, TAB_LOG
+from app.storage import DEFAULT_ROWS
+
+
+def log_row(n: int) -> list:
+    return ["2024-01-01 00:00:00", "PRODUCT 0", "100000", "sale", "-1", str(n + 1), str(n), "web"]
+
+
+def test_refresh_with_the_log_grid_full(service, sheet):
+    # Fill the grid to its last row, as appends leave it
+    sheet.replace_tab(TAB_LOG, [LOG_HEADERS] + [log_row(n) for n in range(DEFAULT_ROWS - 1)])
+    assert [e.new_qty for e in service.get_log(2)] == [DEFAULT_ROWS - 2, DEFAULT_ROWS - 3]
+
+    # Nothing past the last row: no new entries rather than an out-of-grid 400
+    assert service._cache.load("log", service._refresh_log_tail) == DEFAULT_ROWS
+
+    # Rows appended later grow the grid and are picked up
+    sheet.worksheet(TAB_LOG).append_rows([log_row(5000)])
+    assert service._cache.load("log", service._refresh_log_tail) == DEFAULT_ROWS + 1
+    assert service.get_log(1)[0].new_qty == 5000
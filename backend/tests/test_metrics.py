@@ -0,0 +1,27 @@
+"""Request metrics labels."""
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.metrics import http_requests
+
+
+def requests_counted() -> dict[tuple, float]:
+    return dict(http_requests._values)
+
+
+def test_requests_are_labelled_by_route_template(settings):
+    before = requests_counted()
+    client = TestClient(app)  # no lifespan: the requests below never reach Google
+    # A material number that repeats a literal path segment
+    client.put("/api/products/api/markup", json={"markup_pct": 0.3})
+    client.get("/api/invoices/jobs/abc123")
+    client.get("/nope/xyz")
+    client.get("/api/nothing/here")
+
+    counted = {k: v - before.get(k, 0) for k, v in requests_counted().items() if v != before.get(k, 0)}
+    assert counted == {
+        ("PUT", "/api/products/{material_no}/markup", "401"): 1,
+        ("GET", "/api/invoices/jobs/{job_id}", "401"): 1,
+        ("GET", "unmatched", "404"): 2,
+    }
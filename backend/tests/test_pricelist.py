@@ -0,0 +1,21 @@
+"""Price list imports."""
+
+from app.sheets import TAB_INVENTORY
+
+
+def item(material_no: str, cost: float) -> dict:
+    return {"material_no": material_no, "purina_cost": cost, "pallet_cost": cost - 1}
+
+
+def test_import_diffs_against_the_sheet_not_the_cache(service, sheet):
+    service.get_all_products()
+    # Cost edited by hand after the products were cached
+    sheet.worksheet(TAB_INVENTORY).batch_update([{"range": "F2", "values": [[30]]}])
+
+    result = service.import_pricelist([item("100000", 20)], dry_run=True)
+    assert [(c["field"], c["old"], c["new"]) for c in result["changes"]][0] == ("purina_cost", "30", 20)
+
+
+def test_last_duplicate_row_wins(service):
+    result = service.import_pricelist([item("100000", 40), item("100000", 41)], dry_run=True)
+    assert [c["new"] for c in result["changes"] if c["field"] == "purina_cost"] == [41]
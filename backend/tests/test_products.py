@@ -0,0 +1,35 @@
+"""Markup and reorder point changes written straight to the sheet."""
+
+from app.sheets import TAB_INVENTORY, calc_retail_pre_tax
+
+
+def sheet_row(sheet, material_no: str) -> list[str]:
+    for row in sheet.worksheet(TAB_INVENTORY).get_all_values():
+        if row[0] == material_no:
+            return row
+    raise KeyError(material_no)
+
+
+def test_markup_prices_from_the_cost_in_the_sheet(service, sheet):
+    service._journal = None
+    service.get_all_products()
+    # Cost edited by hand after the products were cached
+    sheet.worksheet(TAB_INVENTORY).batch_update([{"range": "F2", "values": [[30]]}])
+
+    product = service.update_markup("100000", 0.5)
+    assert product.purina_cost == 30
+    assert product.retail_pre_tax == calc_retail_pre_tax(30, 0.5)
+    assert float(sheet_row(sheet, "100000")[8]) == calc_retail_pre_tax(30, 0.5)
+
+
+def test_reorder_point_follows_a_moved_row(service, sheet):
+    service._journal = None
+    service.get_all_products()
+    # The first two products swapped places by hand
+    ws = sheet.worksheet(TAB_INVENTORY)
+    header, first, second, *rest = ws.get_all_values()
+    sheet.replace_tab(TAB_INVENTORY, [header, second, first, *rest])
+
+    assert service.update_reorder_point("100000", 7).row_number == 3
+    assert sheet_row(sheet, "100000")[11] == "7"
+    assert sheet_row(sheet, "100001") == second
@@ -0,0 +1,109 @@
+"""Full reloads of the Inventory tab: racing our own writes, and on unknown products."""
+
+import threading
+import time
+
+from app.sheets import TAB_INVENTORY
+
+
+def reload_racing(service, write):
+    """Reload the products, running ``write`` after the tab is read but
+    before the reload installs it."""
+    ws = service._get_worksheet(TAB_INVENTORY)
+    read = ws.get_all_values
+    done = threading.Event()
+
+    def get_all_values(*args, **kwargs):
+        values = read(*args, **kwargs)
+        threading.Thread(target=lambda: (write(), done.set())).start()
+        done.wait(5)
+        return values
+
+    ws.get_all_values = get_all_values
+    try:
+        return service._load_inventory()
+    finally:
+        ws.get_all_values = read
+
+
+def test_reload_keeps_a_write_made_while_reading(service):
+    service._journal = None  # write straight to the sheet
+    service.get_all_products()
+
+    products = reload_racing(service, lambda: service.update_markup("100000", 0.5))
+    assert products[0].markup_pct == 0.5
+    assert service.adjust_inventory("100000", "sale", -1).markup_pct == 0.5
+
+
+def sheet_qty(sheet, material_no: str) -> int:
+    for row in sheet.worksheet(TAB_INVENTORY).get_all_values():
+        if row[0] == material_no:
+            return int(row[10])
+    raise KeyError(material_no)
+
+
+def pending_batch(service) -> list[dict]:
+    return [{**entry, "data": dict(entry["data"])} for entry in service._journal.pending()]
+
+
+def test_reload_keeps_a_replay_completed_while_reading(service, sheet):
+    service.get_all_products()
+    service.adjust_inventory("100000", "sale", -3)
+
+    products = reload_racing(service, lambda: service._replicate(pending_batch(service)))
+    assert not service._journal.pending()
+    assert sheet_qty(sheet, "100000") == 7
+    assert products[0].qty_on_hand == 7
+    assert service.adjust_inventory("100000", "sale", -1).qty_on_hand == 6
+    assert service.get_log(1)[0].previous_qty == 7
+
+
+def test_reload_does_not_reapply_a_sent_write(service, sheet, monkeypatch):
+    service.get_all_products()
+    service.adjust_inventory("100000", "sale", -3)
+
+    # The replay writes the quantity, then is cut short before logging
+    def fail(rows):
+        raise ConnectionError("cut short")
+
+    monkeypatch.setattr(service, "_write_log_rows", fail)
+    try:
+        service._replicate(pending_batch(service))
+    except ConnectionError:
+        pass
+    assert sheet_qty(sheet, "100000") == 7
+
+    products = service._load_inventory()
+    assert products[0].qty_on_hand == 7
+
+
+def test_unknown_products_share_one_reload(service):
+    service.get_all_products()
+    ws = service._get_worksheet(TAB_INVENTORY)
+    read = ws.get_all_values
+    reads = []
+
+    def get_all_values(*args, **kwargs):
+        reads.append(1)
+        time.sleep(0.05)
+        return read(*args, **kwargs)
+
+    ws.get_all_values = get_all_values
+    start = threading.Barrier(8)
+    errors = []
+
+    def sell():
+        start.wait()
+        try:
+            service.adjust_inventory("999999", "sale", -1)
+        except ValueError as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=sell) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+
+    assert len(errors) == 8
+    assert len(reads) == 1
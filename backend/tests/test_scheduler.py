@@ -0,0 +1,84 @@
+"""Quota scheduling: priority lanes and retries."""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.scheduler import Lane, QuotaScheduler
+
+
+class ApiError(Exception):
+    """Shaped like gspread's APIError, as far as error_status looks."""
+
+    def __init__(self, status: int):
+        super().__init__(f"HTTP {status}")
+        self.response = SimpleNamespace(status_code=status)
+
+
+def make_scheduler(**kwargs) -> QuotaScheduler:
+    options = {"per_minute": 60, "burst": 1, "max_retries": 3, "backoff_base": 0.001, "backoff_max": 0.01}
+    return QuotaScheduler(**{**options, **kwargs})
+
+
+def failing(*statuses: int):
+    """A call that fails with each status in turn, then succeeds."""
+    calls = []
+
+    def call():
+        calls.append(1)
+        if len(calls) <= len(statuses):
+            raise ApiError(statuses[len(calls) - 1])
+        return "ok"
+
+    return call, calls
+
+
+def test_waiting_calls_go_by_lane():
+    scheduler = make_scheduler(per_minute=600)  # a token every 100 ms
+    scheduler.acquire(Lane.INTERACTIVE)  # take the only token
+    order = []
+    threads = []
+    for n, lane in enumerate((Lane.BULK, Lane.BACKGROUND, Lane.INTERACTIVE), start=1):
+        thread = threading.Thread(target=lambda lane=lane: (scheduler.acquire(lane), order.append(lane)))
+        thread.start()
+        threads.append(thread)
+        while sum(scheduler.stats()["waiting"].values()) < n and not order:
+            time.sleep(0.001)
+    for thread in threads:
+        thread.join(5)
+
+    assert order == [Lane.INTERACTIVE, Lane.BACKGROUND, Lane.BULK]
+
+
+def test_quota_and_server_errors_are_retried():
+    call, calls = failing(429, 503, 429)
+    assert make_scheduler().run("Inventory", "batch_get", call, throttle=False) == "ok"
+    assert len(calls) == 4
+
+
+def test_request_errors_are_not_retried():
+    call, calls = failing(400)
+    with pytest.raises(ApiError):
+        make_scheduler().run("Inventory", "batch_get", call, throttle=False)
+    assert len(calls) == 1
+
+
+def test_appends_are_retried_on_429_only():
+    # A 5xx append may have landed; a 429 one was refused outright
+    call, calls = failing(429)
+    assert make_scheduler().run("Inventory Log", "append_rows", call, throttle=False) == "ok"
+    assert len(calls) == 2
+
+    call, calls = failing(503)
+    with pytest.raises(ApiError):
+        make_scheduler().run("Inventory Log", "append_rows", call, throttle=False)
+    assert len(calls) == 1
+
+
+def test_retries_stop_at_the_limit():
+    call, calls = failing(429, 429, 429, 429)
+    with pytest.raises(ApiError):
+        make_scheduler(max_retries=2).run("Inventory", "get_all_values", call, throttle=False)
+    assert len(calls) == 3
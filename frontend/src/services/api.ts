@@ -1,4 +1,4 @@
-import type { Product, LogEntry, InventoryAdjustment } from '../types'
+import type { Product, ProductDelta, LogEntry, InventoryAdjustment, InvoiceJob } from '../types'
 
 const API_BASE = '/api'
 
@@ -11,7 +11,7 @@ function authHeaders(): HeadersInit {
   return token ? { Authorization: `Bearer ${token}` } : {}
 }
 
-async function request<T>(path: string, options: RequestInit = {}): Promise<T> {
+async function send(path: string, options: RequestInit = {}): Promise<Response> {
   const res = await fetch(`${API_BASE}${path}`, {
     ...options,
     headers: {
@@ -32,7 +32,11 @@ async function request<T>(path: string, options: RequestInit = {}): Promise<T> {
     throw new Error(body.detail || `Request failed: ${res.status}`)
   }
 
-  return res.json()
+  return res
+}
+
+async function request<T>(path: string, options: RequestInit = {}): Promise<T> {
+  return (await send(path, options)).json()
 }
 
 // Auth
@@ -56,6 +60,14 @@ export async function verifyAuth(): Promise<string | null> {
   }
 }
 
+// The event stream takes a short-lived token in its URL, never the session token
+export async function getStreamToken(): Promise<string> {
+  const data = await request<{ token: string; expires_in_seconds: number }>('/auth/stream-token', {
+    method: 'POST',
+  })
+  return data.token
+}
+
 export function logout() {
   localStorage.removeItem('auth_token')
   localStorage.removeItem('auth_role')
@@ -70,9 +82,17 @@ export function getRole(): string {
   return localStorage.getItem('auth_role') || ''
 }
 
-// Products
-export async function getProducts(): Promise<Product[]> {
-  return request<Product[]>('/products')
+// Products: the full list is served pre-encoded, with its version as the ETag
+export async function getProducts(): Promise<ProductDelta> {
+  const res = await send('/products')
+  const products: Product[] = await res.json()
+  const version = (res.headers.get('ETag') || '').replace(/"/g, '')
+  return { version, full: true, products, deleted: [] }
+}
+
+// Delta sync: pass the version from the previous response
+export async function getProductsSince(version: string): Promise<ProductDelta> {
+  return request<ProductDelta>(`/products?since=${encodeURIComponent(version)}`)
 }
 
 export async function updateMarkup(materialNo: string, markupPct: number): Promise<Product> {
@@ -113,12 +133,34 @@ export async function getLowStock(): Promise<Product[]> {
 }
 
 // Price list archive
-export async function getPriceListArchive(): Promise<{ headers: string[]; rows: string[][] }> {
-  return request<{ headers: string[]; rows: string[][] }>('/pricelist/archive')
+export interface ArchivePage {
+  headers: string[]
+  rows: string[][]
+  total: number
+  page: number
+  page_size: number
+}
+
+export async function getPriceListArchive(
+  params: { page?: number; pageSize?: number; category?: string; q?: string; columns?: string[] } = {}
+): Promise<ArchivePage> {
+  const query = new URLSearchParams()
+  if (params.page) query.set('page', String(params.page))
+  if (params.pageSize) query.set('page_size', String(params.pageSize))
+  if (params.category) query.set('category', params.category)
+  if (params.q) query.set('q', params.q)
+  if (params.columns?.length) query.set('columns', params.columns.join(','))
+  const qs = query.toString()
+  return request<ArchivePage>(`/pricelist/archive${qs ? `?${qs}` : ''}`)
+}
+
+export async function getPriceListCategories(): Promise<string[]> {
+  return request<string[]>('/pricelist/archive/categories')
 }
 
 // Invoice filing
-export async function fileInvoice(invoiceData: object, pdfBlob: Blob): Promise<{ message: string; drive_url: string; invoice_number: string }> {
+// Queues the invoice and resolves as soon as it has a number (HTTP 202)
+export async function fileInvoice(invoiceData: object, pdfBlob: Blob): Promise<InvoiceJob> {
   const token = getToken()
   const formData = new FormData()
   formData.append('invoice_data', JSON.stringify(invoiceData))
@@ -144,13 +186,44 @@ export async function fileInvoice(invoiceData: object, pdfBlob: Blob): Promise<{
   return res.json()
 }
 
+export async function getInvoiceJob(id: string): Promise<InvoiceJob> {
+  return request<InvoiceJob>(`/invoices/jobs/${id}`)
+}
+
+// Poll a filing job until it is done or failed (or we stop waiting)
+export async function waitForInvoiceJob(id: string, timeoutMs = 120000): Promise<InvoiceJob> {
+  const deadline = Date.now() + timeoutMs
+  let delay = 1000
+  for (;;) {
+    const job = await getInvoiceJob(id)
+    if (job.status === 'done' || job.status === 'failed' || Date.now() > deadline) return job
+    await new Promise(resolve => setTimeout(resolve, delay))
+    delay = Math.min(delay * 2, 10000)
+  }
+}
+
 // Price list import
-export async function importPriceList(file: File): Promise<{ updated: number; new_products: string[]; message: string }> {
+export interface PriceListChange {
+  material_no: string
+  product_name: string
+  field: 'purina_cost' | 'pallet_cost'
+  old: string
+  new: number
+}
+
+export async function importPriceList(file: File, dryRun = false): Promise<{
+  updated: number
+  unchanged: number
+  new_products: string[]
+  changes: PriceListChange[]
+  dry_run: boolean
+  message: string
+}> {
   const token = getToken()
   const formData = new FormData()
   formData.append('file', file)
 
-  const res = await fetch(`${API_BASE}/pricelist/import`, {
+  const res = await fetch(`${API_BASE}/pricelist/import${dryRun ? '?dry_run=true' : ''}`, {
     method: 'POST',
     headers: token ? { Authorization: `Bearer ${token}` } : {},
     body: formData,
@@ -1,10 +1,11 @@
 import { defineStore } from 'pinia'
 import { ref, computed } from 'vue'
-import type { Product, LogEntry } from '../types'
+import type { Product, ProductDelta, LogEntry } from '../types'
 import * as api from '../services/api'
 
 export const useInventoryStore = defineStore('inventory', () => {
   const products = ref<Product[]>([])
+  const productsVersion = ref('')
   const logEntries = ref<LogEntry[]>([])
   const loading = ref(false)
   const error = ref('')
@@ -20,7 +21,11 @@ export const useInventoryStore = defineStore('inventory', () => {
     loading.value = true
     error.value = ''
     try {
-      products.value = await api.getProducts()
+      // Full loads take the pre-encoded list; later ones only what changed
+      const delta = productsVersion.value
+        ? await api.getProductsSince(productsVersion.value)
+        : await api.getProducts()
+      applyDelta(delta)
     } catch (e: any) {
       error.value = e.message
     } finally {
@@ -28,6 +33,80 @@ export const useInventoryStore = defineStore('inventory', () => {
     }
   }
 
+  // Live updates pushed from /api/inventory/stream
+  let stream: EventSource | null = null
+  let connecting = false
+  let lastEventId = ''
+
+  function versionNumber(version: string): [string, number] {
+    const [epoch, n] = version.split('.')
+    return [epoch, Number(n) || 0]
+  }
+
+  async function connectStream() {
+    if (stream || connecting || !api.isLoggedIn()) return
+    connecting = true
+    let token: string
+    try {
+      token = await api.getStreamToken()
+    } catch {
+      setTimeout(connectStream, 3000)
+      return
+    } finally {
+      connecting = false
+    }
+    const resume = lastEventId ? `&last_event_id=${encodeURIComponent(lastEventId)}` : ''
+    stream = new EventSource(`/api/inventory/stream?token=${encodeURIComponent(token)}${resume}`)
+
+    // The browser reconnects on its own with the same URL; once the token in
+    // it has expired that is refused and the stream closes, so open a new one
+    stream.onerror = () => {
+      if (stream?.readyState !== EventSource.CLOSED) return
+      stream = null
+      setTimeout(connectStream, 3000)
+    }
+
+    stream.addEventListener('products', (e: MessageEvent) => {
+      lastEventId = e.lastEventId || lastEventId
+      const delta = JSON.parse(e.data) as Omit<ProductDelta, 'full'>
+      const [epoch, n] = versionNumber(delta.version)
+      const [ourEpoch, ourN] = versionNumber(productsVersion.value)
+      if (epoch === ourEpoch && n <= ourN) return // already have it from a fetch
+      applyDelta({ ...delta, full: false })
+    })
+
+    stream.addEventListener('log', (e: MessageEvent) => {
+      lastEventId = e.lastEventId || lastEventId
+      const { entries } = JSON.parse(e.data) as { entries: LogEntry[] }
+      if (logEntries.value.length) logEntries.value = [...entries.reverse(), ...logEntries.value]
+    })
+
+    stream.addEventListener('resync', (e: MessageEvent) => {
+      lastEventId = e.lastEventId || lastEventId
+      fetchProducts()
+    })
+  }
+
+  function applyDelta(delta: ProductDelta) {
+    if (delta.full) {
+      products.value = delta.products
+    } else if (delta.products.length || delta.deleted.length) {
+      const deleted = new Set(delta.deleted)
+      const changed = new Map(delta.products.map(p => [p.material_no, p]))
+      const merged = products.value
+        .filter(p => !deleted.has(p.material_no))
+        .map(p => {
+          const updated = changed.get(p.material_no)
+          if (updated) changed.delete(p.material_no)
+          return updated ?? p
+        })
+      merged.push(...changed.values())
+      merged.sort((a, b) => a.row_number - b.row_number)
+      products.value = merged
+    }
+    productsVersion.value = delta.version
+  }
+
   async function fetchLog(limit = 100) {
     loading.value = true
     error.value = ''
@@ -82,6 +161,7 @@ export const useInventoryStore = defineStore('inventory', () => {
     lowStockCount,
     fetchProducts,
     fetchLog,
+    connectStream,
     adjustInventory,
     updateMarkup,
     updateReorder,
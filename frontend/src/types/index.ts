@@ -16,6 +16,13 @@ export interface Product {
   notes: string
 }
 
+export interface ProductDelta {
+  version: string
+  full: boolean
+  products: Product[]
+  deleted: string[]
+}
+
 export interface LogEntry {
   timestamp: string
   product_name: string
@@ -28,6 +35,18 @@ export interface LogEntry {
   notes: string
 }
 
+export interface InvoiceJob {
+  id: string
+  invoice_number: string
+  status: 'queued' | 'uploading' | 'logging' | 'done' | 'failed'
+  attempts: number
+  drive_url: string
+  drive_error: string
+  error: string
+  created_at: string
+  updated_at: string
+}
+
 export interface InventoryAdjustment {
   material_no: string
   change_type: 'sale' | 'restock' | 'adjustment'